@@ -1,15 +1,27 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.db import transaction
 
-from catalog.ai_services import generate_product_description
-from catalog.models import Category, Product
+from catalog.jobs import create_description_job, start_description_job
+from catalog.models import (
+    Category,
+    DescriptionJob,
+    DescriptionJobItem,
+    Product,
+    ProductSlugAlias,
+)
 
 
 def make_description_with_ai(modeladmin, request, queryset):
-    for product in queryset:
-        description = generate_product_description(product.name)
-        if description:
-            product.description = description
-            product.save(update_fields=["description"])
+    job = create_description_job(queryset, user=request.user)
+
+    if getattr(settings, "AI_JOBS_IN_PROCESS", True):
+        transaction.on_commit(lambda: start_description_job(job.pk))
+    modeladmin.message_user(
+        request,
+        f"Job #{job.pk} criado para {job.total} produto(s). Acompanhe em Description jobs.",
+        messages.INFO,
+    )
 
 
 make_description_with_ai.short_description = "Gerar descricao curta com IA"
@@ -20,7 +32,48 @@ class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("name",)}
 
 
+class ProductSlugAliasInline(admin.TabularInline):
+    model = ProductSlugAlias
+    extra = 0
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
+    list_display = ("name", "price", "stock", "is_active")
     prepopulated_fields = {"slug": ("name",)}
     actions = [make_description_with_ai]
+    inlines = [ProductSlugAliasInline]
+
+    def get_readonly_fields(self, request, obj=None):
+        # Estoque so entra na criacao; depois muda por UPDATE condicional.
+        return ("stock",) if obj else ()
+
+
+class DescriptionJobItemInline(admin.TabularInline):
+    model = DescriptionJobItem
+    extra = 0
+    can_delete = False
+    fields = ("product", "status", "attempts", "error", "updated_at")
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DescriptionJob)
+class DescriptionJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "status", "progress", "succeeded", "failed", "created_by", "created_at", "finished_at")
+    list_filter = ("status",)
+    readonly_fields = (
+        "status", "total", "succeeded", "failed", "created_by",
+        "created_at", "started_at", "finished_at",
+    )
+    inlines = [DescriptionJobItemInline]
+
+    @admin.display(description="Progresso")
+    def progress(self, obj):
+        done = obj.succeeded + obj.failed
+        return f"{done}/{obj.total}"
+
+    def has_add_permission(self, request):
+        return False
@@ -1,21 +1,39 @@
+import hashlib
+import json
 import os
+import threading
+import time
+from datetime import timedelta
 
-import openai
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
 
+from catalog.models import GeneratedDescription
+from core.http import get_provider
 
-def generate_product_description(product_name):
-    fallback = (
-        "Descricao confidencial nao disponivel no momento. "
-        "Contate o suporte da Loja IA."
-    )
+FALLBACK_DESCRIPTION = (
+    "Descricao confidencial nao disponivel no momento. "
+    "Contate o suporte da Loja IA."
+)
 
-    system_prompt = (
-        "Voce e um Copywriter Especialista em E-commerce Tech/Cyberpunk. "
-        "Seu tom e futurista, persuasivo e conciso."
-    )
+SYSTEM_PROMPT = (
+    "Voce e um Copywriter Especialista em E-commerce Tech/Cyberpunk. "
+    "Seu tom e futurista, persuasivo e conciso."
+)
+
+MODEL = "gpt-4o-mini"
+MAX_TOKENS = 400
+TEMPERATURE = 0.7
 
-    user_prompt = (
+
+class DescriptionGenerationError(Exception):
+    pass
+
+
+def build_user_prompt(product_name):
+    return (
         "Crie uma descricao de produto para e-commerce a partir do nome abaixo. "
         "Siga exatamente esta estrutura, sem rotulos como 'Headline:' ou 'CTA:'.\n\n"
         "Estrutura obrigatoria:\n"
@@ -27,23 +45,209 @@ def generate_product_description(product_name):
         f"Produto: {product_name}"
     )
 
-    try:
-        api_key = settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            return fallback
-
-        client = openai.OpenAI(api_key=api_key)
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            max_tokens=400,
-            temperature=0.7,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+
+class OpenAIBackend:
+    def __init__(self, api_key):
+        # Um unico client por processo, sobre o pool httpx do provedor
+        # "openai" (timeouts e circuit breaker em core.http). Os retries
+        # ficam por conta dos jobs. O SDK (e o pydantic) so e importado aqui.
+        import openai
+
+        self.client = openai.OpenAI(
+            api_key=api_key,
+            base_url=getattr(settings, "OPENAI_BASE_URL", "") or None,
+            max_retries=0,
+            http_client=get_provider("openai").httpx_client,
         )
 
+    def complete(self, system_prompt, user_prompt, model=MODEL, temperature=TEMPERATURE):
+        import openai
+
+        try:
+            response = self.client.chat.completions.create(
+                model=model,
+                max_tokens=MAX_TOKENS,
+                temperature=temperature,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+            )
+        except openai.OpenAIError as exc:
+            raise DescriptionGenerationError(str(exc)) from exc
+
         content = response.choices[0].message.content
-        return content.strip() if content else fallback
+        if not content or not content.strip():
+            raise DescriptionGenerationError("Empty completion.")
+        return content.strip()
+
+
+class FakeLLMBackend:
+    """LLM local e deterministico para desenvolvimento e testes offline."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def complete(self, system_prompt, user_prompt, model=MODEL, temperature=TEMPERATURE):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        product_name = user_prompt.rsplit("Produto:", 1)[-1].strip()
+        digest = hashlib.sha256(user_prompt.encode()).hexdigest()[:8]
+        return (
+            f"{product_name}: o upgrade que a sua rotina pedia.\n"
+            f"Feito para quem vive conectado, {product_name} resolve o caos do dia a dia.\n"
+            f"- Nucleo de processamento {digest[:4].upper()}\n"
+            f"- Bateria de grafeno serie {digest[4:].upper()}\n"
+            "- Sincronizacao neural em 0.3 ms\n"
+            "Seu proximo nivel esta a um clique."
+        )
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_llm_backend():
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    with _backend_lock:
+        if _backend is None:
+            name = getattr(settings, "AI_BACKEND", "openai")
+            if name == "fake":
+                _backend = FakeLLMBackend(latency=getattr(settings, "AI_FAKE_LATENCY", 0.0))
+            else:
+                api_key = settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
+                if not api_key:
+                    raise DescriptionGenerationError("OPENAI_API_KEY not configured.")
+                _backend = OpenAIBackend(api_key)
+        return _backend
+
+
+def reset_llm_backend():
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+def generation_key(model, system_prompt, user_prompt, temperature):
+    raw = json.dumps([model, system_prompt, user_prompt, temperature], ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _cache_lookup(key):
+    content = (
+        GeneratedDescription.objects.filter(key=key, expires_at__gt=timezone.now())
+        .values_list("content", flat=True)
+        .first()
+    )
+    if content is not None:
+        GeneratedDescription.objects.filter(key=key).update(
+            hits=F("hits") + 1, last_used_at=timezone.now()
+        )
+    return content
+
+
+def _cache_store(key, model, content):
+    expires_at = timezone.now() + timedelta(seconds=getattr(settings, "AI_CACHE_TTL", 30 * 86400))
+    try:
+        with transaction.atomic():
+            GeneratedDescription.objects.create(
+                key=key, model=model, content=content, expires_at=expires_at
+            )
+    except IntegrityError:
+        # Outro processo gravou a mesma chave (ou havia uma entrada expirada).
+        GeneratedDescription.objects.filter(key=key).update(
+            content=content, expires_at=expires_at, last_used_at=timezone.now()
+        )
+
+
+def prune_generation_cache(max_entries=None):
+    """Remove entradas expiradas e, acima do limite, as usadas ha mais tempo."""
+    max_entries = max_entries or getattr(settings, "AI_CACHE_MAX_ENTRIES", 10_000)
+    removed, _ = GeneratedDescription.objects.filter(expires_at__lte=timezone.now()).delete()
+
+    cutoff = (
+        GeneratedDescription.objects.order_by("-last_used_at", "-id")
+        .values_list("last_used_at", flat=True)[max_entries : max_entries + 1]
+        .first()
+    )
+    if cutoff is not None:
+        evicted, _ = GeneratedDescription.objects.filter(last_used_at__lte=cutoff).delete()
+        removed += evicted
+    return removed
+
+
+def cached_completion(system_prompt, user_prompt, model=MODEL, temperature=TEMPERATURE, throttle=None):
+    """Completion com cache persistente e pedidos identicos colapsados.
+
+    So respostas bem-sucedidas sao gravadas; falhas propagam
+    DescriptionGenerationError para todos que aguardavam a mesma chave.
+    ``throttle`` (ex.: TokenBucket.acquire) roda so antes de chamar o
+    provedor: acertos do cache nao gastam nem esperam o rate limit.
+    """
+    key = generation_key(model, system_prompt, user_prompt, temperature)
+    content = _cache_lookup(key)
+    if content is not None:
+        return content
+
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = _InFlight()
+
+    if not leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        if throttle is not None:
+            throttle()
+        content = get_llm_backend().complete(
+            system_prompt, user_prompt, model=model, temperature=temperature
+        )
+        _cache_store(key, model, content)
+        call.result = content
+        return content
+    except DescriptionGenerationError as exc:
+        call.error = exc
+        raise
+    except Exception as exc:
+        call.error = DescriptionGenerationError(str(exc))
+        raise call.error from exc
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        call.done.set()
+
+
+def request_product_description(product_name, throttle=None):
+    """Gera a descricao ou levanta DescriptionGenerationError (sem fallback)."""
+    return cached_completion(SYSTEM_PROMPT, build_user_prompt(product_name), throttle=throttle)
+
+
+def generate_product_description(product_name):
+    try:
+        return request_product_description(product_name)
     except Exception:
-        return fallback
\ No newline at end of file
+        return FALLBACK_DESCRIPTION
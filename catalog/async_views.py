@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework.request import Request
+
+from catalog.cache import cache_lookup, cache_store
+from catalog.filters import filter_products, product_ordering
+from catalog.models import Category, Product
+from catalog.serializers import (
+    CategorySerializer,
+    ProductSerializer,
+    product_rows,
+    serialize_product_rows,
+)
+from catalog.views import conditional_response, product_validators
+from core.async_api import async_api_view, json_response
+from core.pagination import KeysetPagination
+from core.query_budget import query_budget
+
+# Leituras do catalogo com o ORM async, servidas pelo config.asgi (uvicorn).
+# Mesmo JSON, mesmo cache e mesma paginacao das views DRF em catalog.views.
+
+
+async def cached_json(request, build):
+    """CachedCatalogMixin.cached_response para views async.
+
+    ``build`` devolve (data, headers) ou levanta Http404; so 200 vai ao cache.
+    """
+    key, entry = await sync_to_async(cache_lookup)(request)
+    if entry is None:
+        data, headers = await build()
+        entry = await sync_to_async(cache_store)(key, data, headers)
+        state = "MISS"
+    else:
+        state = "HIT"
+
+    response = json_response(entry["data"], headers=entry["headers"])
+    response["X-Catalog-Cache"] = state
+    return response
+
+
+@query_budget(1)
+@async_api_view(["GET"])
+async def product_list(request):
+    request = Request(request)
+
+    async def build():
+        # A busca em memoria pode carregar o indice do banco na primeira vez.
+        # Sem autenticacao aqui: inativos so pela rota DRF, com usuario staff.
+        queryset = await sync_to_async(filter_products)(
+            Product.objects.select_related("category"), request.query_params
+        )
+        pagination = KeysetPagination()
+        ordering = SimpleNamespace(keyset_ordering=product_ordering(request.query_params))
+        rows = await pagination.apaginate_queryset(product_rows(queryset), request, ordering)
+        data = serialize_product_rows(rows, request)
+        response = pagination.get_paginated_response(data)
+        return response.data, response.headers
+
+    return await cached_json(request, build)
+
+
+@query_budget(1)
+@async_api_view(["GET"])
+async def product_detail(request, pk):
+    request = Request(request)
+
+    async def build():
+        try:
+            product = await Product.objects.select_related("category").aget(pk=pk)
+        except Product.DoesNotExist:
+            raise Http404("No Product matches the given query.")
+        return ProductSerializer(product, context={"request": request}).data, {}
+
+    return await cached_json(request, build)
+
+
+@query_budget(2)
+@async_api_view(["GET"])
+async def product_by_slug(request, slug):
+    drf_request = Request(request)
+
+    async def build():
+        products = Product.objects.select_related("category")
+        product = await products.filter(slug=slug).afirst()
+        if product is None:
+            product = await products.filter(slug_aliases__slug=slug.lower()).afirst()
+        if product is None:
+            raise Http404
+        data = ProductSerializer(product, context={"request": drf_request}).data
+        return data, product_validators(product)
+
+    return conditional_response(request, await cached_json(drf_request, build))
+
+
+@query_budget(1)
+@async_api_view(["GET"])
+async def category_list(request):
+    request = Request(request)
+
+    async def build():
+        categories = [category async for category in Category.objects.all()]
+        return CategorySerializer(categories, many=True).data, {}
+
+    return await cached_json(request, build)
+
+
+@query_budget(1)
+@async_api_view(["GET"])
+async def category_detail(request, pk):
+    request = Request(request)
+
+    async def build():
+        try:
+            category = await Category.objects.aget(pk=pk)
+        except Category.DoesNotExist:
+            raise Http404("No Category matches the given query.")
+        return CategorySerializer(category).data, {}
+
+    return await cached_json(request, build)
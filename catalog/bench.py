@@ -0,0 +1,93 @@
+import random
+
+from catalog.facets import rebuild_facets
+from catalog.models import Category, Product
+from catalog.search import build_search_document
+
+ADJECTIVES = [
+    "Neon", "Quantum", "Cromado", "Holografico", "Neural", "Sintetico",
+    "Orbital", "Criptografado", "Blindado", "Luminoso", "Tatico", "Modular",
+]
+NOUNS = [
+    "Camisa", "Jaqueta", "Oculos", "Fone", "Mochila", "Relogio",
+    "Teclado", "Bone", "Tenis", "Luva", "Drone", "Implante",
+]
+CATEGORY_NAMES = [
+    "Vestuario", "Acessorios", "Eletronicos", "Calcados", "Gadgets",
+    "Cibernetica", "Esportes", "Decoracao",
+]
+DESCRIPTION_WORDS = (
+    "futuro conexao neural desempenho extremo fibra sintetica bateria "
+    "autonomia resistencia impacto design ergonomico interface holografica "
+    "sincronizacao instantanea protecao termica ajuste inteligente cidade "
+    "noturna estilo cyberpunk tecnologia embarcada sensor adaptativo "
+    "materiais reciclados acabamento fosco conforto absoluto"
+).split()
+
+
+def make_description(rng):
+    headline = " ".join(rng.choices(DESCRIPTION_WORDS, k=6)).capitalize() + "."
+    paragraph = " ".join(rng.choices(DESCRIPTION_WORDS, k=60)).capitalize() + "."
+    bullets = "\n".join(
+        "- " + " ".join(rng.choices(DESCRIPTION_WORDS, k=8)) for _ in range(3)
+    )
+    return f"{headline}\n{paragraph}\n{bullets}\nGaranta o seu antes do proximo drop."
+
+
+def seed_catalog(products, categories=len(CATEGORY_NAMES), seed=42, batch_size=2000):
+    """Popula o catalogo com dados sinteticos via bulk_create.
+
+    bulk_create nao dispara signals, entao o search_document e preenchido
+    aqui, as facetas sao reconstruidas no fim e o indice em memoria precisa
+    de rebuild() depois.
+    """
+    rng = random.Random(seed)
+    category_objs = Category.objects.bulk_create(
+        [
+            Category(name=f"{CATEGORY_NAMES[i % len(CATEGORY_NAMES)]} {i}", slug=f"bench-cat-{i}")
+            for i in range(categories)
+        ]
+    )
+
+    batch = []
+    for i in range(products):
+        category = category_objs[i % len(category_objs)]
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}"
+        description = make_description(rng)
+        batch.append(
+            Product(
+                category=category,
+                name=name,
+                slug=f"bench-product-{i}",
+                description=description,
+                price=rng.randint(1000, 99999) / 100,
+                is_active=rng.random() > 0.1,
+                search_document=build_search_document(name, description, category.name),
+            )
+        )
+        if len(batch) >= batch_size:
+            Product.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Product.objects.bulk_create(batch)
+
+    rebuild_facets()
+    return category_objs
+
+
+def catalog_rows(count, categories=len(CATEGORY_NAMES), seed=42):
+    """Linhas sinteticas no formato de catalog.bulk (para import_catalog), geradas sob demanda."""
+    rng = random.Random(seed)
+    for i in range(count):
+        category = i % categories
+        yield {
+            "slug": f"import-product-{i}",
+            "name": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}",
+            "description": make_description(rng),
+            "price": f"{rng.randint(1000, 99999) / 100:.2f}",
+            "category": f"import-cat-{category}",
+            "category_name": f"{CATEGORY_NAMES[category % len(CATEGORY_NAMES)]} {category}",
+            "is_active": rng.random() > 0.1,
+            "stock": rng.choice([None, rng.randint(0, 500)]),
+            "image": "",
+        }
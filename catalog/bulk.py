@@ -0,0 +1,321 @@
+import csv
+import gzip
+import json
+import sys
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from catalog.models import Category, Product, ProductSlugAlias, legacy_slug
+from catalog.search import build_search_document
+
+# Importacao/exportacao do catalogo em CSV ou JSONL (opcionalmente .gz), em
+# streaming: o arquivo e lido linha a linha e gravado em lotes de
+# ``chunk_size``, entao a memoria depende do lote, nao do arquivo. bulk_create
+# nao dispara signals: os aliases de slug legada sao gravados aqui, quem chama
+# reconstroi facetas, busca e cache no fim, e imagens novas ou trocadas ficam
+# sem image_meta ate process_product_images.
+
+COLUMNS = ("slug", "name", "description", "price", "category", "category_name", "is_active", "stock", "image")
+# Colunas do arquivo -> campos do Product atualizados no upsert.
+UPDATE_FIELDS = {
+    "name": "name",
+    "description": "description",
+    "price": "price",
+    "category": "category",
+    "is_active": "is_active",
+    "stock": "stock",
+    "image": "image",
+}
+# Campos do search_document; os que faltarem no arquivo vem do produto existente.
+SEARCH_COLUMNS = {"name", "description", "category"}
+TRUE_VALUES = {"1", "true", "t", "yes", "sim"}
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    name = path[:-3] if path.endswith(".gz") else path
+    return "jsonl" if name.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+@contextmanager
+def open_text(path, mode="r"):
+    """Arquivo texto (gzip pela extensao); "-" e a entrada/saida padrao."""
+    if path == "-":
+        yield sys.stdin if mode == "r" else sys.stdout
+        return
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, mode + "t", encoding="utf-8", newline="") as stream:
+        yield stream
+
+
+def read_rows(stream, fmt):
+    """Gera (numero da linha, dict) sem carregar o arquivo.
+
+    No CSV toda linha traz as colunas do cabecalho, mesmo vazias: celula vazia
+    grava vazio (stock vazio = nao controlado), como sai do export_catalog.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if key in COLUMNS}
+        return
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+def parse_row(row):
+    """Valida e normaliza uma linha; levanta RowError com a causa."""
+    if not isinstance(row, dict):
+        raise RowError("linha invalida")
+    name = str(row.get("name") or "").strip()
+    if not name:
+        raise RowError("name obrigatorio")
+    try:
+        price = Decimal(str(row.get("price")))
+    except InvalidOperation:
+        raise RowError(f"price invalido: {row.get('price')!r}")
+    if not price.is_finite() or price < 0:
+        raise RowError(f"price invalido: {row.get('price')!r}")
+
+    parsed = {"name": name[:255], "price": price.quantize(Decimal("0.01")), "description": row.get("description") or ""}
+    if row.get("slug"):
+        parsed["slug"] = slugify(str(row["slug"]))[:50]
+    if row.get("category"):
+        parsed["category"] = slugify(str(row["category"]))[:50]
+        parsed["category_name"] = str(row.get("category_name") or row["category"])[:255]
+    is_active = row.get("is_active")
+    if is_active is None or is_active == "":
+        is_active = True
+    parsed["is_active"] = is_active if isinstance(is_active, bool) else str(is_active).strip().lower() in TRUE_VALUES
+    stock = row.get("stock")
+    if stock is not None and stock != "":
+        try:
+            parsed["stock"] = int(stock)
+        except (TypeError, ValueError):
+            raise RowError(f"stock invalido: {stock!r}")
+        if parsed["stock"] < 0:
+            raise RowError(f"stock invalido: {stock!r}")
+    else:
+        parsed["stock"] = None
+    parsed["image"] = row.get("image") or ""
+    return parsed
+
+
+class CategoryMap:
+    """slug -> (id, nome), carregado uma vez; categorias novas sao criadas por lote."""
+
+    def __init__(self):
+        self.categories = {slug: (pk, name) for pk, slug, name in Category.objects.values_list("pk", "slug", "name")}
+
+    def resolve(self, rows):
+        missing = {}
+        for row in rows:
+            slug = row.get("category")
+            if slug and slug not in self.categories:
+                missing.setdefault(slug, row["category_name"])
+        if missing:
+            Category.objects.bulk_create(
+                [Category(name=name, slug=slug) for slug, name in missing.items()], ignore_conflicts=True
+            )
+            for pk, slug, name in Category.objects.filter(slug__in=missing).values_list("pk", "slug", "name"):
+                self.categories[slug] = (pk, name)
+        return self.categories
+
+
+def assign_slugs(rows):
+    """Slugs unicos (nome-2, nome-3, ...) para as linhas sem slug, uma query por rodada."""
+    pending = [row for row in rows if not row.get("slug")]
+    if not pending:
+        return
+    taken = {row["slug"] for row in rows if row.get("slug")}
+    bases = [slugify(row["name"])[:40] or "produto" for row in pending]
+    suffixes = [0] * len(pending)
+
+    def candidate(index):
+        return bases[index] if suffixes[index] == 0 else f"{bases[index]}-{suffixes[index] + 1}"
+
+    unresolved = list(range(len(pending)))
+    while unresolved:
+        candidates = {candidate(index) for index in unresolved}
+        existing = set(Product.objects.filter(slug__in=candidates).values_list("slug", flat=True))
+        retry = []
+        for index in unresolved:
+            slug = candidate(index)
+            if slug in existing or slug in taken:
+                suffixes[index] += 1
+                retry.append(index)
+            else:
+                taken.add(slug)
+                pending[index]["slug"] = slug
+        unresolved = retry
+
+
+def upsert_chunk(rows, columns, categories, annotate_reserved=None):
+    """Grava linhas com as mesmas ``columns`` com bulk_create(update_conflicts=True) pela slug."""
+    categories = categories.resolve(rows)
+    assign_slugs(rows)
+    # A mesma slug duas vezes no lote quebraria o ON CONFLICT: vale a ultima.
+    by_slug = {row["slug"]: row for row in rows}
+    current = {}
+    if not SEARCH_COLUMNS <= columns or columns & {"stock", "image"}:
+        existing = Product.objects.filter(slug__in=by_slug)
+        fields = ["slug", "name", "description", "category__name", "stock", "image", "image_meta"]
+        if annotate_reserved is not None:
+            existing, fields = annotate_reserved(existing), fields + ["reserved"]
+        current = {row["slug"]: row for row in existing.values(*fields)}
+    products = []
+    for slug, row in by_slug.items():
+        category_id, category_name = categories.get(row.get("category"), (None, ""))
+        document = {"name": row["name"], "description": row["description"], "category_name": category_name}
+        stock, image_meta = row["stock"], {}
+        existing = current.get(slug)
+        if existing:
+            for column, key, field in (
+                ("name", "name", "name"),
+                ("description", "description", "description"),
+                ("category", "category_name", "category__name"),
+            ):
+                if column not in columns:
+                    document[key] = existing[field] or ""
+            # Com reserva ativa, stock ja e o disponivel depois das baixas: o
+            # numero do arquivo somado a devolucao da reserva passaria do real.
+            if existing.get("reserved"):
+                stock = existing["stock"]
+            # Imagem trocada perde o image_meta antigo (dimensoes, blurhash, derivados).
+            if existing["image"] == row["image"]:
+                image_meta = existing["image_meta"]
+        products.append(
+            Product(
+                slug=slug,
+                name=row["name"],
+                description=row["description"],
+                price=row["price"],
+                category_id=category_id,
+                is_active=row["is_active"],
+                stock=stock,
+                image=row["image"],
+                image_meta=image_meta,
+                search_document=build_search_document(**document),
+            )
+        )
+    update_fields = {UPDATE_FIELDS[column] for column in columns if column in UPDATE_FIELDS}
+    if "image" in columns:
+        update_fields.add("image_meta")
+    Product.objects.bulk_create(
+        products,
+        update_conflicts=True,
+        unique_fields=["slug"],
+        update_fields=sorted(update_fields | {"search_document", "updated_at"}),
+    )
+    record_legacy_slugs(by_slug)
+    return len(products)
+
+
+def record_legacy_slugs(by_slug):
+    """Como o signal record_legacy_slug: a slug antiga (do nome) aponta para o produto."""
+    aliases = {legacy_slug(row["name"]): slug for slug, row in by_slug.items()}
+    aliases = {alias: slug for alias, slug in aliases.items() if alias and alias != slug}
+    if not aliases:
+        return
+    ids = dict(Product.objects.filter(slug__in=set(aliases.values())).values_list("slug", "pk"))
+    ProductSlugAlias.objects.bulk_create(
+        [ProductSlugAlias(slug=alias, product_id=ids[slug]) for alias, slug in aliases.items()],
+        update_conflicts=True,
+        unique_fields=["slug"],
+        update_fields=["product"],
+    )
+
+
+def import_rows(rows, chunk_size=2000, on_error=None, on_chunk=None, annotate_reserved=None):
+    """Importa ``(numero, linha)`` em lotes; devolve {"rows", "written", "errors"}.
+
+    So as colunas presentes em cada linha (no CSV, as do cabecalho) sao
+    atualizadas em produtos existentes: um CSV sem ``stock`` nao zera o estoque
+    de ninguem. ``annotate_reserved`` (orders.inventory.annotate_reserved) marca
+    os produtos com reserva ativa, cujo estoque nunca e sobrescrito.
+    ``on_chunk`` roda depois de cada lote gravado.
+    """
+    categories = CategoryMap()
+    stats = {"rows": 0, "written": 0, "errors": 0}
+    chunk = []
+
+    def flush():
+        with transaction.atomic():
+            # Linhas seguidas com as mesmas colunas vao juntas; a ordem do arquivo se mantem.
+            start = 0
+            for end in range(1, len(chunk) + 1):
+                if end == len(chunk) or chunk[end][1] != chunk[start][1]:
+                    rows = [parsed for parsed, _ in chunk[start:end]]
+                    stats["written"] += upsert_chunk(rows, chunk[start][1], categories, annotate_reserved)
+                    start = end
+        chunk.clear()
+        if on_chunk is not None:
+            on_chunk()
+
+    for number, row in rows:
+        stats["rows"] += 1
+        try:
+            parsed = parse_row(row)
+        except RowError as exc:
+            stats["errors"] += 1
+            if on_error is not None:
+                on_error(number, exc)
+            continue
+        chunk.append((parsed, frozenset(key for key in row if key in COLUMNS)))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return stats
+
+
+EXPORT_FIELDS = (
+    "slug", "name", "description", "price", "category__slug", "category__name", "is_active", "stock", "image",
+)
+
+
+def export_rows(queryset=None, chunk_size=2000):
+    """Linhas do catalogo no formato de COLUMNS, lidas com .iterator()."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    values = queryset.order_by("id").values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for slug, name, description, price, category, category_name, is_active, stock, image in values:
+        yield {
+            "slug": slug,
+            "name": name,
+            "description": description or "",
+            "price": str(price),
+            "category": category,
+            "category_name": category_name,
+            "is_active": is_active,
+            "stock": stock,
+            "image": image or "",
+        }
+
+
+def write_rows(rows, stream, fmt):
+    """Grava as linhas em CSV ou JSONL; devolve quantas foram escritas."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=COLUMNS, lineterminator="\n")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({key: "" if value is None else value for key, value in row.items()})
+            count += 1
+        return count
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+        count += 1
+    return count
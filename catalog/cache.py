@@ -0,0 +1,117 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+VERSION_KEY = "catalog:version"
+HITS_KEY = "catalog:cache:hits"
+MISSES_KEY = "catalog:cache:misses"
+CACHED_HEADERS = ("ETag", "Last-Modified", "Link")
+
+
+def get_cache():
+    return caches[getattr(settings, "CATALOG_CACHE_ALIAS", "default")]
+
+
+def _incr(key, cache=None):
+    cache = cache or get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def catalog_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Se a chave for despejada, recomeca de um valor que nunca foi usado,
+        # para nao ressuscitar entradas antigas com o mesmo numero.
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache = get_cache()
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        catalog_version()
+        return cache.incr(VERSION_KEY)
+
+
+def invalidate_catalog():
+    # Incrementa agora (mesma transacao/processo) e de novo no commit, para
+    # que uma leitura concorrente nao grave dados antigos na versao nova.
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+
+def cache_stats():
+    cache = get_cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "version": catalog_version(),
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else 0.0,
+    }
+
+
+def response_cache_key(request, staff=False):
+    # A equipe enxerga inativos (?active=false/all): entradas separadas.
+    url = request.build_absolute_uri().encode()
+    scope = "staff:" if staff else ""
+    return f"catalog:v{catalog_version()}:{scope}{hashlib.sha1(url).hexdigest()}"
+
+
+def cache_lookup(request, staff=False):
+    """(chave, entrada ou None) da URL da requisicao; conta o hit ou o miss."""
+    cache = get_cache()
+    key = response_cache_key(request, staff)
+    entry = cache.get(key)
+    _incr(MISSES_KEY if entry is None else HITS_KEY, cache)
+    return key, entry
+
+
+def cache_store(key, data, headers):
+    entry = {"data": data, "headers": {name: headers[name] for name in CACHED_HEADERS if name in headers}}
+    get_cache().set(key, entry, getattr(settings, "CATALOG_CACHE_TIMEOUT", 300))
+    return entry
+
+
+class CachedCatalogMixin:
+    """Serve list/retrieve do cache, chaveado pela versao do catalogo.
+
+    Qualquer escrita no catalogo incrementa a versao, o que torna todas as
+    entradas antigas inalcancaveis de uma vez; elas expiram pelo timeout.
+    """
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        key, entry = cache_lookup(request, request.user.is_staff)
+
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = cache_store(key, response.data, response)
+            state = "MISS"
+        else:
+            state = "HIT"
+
+        response = Response(entry["data"], headers=entry["headers"])
+        response["X-Catalog-Cache"] = state
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
@@ -0,0 +1,175 @@
+from bisect import bisect_right
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+
+from catalog.filters import filter_products, parse_active
+from catalog.models import Category, Product, ProductFacet
+
+# Facetas da listagem: contagem por categoria, faixa de preco e ativo/inativo.
+# Sem busca, tudo sai da tabela ProductFacet (poucas linhas, atualizadas por
+# delta nos signals); com ?search= ou faixa de preco, o GROUP BY roda so sobre
+# os resultados.
+
+FACET_FIELDS = ("category_id", "price_bucket", "is_active")
+
+
+def price_bounds():
+    """Limites das faixas: (50, 100) gera [0, 50), [50, 100) e [100, ...)."""
+    return [Decimal(str(bound)) for bound in settings.CATALOG_PRICE_BUCKETS]
+
+
+def price_bucket(price, bounds=None):
+    return bisect_right(bounds or price_bounds(), Decimal(str(price)))
+
+
+def price_bucket_expression(bounds=None):
+    bounds = bounds or price_bounds()
+    return Case(
+        *[When(price__lt=bound, then=Value(index)) for index, bound in enumerate(bounds)],
+        default=Value(len(bounds)),
+    )
+
+
+def facet_key(category_id, price, is_active):
+    return (category_id, price_bucket(price), bool(is_active))
+
+
+def _key_filter(key):
+    return Q(**dict(zip(FACET_FIELDS, key)))
+
+
+def apply_facet_deltas(deltas):
+    """Soma ``{(category_id, bucket, is_active): delta}`` na tabela, num UPDATE so.
+
+    As linhas de cada categoria ja existem com zero (ensure_category_facets);
+    se faltar alguma (categoria criada via bulk_create), ela e criada aqui.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    matching = reduce(or_, (_key_filter(key) for key in deltas))
+    updated = ProductFacet.objects.filter(matching).update(
+        count=F("count") + Case(*[When(_key_filter(key), then=Value(d)) for key, d in deltas.items()], default=Value(0))
+    )
+    if updated < len(deltas):
+        existing = set(ProductFacet.objects.filter(matching).values_list(*FACET_FIELDS))
+        # Decremento de linha inexistente: a categoria acabou de ser apagada (CASCADE).
+        ProductFacet.objects.bulk_create(
+            [
+                ProductFacet(**dict(zip(FACET_FIELDS, key)), count=delta)
+                for key, delta in deltas.items()
+                if key not in existing and delta > 0
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def empty_facets(category_ids, bounds=None):
+    buckets = range(len(bounds or price_bounds()) + 1)
+    return [
+        ProductFacet(category_id=category_id, price_bucket=bucket, is_active=is_active, count=0)
+        for category_id in category_ids
+        for bucket in buckets
+        for is_active in (True, False)
+    ]
+
+
+def ensure_category_facets(category_id):
+    ProductFacet.objects.bulk_create(empty_facets([category_id]), ignore_conflicts=True)
+
+
+def _grouped(queryset, bounds=None, *fields):
+    return (
+        queryset.order_by()
+        .values("category_id", "is_active", *fields, price_bucket=price_bucket_expression(bounds))
+        .annotate(count=Count("id"))
+    )
+
+
+def live_facet_counts(queryset=None):
+    """Mesmas contagens da tabela, por GROUP BY sobre ``queryset`` (padrao: tudo)."""
+    rows = _grouped(Product.objects.all() if queryset is None else queryset)
+    return {(row["category_id"], row["price_bucket"], row["is_active"]): row["count"] for row in rows}
+
+
+def stored_facet_counts():
+    rows = ProductFacet.objects.exclude(count=0).values_list(*FACET_FIELDS, "count")
+    return {tuple(row[:3]): row[3] for row in rows}
+
+
+def build_facet_rows():
+    """Linhas da tabela recalculadas do zero."""
+    bounds = price_bounds()
+    rows = {
+        (row.category_id, row.price_bucket, row.is_active): row
+        for row in empty_facets([None, *Category.objects.values_list("pk", flat=True)], bounds)
+    }
+    for row in _grouped(Product.objects.all(), bounds):
+        rows[(row["category_id"], row["price_bucket"], row["is_active"])].count = row["count"]
+    return list(rows.values())
+
+
+def rebuild_facets():
+    with transaction.atomic():
+        ProductFacet.objects.all().delete()
+        ProductFacet.objects.bulk_create(build_facet_rows(), batch_size=1000)
+
+
+def facet_counts(params, staff=False):
+    """Facetas para os filtros da listagem (catalog.filters).
+
+    Cada dimensao ignora o proprio filtro (a contagem por categoria ignora
+    ?category=, a de ativos ignora ?active=) para mostrar as alternativas;
+    faixas de preco e total respeitam todos. Sem ``staff``, inativos nao contam.
+    """
+    category_slug = params.get("category")
+    active = parse_active(params, staff)
+    names = ("category__name", "category__slug")
+    live_params = {name: params.get(name) for name in ("search", "min_price", "max_price")}
+    if any(live_params.values()):
+        # Busca e faixa de preco livres nao cabem na tabela: GROUP BY so sobre o resultado.
+        matches = filter_products(Product.objects.all(), {**live_params, "active": "all"}, staff=True, limit=False)
+        rows = _grouped(matches, None, *names)
+    else:
+        rows = ProductFacet.objects.filter(count__gt=0).values(*FACET_FIELDS, *names, "count")
+
+    bounds = price_bounds()
+    categories = {}
+    buckets = [0] * (len(bounds) + 1)
+    active_counts = {"true": 0, "false": 0}
+    for row in rows:
+        if not staff and not row["is_active"]:
+            continue
+        in_category = not category_slug or row["category__slug"] == category_slug
+        in_active = active is None or row["is_active"] == active
+        if in_active and row["category_id"] is not None:
+            entry = categories.setdefault(
+                row["category_id"],
+                {"id": row["category_id"], "name": row["category__name"], "slug": row["category__slug"], "count": 0},
+            )
+            entry["count"] += row["count"]
+        if in_category:
+            active_counts["true" if row["is_active"] else "false"] += row["count"]
+        if in_category and in_active:
+            buckets[row["price_bucket"]] += row["count"]
+
+    edges = [None, *bounds, None]
+    return {
+        "total": sum(buckets),
+        "categories": sorted(categories.values(), key=lambda entry: (-entry["count"], entry["name"])),
+        "price_ranges": [
+            {
+                "min": f"{edges[index] or 0:.2f}",
+                "max": None if edges[index + 1] is None else f"{edges[index + 1]:.2f}",
+                "count": count,
+            }
+            for index, count in enumerate(buckets)
+        ],
+        "is_active": active_counts,
+    }
@@ -0,0 +1,53 @@
+import re
+from itertools import islice
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from catalog.serializers import product_rows, serialize_product_rows
+from core.async_api import iterate_in_thread
+
+# Feed NDJSON do catalogo (/api/products/feed/) para o build do site estatico:
+# um produto por linha, com os mesmos bytes de cada item da listagem. As linhas
+# saem do banco com .iterator() (cursor do lado do servidor no Postgres) e vao
+# para a resposta lote a lote, entao memoria e tempo ate o primeiro byte nao
+# crescem com o catalogo.
+
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+_renderer = JSONRenderer()
+
+
+class NDJSONRenderer(BaseRenderer):
+    """So para a negociacao do DRF (Accept: application/x-ndjson) e para os erros,
+    que viram uma linha; o feed em si nao passa por aqui."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return _renderer.render(data) + b"\n"
+
+
+def feed_chunks(queryset, request=None, chunk_size=None):
+    """Bytes NDJSON, um bloco por lote de ``chunk_size`` produtos (ordem por id)."""
+    chunk_size = chunk_size or settings.CATALOG_FEED_CHUNK_SIZE
+    rows = product_rows(queryset).order_by("id").iterator(chunk_size=chunk_size)
+    while batch := list(islice(rows, chunk_size)):
+        yield b"".join(_renderer.render(item) + b"\n" for item in serialize_product_rows(batch, request))
+
+
+def feed_response(request, chunks):
+    """StreamingHttpResponse com gzip quando o cliente aceita (Accept-Encoding)."""
+    response = StreamingHttpResponse(content_type="application/x-ndjson")
+    patch_vary_headers(response, ("Accept-Encoding",))
+    if ACCEPTS_GZIP.search(request.META.get("HTTP_ACCEPT_ENCODING", "")):
+        chunks = compress_sequence(chunks)
+        response["Content-Encoding"] = "gzip"
+    if isinstance(request, ASGIRequest):
+        chunks = iterate_in_thread(chunks)
+    response.streaming_content = chunks
+    return response
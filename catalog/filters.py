@@ -0,0 +1,82 @@
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+
+from catalog.search import get_search_backend, limit_results
+from core.pagination import KeysetPagination
+
+# Filtros e ordenacoes da listagem de produtos (DRF, views async e facetas).
+# Cada combinacao cai num indice de catalog_product (ver Product.Meta e
+# catalog/tests.py, que confere o EXPLAIN):
+#   is_active + category + preco/ordem por preco -> (is_active, category_id, price, id)
+#   is_active + preco/ordem por preco            -> (is_active, price, id)
+#   is_active + category + ordem por data        -> (is_active, category_id, created_at, id)
+#   is_active + ordem por data                   -> (is_active, created_at, id)
+
+ORDERINGS = {
+    "-created_at": KeysetPagination.ordering,
+    "created_at": ("created_at", "id"),
+    "price": ("price", "id"),
+    "-price": ("-price", "-id"),
+}
+ACTIVE_CHOICES = {"true": True, "false": False, "all": None}
+
+
+def parse_price(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        price = None
+    if price is None or not price.is_finite() or price < 0:
+        raise ValidationError({name: "Informe um preco valido."})
+    return price
+
+
+def parse_active(params, staff=False):
+    value = params.get("active", "true")
+    if value not in ACTIVE_CHOICES:
+        raise ValidationError({"active": f"Use um de: {', '.join(ACTIVE_CHOICES)}."})
+    # Inativos (false/all) so para a equipe; para os demais e sempre true.
+    return ACTIVE_CHOICES[value] if staff else True
+
+
+def filter_products(queryset, params, staff=False, limit=True):
+    """?active= (so ativos; false/all so com ``staff``), ?category=, ?min_price=, ?max_price= e ?search=.
+
+    A busca devolve no maximo CATALOG_SEARCH_MAX_RESULTS produtos; ``limit=False``
+    (facetas) conta todos.
+    """
+    active = parse_active(params, staff)
+    min_price = parse_price(params, "min_price")
+    max_price = parse_price(params, "max_price")
+    category_slug = params.get("category")
+    search = params.get("search")
+
+    if active is not None:
+        # is_active=True vira "WHERE is_active", que o SQLite nao casa com a
+        # primeira coluna dos indices compostos; IN (...) vira igualdade.
+        queryset = queryset.filter(is_active__in=[active])
+    if category_slug:
+        queryset = queryset.filter(category__slug=category_slug)
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+    if search:
+        queryset = get_search_backend(queryset.db).search(queryset, search)
+        if limit:
+            queryset = limit_results(queryset)
+    return queryset
+
+
+def product_ordering(params):
+    """?ordering= (price, -price, created_at, -created_at); busca ordena por relevancia."""
+    ordering = params.get("ordering")
+    if not ordering:
+        return ("-search_rank", "-id") if params.get("search") else ORDERINGS["-created_at"]
+    if ordering not in ORDERINGS:
+        raise ValidationError({"ordering": f"Use um de: {', '.join(ORDERINGS)}."})
+    return ORDERINGS[ordering]
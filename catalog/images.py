@@ -0,0 +1,143 @@
+import io
+import logging
+import math
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+# --- Blurhash (https://blurha.sh), encoder em Python puro ---
+# A imagem ja chega reduzida (BLURHASH_SIZE), entao o custo e fixo por upload.
+
+BLURHASH_SIZE = 32
+
+
+def _base83(value, length):
+    return "".join(BASE83[value // 83 ** (length - i) % 83] for i in range(1, length + 1))
+
+
+def _to_linear(value):
+    value = value / 255
+    return value / 12.92 if value <= 0.04045 else ((value + 0.055) / 1.055) ** 2.4
+
+
+def _to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def blurhash(image, x_components=4, y_components=3):
+    """Blurhash de uma imagem PIL (qualquer modo)."""
+    image = image.convert("RGB")
+    image.thumbnail((BLURHASH_SIZE, BLURHASH_SIZE))
+    width, height = image.size
+    table = [_to_linear(value) for value in range(256)]
+    data = image.tobytes()
+    linear = [(table[data[k]], table[data[k + 1]], table[data[k + 2]]) for k in range(0, len(data), 3)]
+
+    factors = []
+    for j in range(y_components):
+        cos_y = [math.cos(math.pi * j * y / height) for y in range(height)]
+        for i in range(x_components):
+            cos_x = [math.cos(math.pi * i * x / width) for x in range(width)]
+            norm = (1 if i == j == 0 else 2) / (width * height)
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                for x in range(width):
+                    basis = cos_x[x] * cos_y[y]
+                    pr, pg, pb = linear[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            factors.append((r * norm, g * norm, b * norm))
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83(x_components - 1 + (y_components - 1) * 9, 1)
+    if ac:
+        quantised_max = max(0, min(82, math.floor(max(abs(c) for f in ac for c in f) * 166 - 0.5)))
+        maximum = (quantised_max + 1) / 166
+    else:
+        quantised_max, maximum = 0, 1
+    result += _base83(quantised_max, 1)
+    result += _base83((_to_srgb(dc[0]) << 16) + (_to_srgb(dc[1]) << 8) + _to_srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (
+            max(0, min(18, math.floor(_sign_pow(c / maximum, 0.5) * 9 + 9.5))) for c in factor
+        )
+        result += _base83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+# --- Derivados de Product.image ---
+# Product.image_meta (compacto, gravado uma vez por upload):
+#   {"src": nome do original, "w": largura, "h": altura, "bh": blurhash,
+#    "v": [[largura, altura, url do WebP], ...]}
+# As URLs ja vem do storage: o serializer nao chama o Cloudinary.
+
+
+def variant_widths(width):
+    # O maior derivado e o proprio original em WebP, limitado a maior largura.
+    largest = min(width, max(settings.PRODUCT_IMAGE_WIDTHS))
+    return sorted(w for w in settings.PRODUCT_IMAGE_WIDTHS if w < largest) + [largest]
+
+
+def build_image_meta(name, storage):
+    """Le o original do storage e grava os derivados WebP ao lado dele."""
+    from PIL import Image, ImageOps
+
+    with storage.open(name) as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+    width, height = image.size
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    variants = []
+    for variant_width in variant_widths(width):
+        variant_height = max(1, round(height * variant_width / width))
+        resized = image if variant_width == width else image.resize((variant_width, variant_height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, "WEBP", quality=settings.PRODUCT_IMAGE_QUALITY, method=4)
+        saved = storage.save(f"products/derived/{stem}-{variant_width}w.webp", ContentFile(buffer.getvalue()))
+        variants.append([variant_width, variant_height, storage.url(saved)])
+
+    return {"src": name, "w": width, "h": height, "bh": blurhash(image), "v": variants}
+
+
+def process_product_image(product):
+    """Atualiza product.image_meta se o original mudou. Devolve True se gravou.
+
+    Original ilegivel (arquivo sumiu, formato invalido, erro do storage ou do
+    Pillow) fica registrado so com "src", para nao ser baixado de novo a cada save.
+    """
+    from catalog.models import Product
+
+    name = product.image.name or ""
+    if (product.image_meta or {}).get("src", "") == name:
+        return False
+
+    meta = {}
+    if name:
+        try:
+            meta = build_image_meta(name, product.image.storage)
+        except Exception:
+            logger.exception("Imagem do produto %s nao processada (%s)", product.pk, name)
+            meta = {"src": name}
+
+    product.image_meta = meta
+    Product.objects.filter(pk=product.pk).update(image_meta=meta)
+    return True
@@ -0,0 +1,222 @@
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from catalog.ai_services import (
+    DescriptionGenerationError,
+    prune_generation_cache,
+    request_product_description,
+)
+from catalog.cache import invalidate_catalog
+from catalog.models import DescriptionJob, DescriptionJobItem
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Limita as chamadas ao provedor a ``rate`` por segundo, com rajadas de ``capacity``."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+def job_settings():
+    return {
+        "workers": getattr(settings, "AI_JOB_WORKERS", 4),
+        "rate": getattr(settings, "AI_REQUESTS_PER_SECOND", 2.0),
+        "max_attempts": getattr(settings, "AI_MAX_ATTEMPTS", 3),
+        "backoff": getattr(settings, "AI_RETRY_BACKOFF", 1.0),
+        "lease": getattr(settings, "AI_JOB_LEASE", 300),
+    }
+
+
+def create_description_job(products, user=None):
+    product_ids = list(products.values_list("id", flat=True))
+    with transaction.atomic():
+        job = DescriptionJob.objects.create(
+            total=len(product_ids),
+            created_by=user if user and user.is_authenticated else None,
+        )
+        DescriptionJobItem.objects.bulk_create(
+            [DescriptionJobItem(job=job, product_id=product_id) for product_id in product_ids]
+        )
+    return job
+
+
+def generate_with_retry(product_name, bucket, max_attempts, backoff, sleep=time.sleep):
+    """Chama o LLM com retry e backoff exponencial. Roda nas threads do pool.
+
+    Nao escreve no Product: devolve (descricao ou None, tentativas, ultimo erro).
+    """
+    error = ""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            # O token so e consumido numa falta do cache, logo antes do provedor.
+            return request_product_description(product_name, throttle=bucket.acquire), attempt, ""
+        except DescriptionGenerationError as exc:
+            error = str(exc)
+            if attempt < max_attempts:
+                sleep(backoff * 2 ** (attempt - 1) + random.uniform(0, backoff))
+    return None, max_attempts, error
+
+
+def generate_in_pool(*args):
+    try:
+        return generate_with_retry(*args)
+    finally:
+        # O cache de geracao consulta o banco; cada thread do pool fecha a sua conexao.
+        connections.close_all()
+
+
+class LeaseLost(Exception):
+    """Outro processo retomou o job (lease vencido); este para de escrever."""
+
+
+def claim_job(job_id, token):
+    """Pega o job se estiver pendente ou rodando com o lease vencido."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=job_settings()["lease"])
+    return DescriptionJob.objects.filter(
+        Q(status=DescriptionJob.STATUS_PENDING)
+        | Q(status=DescriptionJob.STATUS_RUNNING, heartbeat_at__lt=stale)
+        | Q(status=DescriptionJob.STATUS_RUNNING, heartbeat_at=None),
+        pk=job_id,
+    ).update(
+        status=DescriptionJob.STATUS_RUNNING,
+        claimed_by=token,
+        heartbeat_at=now,
+        started_at=Coalesce("started_at", Value(now)),
+    )
+
+
+def record_result(item, description, attempts, error, token):
+    """Grava o resultado de um item e renova o lease; LeaseLost se o job mudou de dono."""
+    failed = description is None
+    with transaction.atomic():
+        if not DescriptionJob.objects.filter(pk=item.job_id, claimed_by=token).update(heartbeat_at=timezone.now()):
+            raise LeaseLost(item.job_id)
+        # Item ja gravado (por um dono anterior) nao conta de novo.
+        updated = DescriptionJobItem.objects.filter(pk=item.pk, status=DescriptionJobItem.STATUS_PENDING).update(
+            status=DescriptionJobItem.STATUS_FAILED if failed else DescriptionJobItem.STATUS_DONE,
+            attempts=attempts,
+            error=error,
+        )
+        if not updated:
+            return
+        counter = "failed" if failed else "succeeded"
+        DescriptionJob.objects.filter(pk=item.job_id).update(**{counter: F(counter) + 1})
+        if not failed:
+            product = item.product
+            product.description = description
+            product.save(update_fields=["description", "updated_at"])
+
+
+def finish_job(job_id, token):
+    job = DescriptionJob.objects.get(pk=job_id)
+    status = (
+        DescriptionJob.STATUS_FAILED
+        if job.total and job.failed == job.total
+        else DescriptionJob.STATUS_DONE
+    )
+    DescriptionJob.objects.filter(pk=job_id, claimed_by=token).update(status=status, finished_at=timezone.now())
+    job.refresh_from_db()
+    return job
+
+
+def process_job(job_id, token, workers):
+    options = job_settings()
+    bucket = TokenBucket(options["rate"])
+    retry = (bucket, options["max_attempts"], options["backoff"])
+    items = list(
+        DescriptionJobItem.objects.filter(job_id=job_id, status=DescriptionJobItem.STATUS_PENDING)
+        .select_related("product")
+    )
+
+    if workers <= 1:
+        for item in items:
+            record_result(item, *generate_with_retry(item.product.name, *retry), token)
+        return
+
+    # So as chamadas ao LLM vao para o pool; as escritas ficam nesta
+    # thread, conforme cada resultado chega (um unico writer, o que
+    # tambem evita "database is locked" no SQLite).
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ai-job") as pool:
+        futures = {
+            pool.submit(generate_in_pool, item.product.name, *retry): item
+            for item in items
+        }
+        try:
+            for future in as_completed(futures):
+                record_result(futures[future], *future.result(), token)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def run_description_job(job_id, workers=None):
+    """Processa o job se conseguir o lease; devolve o job ou None se outro o tem."""
+    token = uuid.uuid4().hex
+    if not claim_job(job_id, token):
+        return None
+
+    try:
+        process_job(job_id, token, workers or job_settings()["workers"])
+    except LeaseLost:
+        logger.warning("Job de descricao #%s retomado por outro processo.", job_id)
+        return None
+    except Exception:
+        # Erro inesperado: o job nao fica "running" para sempre.
+        logger.exception("Job de descricao #%s falhou.", job_id)
+        DescriptionJob.objects.filter(pk=job_id, claimed_by=token).update(
+            status=DescriptionJob.STATUS_FAILED, finished_at=timezone.now()
+        )
+        return DescriptionJob.objects.get(pk=job_id)
+
+    job = finish_job(job_id, token)
+    invalidate_catalog()
+    prune_generation_cache()
+    return job
+
+
+def start_description_job(job_id):
+    """Roda o job numa thread do proprio processo web, sem bloquear o admin."""
+
+    def target():
+        close_old_connections()
+        try:
+            run_description_job(job_id)
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=target, name=f"ai-job-{job_id}", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,85 @@
+import json
+import time
+import tracemalloc
+import zlib
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from catalog.bench import seed_catalog
+from catalog.models import Product
+from catalog.serializers import product_rows, serialize_product_rows
+from core.bench import scratch_database
+from core.models import User
+
+
+def consume(request, gzipped=False):
+    """(segundos ate a primeira linha, segundos no total, bytes) de ``request()``."""
+    # O gzip manda o cabecalho antes de tudo: conta a primeira linha descomprimida.
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+    start = time.perf_counter()
+    first = None
+    size = 0
+    for chunk in request():
+        if first is None and (decoder.decompress(chunk) if decoder else chunk):
+            first = time.perf_counter() - start
+        size += len(chunk)
+    return first, time.perf_counter() - start, size
+
+
+def traced_peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede /api/products/feed/ (NDJSON, com e sem gzip) contra o catalogo "
+        "inteiro num array JSON: tempo ate o primeiro byte, linhas/s e pico de memoria."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 200_000])
+
+    def handle(self, *args, **options):
+        client = Client()
+        renderer = JSONRenderer()
+        auth = {}
+
+        def feed(**headers):
+            # ?active=all (inativos inclusos) so vale para staff.
+            return client.get("/api/products/feed/", {"active": "all"}, headers={**auth, **headers}).streaming_content
+
+        def full_array():
+            # O que o build faz hoje: a listagem inteira montada antes do primeiro byte.
+            return [renderer.render(serialize_product_rows(product_rows(Product.objects.order_by("id"))))]
+
+        results = []
+        for size in options["sizes"]:
+            with scratch_database(concurrent=True):
+                seed_catalog(size)
+                admin = User.objects.create_user(email="bench@example.com", password=None, is_staff=True)
+                auth["authorization"] = f"Bearer {RefreshToken.for_user(admin).access_token}"
+                entry = {"products": size}
+                for label, fn in (
+                    ("feed", lambda: consume(feed)),
+                    ("feed_gzip", lambda: consume(lambda: feed(accept_encoding="gzip"), gzipped=True)),
+                    ("json_array", lambda: consume(full_array)),
+                ):
+                    first, elapsed, body = fn()
+                    entry[label] = {
+                        "ttfb_ms": round(first * 1000, 1),
+                        "seconds": round(elapsed, 2),
+                        "rows_per_sec": round(size / elapsed),
+                        "body_mb": round(body / 2**20, 1),
+                        "peak_mb": traced_peak_mb(fn),
+                    }
+                results.append(entry)
+
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,64 @@
+import json
+import os
+import resource
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from catalog.bench import catalog_rows
+from catalog.bulk import open_text, write_rows
+from catalog.models import Product
+from core.bench import scratch_database
+
+
+def peak_rss_mb():
+    # ru_maxrss e o pico do processo inteiro (KB no Linux).
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera um catalogo sintetico (1M de linhas por padrao) num arquivo temporario "
+        "e mede import_catalog (insercao e reimportacao/upsert) e export_catalog: "
+        "linhas/s e pico de memoria."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rows, fmt = options["rows"], options["format"]
+        result = {"vendor": connection.vendor, "rows": rows, "format": fmt, "chunk_size": options["chunk_size"]}
+        # SQLite em arquivo: em memoria, o proprio banco entraria no RSS medido.
+        with tempfile.TemporaryDirectory(prefix="catalog-io-") as tmp, scratch_database(concurrent=True):
+            source = os.path.join(tmp, f"catalog.{fmt}")
+            exported = os.path.join(tmp, f"export.{fmt}")
+
+            start = time.perf_counter()
+            with open_text(source, "w") as stream:
+                write_rows(catalog_rows(rows), stream, fmt)
+            result["fixture"] = self.phase(rows, start, path=source)
+
+            for label in ("import", "reimport"):
+                start = time.perf_counter()
+                call_command("import_catalog", source, chunk_size=options["chunk_size"], stdout=self.stderr)
+                result[label] = self.phase(rows, start)
+            assert Product.objects.count() == rows
+
+            start = time.perf_counter()
+            call_command("export_catalog", exported, chunk_size=options["chunk_size"], stderr=self.stderr)
+            result["export"] = self.phase(rows, start, path=exported)
+
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def phase(self, rows, start, path=None):
+        elapsed = time.perf_counter() - start
+        entry = {"seconds": round(elapsed, 2), "rows_per_sec": round(rows / elapsed), "peak_rss_mb": peak_rss_mb()}
+        if path:
+            entry["file_mb"] = round(os.path.getsize(path) / 2**20, 1)
+        return entry
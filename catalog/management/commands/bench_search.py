@@ -0,0 +1,57 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from catalog.bench import ADJECTIVES, NOUNS, seed_catalog
+from catalog.models import Product
+from catalog.search import get_search_backend, reset_search_backends
+from core.bench import scratch_database, summarize, timed
+
+
+class Command(BaseCommand):
+    help = "Compara a latencia da busca indexada com o caminho icontains antigo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000])
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        queries = [rng.choice(ADJECTIVES) for _ in range(5)]
+        queries += [rng.choice(NOUNS).lower()[:3] for _ in range(5)]
+        queries += ["neural bateria", "cyberpunk", "holografico camisa"]
+
+        results = []
+        for size in options["sizes"]:
+            with scratch_database():
+                reset_search_backends()
+                seed_catalog(size)
+                backend = get_search_backend()
+                backend.rebuild()
+
+                def icontains():
+                    term = rng.choice(queries)
+                    list(
+                        Product.objects.filter(
+                            models.Q(name__icontains=term)
+                            | models.Q(description__icontains=term)
+                        ).values_list("id", flat=True)
+                    )
+
+                def indexed():
+                    term = rng.choice(queries)
+                    list(backend.search(Product.objects.all(), term).values_list("id", flat=True))
+
+                results.append(
+                    {
+                        "products": size,
+                        "backend": type(backend).__name__,
+                        "icontains": summarize(timed(icontains, options["iterations"])),
+                        "indexed": summarize(timed(indexed, options["iterations"])),
+                    }
+                )
+                reset_search_backends()
+
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,100 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from catalog.bench import seed_catalog
+from catalog.models import Product
+from catalog.serializers import ProductSerializer, product_rows, serialize_product_rows
+from core.bench import scratch_database
+from core.storage_urls import clear_storage_urls
+
+
+def cloudinary_storages():
+    """STORAGES com o MediaCloudinaryStorage; a URL e montada localmente, sem rede."""
+    import cloudinary
+    import cloudinary_storage.storage  # noqa: F401 (aplica o CLOUDINARY_STORAGE no SDK)
+
+    if not cloudinary.config().cloud_name:
+        cloudinary.config(cloud_name="bench")
+    return {
+        "default": {"BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede linhas/s do ProductSerializer contra o caminho rapido de listagem, "
+        "com e sem o cache de URLs do storage (core.storage_urls)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 50_000])
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument(
+            "--storage",
+            choices=["default", "cloudinary"],
+            default="default",
+            help="cloudinary: mede o storage de producao (URL montada pelo SDK).",
+        )
+
+    def handle(self, *args, **options):
+        request = APIRequestFactory().get("/api/products/")
+        renderer = JSONRenderer()
+
+        def serializer_path():
+            data = ProductSerializer(
+                Product.objects.all(), many=True, context={"request": request}
+            ).data
+            return renderer.render(data)
+
+        def fast_path():
+            rows = product_rows(Product.objects.all())
+            return renderer.render(serialize_product_rows(rows, request))
+
+        def best_of(fn):
+            best = None
+            for _ in range(options["repeat"]):
+                start = time.perf_counter()
+                fn()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            return best
+
+        storages = {}
+        if options["storage"] == "cloudinary":
+            storages = {"STORAGES": cloudinary_storages()}
+
+        results = []
+        for size in options["sizes"]:
+            with scratch_database(), override_settings(**storages):
+                seed_catalog(size)
+                # Uma imagem por produto, como no catalogo real.
+                Product.objects.update(
+                    image=Concat(Value("products/bench-"), Cast("id", CharField()), Value(".png"))
+                )
+                entry = {"products": size, "storage": options["storage"]}
+                for label, fn in (("serializer", serializer_path), ("fast_path", fast_path)):
+                    # "uncached": storage.url() a cada linha, como antes do cache.
+                    with override_settings(STORAGE_URL_CACHE_SIZE=0):
+                        uncached = best_of(fn)
+                    clear_storage_urls()
+                    with override_settings(STORAGE_URL_CACHE_SIZE=max(size, 10_000)):
+                        fn()
+                        cached = best_of(fn)
+                    entry[label] = {
+                        "seconds": round(cached, 4),
+                        "rows_per_sec": round(size / cached),
+                        "uncached_seconds": round(uncached, 4),
+                        "url_cache_speedup": round(uncached / cached, 2),
+                    }
+                entry["speedup"] = round(entry["serializer"]["seconds"] / entry["fast_path"]["seconds"], 2)
+                results.append(entry)
+
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from catalog.cache import invalidate_catalog
+from catalog.images import process_product_image
+from catalog.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera derivados WebP, dimensoes e blurhash das imagens de produtos que "
+        "ainda nao tem image_meta (ou de todos, com --force)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Reprocessa imagens ja processadas.")
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image="").only("id", "image", "image_meta").order_by("id")
+        changed = []
+        for product in products.iterator(chunk_size=200):
+            if options["force"]:
+                product.image_meta = {}
+            if process_product_image(product):
+                changed.append(product.pk)
+                self.stdout.write(f"Produto #{product.pk}: {len(product.image_meta.get('v', []))} derivados")
+
+        if changed:
+            # O JSON do produto mudou: ETag (updated_at) e cache do catalogo tambem.
+            Product.objects.filter(pk__in=changed).update(updated_at=timezone.now())
+            invalidate_catalog()
+        self.stdout.write(f"{len(changed)} imagens processadas.")
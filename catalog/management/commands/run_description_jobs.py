@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from catalog.jobs import run_description_job
+from catalog.models import DescriptionJob
+
+
+class Command(BaseCommand):
+    help = "Processa jobs de descricao com IA pendentes (ou retoma os interrompidos, com lease vencido)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--job", type=int, help="Processa apenas este job.")
+        parser.add_argument("--workers", type=int, help="Tamanho do pool de threads.")
+
+    def handle(self, *args, **options):
+        jobs = DescriptionJob.objects.filter(
+            status__in=[DescriptionJob.STATUS_PENDING, DescriptionJob.STATUS_RUNNING]
+        ).order_by("id")
+        if options["job"]:
+            jobs = jobs.filter(pk=options["job"])
+
+        for job_id in jobs.values_list("id", flat=True):
+            job = run_description_job(job_id, workers=options["workers"])
+            if job is not None:
+                self.stdout.write(
+                    f"Job #{job.pk}: {job.status} ({job.succeeded} ok, {job.failed} falhas)"
+                )
@@ -0,0 +1,76 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:03
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Copia congelada de catalog.search (fold/tokenize/build_search_document) na
+# data desta migracao: mudancas futuras no modulo nao alteram o backfill.
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text):
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.casefold()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(fold(text))
+
+
+def build_search_document(name, description, category_name):
+    return " ".join(
+        " ".join(tokenize(value)) for value in (name, category_name, description) if value
+    )
+
+
+def backfill_search_document(apps, schema_editor):
+    Product = apps.get_model("catalog", "Product")
+    products = list(
+        Product.objects.using(schema_editor.connection.alias).select_related("category")
+    )
+    for product in products:
+        product.search_document = build_search_document(
+            product.name,
+            product.description,
+            product.category.name if product.category_id else "",
+        )
+    Product.objects.using(schema_editor.connection.alias).bulk_update(
+        products, ["search_document"], batch_size=500
+    )
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS catalog_product_search_gin "
+        "ON catalog_product USING GIN (to_tsvector('simple', search_document))"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS catalog_product_search_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_alter_product_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_document, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:06
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def legacy_slug(name):
+    # Copia de catalog.models.legacy_slug no momento da migration.
+    return re.sub(r"\s+", "-", (name or "").lower())
+
+
+def create_legacy_aliases(apps, schema_editor):
+    Product = apps.get_model("catalog", "Product")
+    ProductSlugAlias = apps.get_model("catalog", "ProductSlugAlias")
+    db = schema_editor.connection.alias
+
+    aliases = {}
+    for product_id, name, slug in Product.objects.using(db).values_list("id", "name", "slug"):
+        alias = legacy_slug(name)
+        if alias and alias != slug:
+            aliases.setdefault(alias, product_id)
+
+    ProductSlugAlias.objects.using(db).bulk_create(
+        [ProductSlugAlias(slug=alias, product_id=product_id) for alias, product_id in aliases.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_product_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.CreateModel(
+            name='ProductSlugAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.CharField(max_length=255, unique=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slug_aliases', to='catalog.product')),
+            ],
+        ),
+        migrations.RunPython(create_legacy_aliases, migrations.RunPython.noop),
+    ]
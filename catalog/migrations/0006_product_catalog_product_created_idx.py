@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_product_updated_at_slug_alias'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at', '-id'], name='catalog_product_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_generated_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_meta',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:52
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_facets(apps, schema_editor):
+    # Copia de catalog.facets.build_facet_rows no momento da migration.
+    alias = schema_editor.connection.alias
+    Product = apps.get_model("catalog", "Product")
+    Category = apps.get_model("catalog", "Category")
+    ProductFacet = apps.get_model("catalog", "ProductFacet")
+    bounds = [Decimal(str(bound)) for bound in settings.CATALOG_PRICE_BUCKETS]
+    bucket = models.Case(
+        *[models.When(price__lt=bound, then=models.Value(index)) for index, bound in enumerate(bounds)],
+        default=models.Value(len(bounds)),
+    )
+    rows = {
+        (category_id, index, is_active): ProductFacet(
+            category_id=category_id, price_bucket=index, is_active=is_active, count=0
+        )
+        for category_id in [None, *Category.objects.using(alias).values_list("pk", flat=True)]
+        for index in range(len(bounds) + 1)
+        for is_active in (True, False)
+    }
+    grouped = (
+        Product.objects.using(alias)
+        .order_by()
+        .values("category_id", "is_active", price_bucket=bucket)
+        .annotate(count=models.Count("id"))
+    )
+    for row in grouped:
+        rows[(row["category_id"], row["price_bucket"], row["is_active"])].count = row["count"]
+    ProductFacet.objects.using(alias).bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_product_image_meta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price_bucket', models.PositiveSmallIntegerField()),
+                ('is_active', models.BooleanField()),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalog.category')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('category', 'price_bucket', 'is_active'), name='catalog_facet_unique'), models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('price_bucket', 'is_active'), name='catalog_facet_unique_uncategorized')],
+            },
+        ),
+        migrations.RunPython(fill_facets, migrations.RunPython.noop),
+    ]
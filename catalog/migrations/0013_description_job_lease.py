@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0012_product_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='descriptionjob',
+            name='claimed_by',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='descriptionjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
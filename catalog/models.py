@@ -1,3 +1,6 @@
+import re
+
+from django.conf import settings
 from django.db import models
 
 
@@ -17,8 +20,158 @@ class Product(models.Model):
     description = models.TextField(blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     is_active = models.BooleanField(default=True)
+    # Estoque disponivel; None = nao controlado. Pedidos baixam por UPDATE
+    # condicional (orders/inventory.py), nunca por save().
+    stock = models.PositiveIntegerField(null=True, blank=True)
     image = models.ImageField(upload_to="products/", blank=True)
+    # Dimensoes, blurhash e derivados WebP da imagem (catalog/images.py).
+    image_meta = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Nome + categoria + descricao normalizados (sem acento, minusculo).
+    # Mantido pelos signals de catalog/signals.py.
+    search_document = models.TextField(blank=True, default="", editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="catalog_product_created_idx"),
+            # Filtros e ordenacoes da listagem (catalog/filters.py).
+            models.Index(fields=["is_active", "category", "price", "id"], name="catalog_product_cat_price_idx"),
+            models.Index(fields=["is_active", "price", "id"], name="catalog_product_price_idx"),
+            models.Index(fields=["is_active", "created_at", "id"], name="catalog_product_active_new_idx"),
+            models.Index(fields=["is_active", "category", "created_at", "id"], name="catalog_product_cat_new_idx"),
+        ]
 
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        # Edicao (API, admin) nunca regrava stock: o valor lido pode estar
+        # velho e desfaria baixas concorrentes de orders/inventory.py.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.name != "stock"
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores do banco para o delta de catalog.facets no save/delete.
+        if FACET_SOURCE_FIELDS.issubset(field_names):
+            instance._facet_source = (instance.category_id, instance.price, instance.is_active)
+        return instance
+
+
+FACET_SOURCE_FIELDS = frozenset({"category_id", "price", "is_active"})
+
+
+class ProductFacet(models.Model):
+    """Contagem de produtos por (categoria, faixa de preco, ativo).
+
+    Mantida por delta nos signals de Product (catalog/facets.py); conferida e
+    reconstruida por ``manage.py check_facets``.
+    """
+
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    price_bucket = models.PositiveSmallIntegerField()
+    is_active = models.BooleanField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["category", "price_bucket", "is_active"],
+                condition=models.Q(category__isnull=False),
+                name="catalog_facet_unique",
+            ),
+            models.UniqueConstraint(
+                fields=["price_bucket", "is_active"],
+                condition=models.Q(category__isnull=True),
+                name="catalog_facet_unique_uncategorized",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.category_id}/{self.price_bucket}/{self.is_active}: {self.count}"
+
+
+def legacy_slug(name):
+    # Mesmo calculo que o frontend fazia: name.toLowerCase().replace(/\s+/g, "-")
+    return re.sub(r"\s+", "-", (name or "").lower())
+
+
+class ProductSlugAlias(models.Model):
+    slug = models.CharField(max_length=255, unique=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="slug_aliases")
+
+    def __str__(self):
+        return self.slug
+
+
+class DescriptionJob(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Lease de quem esta processando: token do dono e ultimo sinal de vida.
+    claimed_by = models.CharField(max_length=32, blank=True, default="", editable=False)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    def __str__(self):
+        return f"Job #{self.id} ({self.succeeded + self.failed}/{self.total})"
+
+
+class DescriptionJobItem(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    job = models.ForeignKey(DescriptionJob, on_delete=models.CASCADE, related_name="items")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product} ({self.status})"
+
+
+class GeneratedDescription(models.Model):
+    """Cache persistente de respostas do LLM, enderecado pelo hash do pedido."""
+
+    key = models.CharField(max_length=64, unique=True)
+    model = models.CharField(max_length=64)
+    content = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.model}:{self.key[:12]}"
@@ -0,0 +1,299 @@
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, models
+from django.db.models.expressions import RawSQL
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Peso de cada campo no ranking: nome > categoria > descricao.
+FIELD_WEIGHTS = {"name": 3, "category": 2, "description": 1}
+
+
+def fold(text):
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.casefold()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(fold(text))
+
+
+def build_search_document(name, description, category_name):
+    return " ".join(
+        " ".join(tokenize(value)) for value in (name, category_name, description) if value
+    )
+
+
+def product_search_document(product):
+    category_name = product.category.name if product.category_id else ""
+    return build_search_document(product.name, product.description, category_name)
+
+
+def max_results():
+    return getattr(settings, "CATALOG_SEARCH_MAX_RESULTS", 500)
+
+
+def limit_results(matches):
+    """Os ``max_results()`` mais relevantes de um resultado de ``search()``.
+
+    Vale para qualquer backend e depois dos filtros do queryset (categoria,
+    ativo, preco): cortar antes perderia resultados das buscas filtradas.
+    """
+    top = matches.order_by("-search_rank", "-id").values("pk")[: max_results()]
+    return matches.filter(pk__in=top).order_by("-search_rank", "-id")
+
+
+class IdIn(models.Expression):
+    """``id IN (1, 2, ...)`` com os ids literais: vem do indice (int) e assim
+    nao esbarram no limite de parametros do SQLite. Ao contrario de RawSQL, a
+    coluna acompanha o alias da tabela dentro de subqueries."""
+
+    output_field = models.BooleanField()
+
+    def __init__(self, ids):
+        super().__init__()
+        self.ids = [int(product_id) for product_id in ids]
+        self.column = models.F("pk")
+
+    def get_source_expressions(self):
+        return [self.column]
+
+    def set_source_expressions(self, exprs):
+        (self.column,) = exprs
+
+    def as_sql(self, compiler, connection):
+        sql, params = compiler.compile(self.column)
+        return f"{sql} IN ({', '.join(map(str, self.ids))})", params
+
+
+class SearchBackend:
+    def search(self, queryset, query):
+        """Filtra e ordena o queryset por relevancia, anotando ``search_rank``."""
+        raise NotImplementedError
+
+    def empty(self, queryset):
+        return queryset.none().annotate(
+            search_rank=models.Value(0, output_field=models.IntegerField())
+        )
+
+    def index(self, product):
+        pass
+
+    def remove(self, product_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class InMemorySearchBackend(SearchBackend):
+    """Indice invertido em processo, usado no SQLite.
+
+    Cada worker mantem sua propria copia, carregada do banco na primeira busca
+    e atualizada pelos signals de Product.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+
+    def _load(self):
+        from catalog.models import Product
+
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        rows = Product.objects.values_list(
+            "id", "name", "description", "category__name"
+        ).iterator(chunk_size=2000)
+        for product_id, name, description, category_name in rows:
+            self._add(product_id, name, description, category_name)
+        self._vocabulary = sorted(self._postings)
+        self._vocabulary_dirty = False
+        self._loaded = True
+
+    def _add(self, product_id, name, description, category_name):
+        scores = defaultdict(int)
+        for field, value in (
+            ("name", name),
+            ("category", category_name),
+            ("description", description),
+        ):
+            for token in tokenize(value):
+                scores[token] += FIELD_WEIGHTS[field]
+        for token, score in scores.items():
+            if token not in self._postings:
+                self._vocabulary_dirty = True
+            self._postings[token][product_id] = score
+        self._documents[product_id] = tuple(scores)
+
+    def _discard(self, product_id):
+        for token in self._documents.pop(product_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[token]
+                self._vocabulary_dirty = True
+
+    def _expand(self, prefix):
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect_left(self._vocabulary, prefix)
+        for token in self._vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            yield token
+
+    def index(self, product):
+        if not self._loaded:
+            return
+        category_name = product.category.name if product.category_id else ""
+        with self._lock:
+            self._discard(product.pk)
+            self._add(product.pk, product.name, product.description, category_name)
+
+    def remove(self, product_id):
+        if not self._loaded:
+            return
+        with self._lock:
+            self._discard(product_id)
+
+    def rebuild(self):
+        with self._lock:
+            self._load()
+
+    def rank(self, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        self._ensure_loaded()
+
+        with self._lock:
+            scores = None
+            # O ultimo termo e tratado como prefixo (busca a cada tecla).
+            for position, token in enumerate(tokens):
+                if position == len(tokens) - 1:
+                    matches = defaultdict(int)
+                    for candidate in self._expand(token):
+                        for product_id, score in self._postings[candidate].items():
+                            matches[product_id] = max(matches[product_id], score)
+                else:
+                    matches = self._postings.get(token, {})
+
+                if scores is None:
+                    scores = dict(matches)
+                else:
+                    scores = {
+                        product_id: total + matches[product_id]
+                        for product_id, total in scores.items()
+                        if product_id in matches
+                    }
+                if not scores:
+                    return []
+
+        return sorted(scores.items(), key=lambda item: (item[1], item[0]), reverse=True)
+
+    def search(self, queryset, query):
+        ranked = self.rank(query)
+        if not ranked:
+            return self.empty(queryset)
+
+        # Os scores sao inteiros pequenos, entao ha poucos valores distintos:
+        # um CASE com um IN por score fica barato mesmo com muitos ids.
+        by_score = defaultdict(list)
+        for product_id, score in ranked:
+            by_score[score].append(product_id)
+
+        return queryset.filter(IdIn([product_id for product_id, _ in ranked])).annotate(
+            search_rank=models.Case(
+                *[
+                    models.When(IdIn(product_ids), then=models.Value(score))
+                    for score, product_ids in sorted(by_score.items(), reverse=True)
+                ],
+                default=models.Value(0),
+                output_field=models.IntegerField(),
+            )
+        ).order_by("-search_rank", "-id")
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Full-text via tsvector sobre Product.search_document.
+
+    A expressao abaixo precisa ser identica a do indice GIN criado na
+    migration 0004 para que o planner use o indice.
+    """
+
+    vector_sql = "to_tsvector('simple', {table}.search_document)"
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return self.empty(queryset)
+
+        tsquery = " & ".join(tokens[:-1] + [f"{tokens[-1]}:*"])
+        table = connections[queryset.db].ops.quote_name(queryset.model._meta.db_table)
+        vector = self.vector_sql.format(table=table)
+
+        return (
+            queryset.filter(
+                RawSQL(
+                    f"{vector} @@ to_tsquery('simple', %s)",
+                    [tsquery],
+                    output_field=models.BooleanField(),
+                )
+            )
+            .annotate(
+                search_rank=RawSQL(
+                    f"round(ts_rank({vector}, to_tsquery('simple', %s))::numeric, 6)",
+                    [tsquery],
+                    output_field=models.DecimalField(max_digits=12, decimal_places=6),
+                )
+            )
+            .order_by("-search_rank", "-id")
+        )
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_search_backend(using="default"):
+    backend = _backends.get(using)
+    if backend is not None:
+        return backend
+
+    with _backends_lock:
+        if using not in _backends:
+            name = getattr(settings, "CATALOG_SEARCH_BACKEND", "")
+            if not name:
+                name = "postgres" if connections[using].vendor == "postgresql" else "memory"
+            _backends[using] = (
+                PostgresSearchBackend() if name == "postgres" else InMemorySearchBackend()
+            )
+        return _backends[using]
+
+
+def reset_search_backends():
+    with _backends_lock:
+        _backends.clear()
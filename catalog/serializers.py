@@ -1,6 +1,10 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
 from rest_framework import serializers
 
 from catalog.models import Category, Product
+from core.storage_urls import storage_url
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -9,7 +13,39 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ["id", "name", "slug"]
 
 
+def image_set(meta, request=None):
+    """Imagem pronta para <img srcset>, a partir de Product.image_meta (sem storage)."""
+    if not meta or "v" not in meta:
+        return None
+    absolute = request.build_absolute_uri if request is not None else str
+    variants = [(absolute(url), width) for width, _, url in meta["v"]]
+    return {
+        "src": variants[-1][0],
+        "srcset": ", ".join(f"{url} {width}w" for url, width in variants),
+        "width": meta["w"],
+        "height": meta["h"],
+        "blurhash": meta["bh"],
+    }
+
+
+class CachedImageField(serializers.ImageField):
+    """ImageField cuja URL sai do cache de core.storage_urls."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = storage_url(value.storage, value.name)
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+
 class ProductSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: CachedImageField,
+    }
+    images = serializers.SerializerMethodField()
+
     class Meta:
         model = Product
         fields = [
@@ -21,6 +57,90 @@ class ProductSerializer(serializers.ModelSerializer):
             "price",
             "is_active",
             "image",
+            "images",
             "created_at",
         ]
         depth = 1
+
+    def get_images(self, obj):
+        return image_set(obj.image_meta, self.context.get("request"))
+
+
+# --- Caminho rapido para listagens ---
+# Gera exatamente o mesmo JSON que ProductSerializer (depth=1), mas a partir de
+# um unico values() com JOIN na categoria. catalog/tests.py compara os bytes.
+
+PRODUCT_ROW_FIELDS = (
+    "id",
+    "name",
+    "slug",
+    "description",
+    "price",
+    "is_active",
+    "image",
+    "image_meta",
+    "created_at",
+    "category_id",
+    "category__name",
+    "category__slug",
+    "category__created_at",
+)
+
+_price_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+def product_rows(queryset):
+    """values() com os campos do ProductSerializer e as anotacoes do queryset."""
+    return queryset.values(*PRODUCT_ROW_FIELDS, *queryset.query.annotations)
+
+
+def serialize_product_rows(rows, request=None):
+    storage = Product._meta.get_field("image").storage
+    # Fuso resolvido uma vez por chamada; o DateTimeField padrao consulta o
+    # fuso corrente (asgiref Local) a cada valor.
+    current_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+    datetime_repr = serializers.DateTimeField(default_timezone=current_timezone).to_representation
+    price_repr = _price_field.to_representation
+    image_urls = {}
+
+    def image_url(name):
+        if not name:
+            return None
+        url = image_urls.get(name)
+        if url is None:
+            url = storage_url(storage, name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            image_urls[name] = url
+        return url
+
+    # Uma categoria aparece em muitas linhas: o dict (e o datetime, caro por
+    # causa do fuso) e montado uma vez e reaproveitado.
+    categories = {}
+    data = []
+    for row in rows:
+        category = None
+        if row["category_id"] is not None:
+            category = categories.get(row["category_id"])
+            if category is None:
+                category = categories[row["category_id"]] = {
+                    "id": row["category_id"],
+                    "name": row["category__name"],
+                    "slug": row["category__slug"],
+                    "created_at": datetime_repr(row["category__created_at"]),
+                }
+        data.append(
+            {
+                "id": row["id"],
+                "category": category,
+                "name": row["name"],
+                "slug": row["slug"],
+                "description": row["description"],
+                "price": price_repr(row["price"]),
+                "is_active": row["is_active"],
+                "image": image_url(row["image"]),
+                "images": image_set(row["image_meta"], request),
+                "created_at": datetime_repr(row["created_at"]),
+            }
+        )
+    return data
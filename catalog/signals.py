@@ -0,0 +1,122 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from catalog.cache import invalidate_catalog
+from catalog.facets import apply_facet_deltas, ensure_category_facets, facet_key
+from catalog.images import process_product_image
+from catalog.models import Category, Product, ProductSlugAlias, legacy_slug
+from catalog.search import get_search_backend, product_search_document
+from core.storage_urls import forget_storage_url
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    document = product_search_document(instance)
+    if document != instance.search_document:
+        instance.search_document = document
+        Product.objects.filter(pk=instance.pk).update(search_document=document)
+
+    get_search_backend().index(instance)
+
+
+@receiver(post_save, sender=Product)
+def record_legacy_slug(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    alias = legacy_slug(instance.name)
+    if alias and alias != instance.slug:
+        ProductSlugAlias.objects.update_or_create(slug=alias, defaults={"product": instance})
+
+
+@receiver(post_save, sender=Product)
+def process_image(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = (instance.image_meta or {}).get("src")
+    if process_product_image(instance):
+        # Nome novo (ou o mesmo nome sobrescrito): nenhuma URL antiga no cache.
+        storage = instance.image.storage
+        for name in {previous, instance.image.name} - {None, ""}:
+            forget_storage_url(storage, name)
+
+
+@receiver(pre_save, sender=Product)
+def load_facet_source(sender, instance, raw=False, **kwargs):
+    # Instancia que nao veio inteira do banco (ex.: .only()): le os valores antigos.
+    if raw or instance._state.adding or hasattr(instance, "_facet_source"):
+        return
+    instance._facet_source = (
+        Product.objects.filter(pk=instance.pk).values_list("category_id", "price", "is_active").first()
+    )
+
+
+@receiver(post_save, sender=Product)
+def update_facets(sender, instance, raw=False, created=False, **kwargs):
+    if raw:
+        return
+
+    source = (instance.category_id, instance.price, instance.is_active)
+    previous = getattr(instance, "_facet_source", None)
+    deltas = {facet_key(*source): 1}
+    if previous is not None and not created:
+        old = facet_key(*previous)
+        deltas[old] = deltas.get(old, 0) - 1
+    apply_facet_deltas(deltas)
+    instance._facet_source = source
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_facets(sender, instance, **kwargs):
+    source = getattr(instance, "_facet_source", None)
+    if source is None:
+        source = (instance.category_id, instance.price, instance.is_active)
+    apply_facet_deltas({facet_key(*source): -1})
+
+
+@receiver(post_save, sender=Category)
+def create_category_facets(sender, instance, raw=False, created=False, **kwargs):
+    if created and not raw:
+        ensure_category_facets(instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+    if instance.image.name:
+        forget_storage_url(instance.image.storage, instance.image.name)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, raw=False, created=False, **kwargs):
+    if raw or created:
+        return
+
+    # O detalhe do produto embute a categoria, entao o ETag precisa mudar.
+    Product.objects.filter(category=instance).update(updated_at=timezone.now())
+
+    backend = get_search_backend()
+    changed = []
+    for product in Product.objects.filter(category=instance).select_related("category"):
+        document = product_search_document(product)
+        if document != product.search_document:
+            product.search_document = document
+            changed.append(product)
+        backend.index(product)
+
+    if changed:
+        Product.objects.bulk_update(changed, ["search_document"], batch_size=500)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_catalog_cache(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate_catalog()
@@ -1,3 +1,1092 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models.signals import pre_save
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from catalog import ai_services
+from catalog.ai_services import DescriptionGenerationError, get_llm_backend, reset_llm_backend
+from catalog.facets import live_facet_counts, stored_facet_counts
+from catalog.filters import filter_products, product_ordering
+from catalog.jobs import TokenBucket, create_description_job, run_description_job
+from catalog.models import (
+    Category,
+    DescriptionJob,
+    DescriptionJobItem,
+    GeneratedDescription,
+    Product,
+    ProductFacet,
+)
+from catalog.search import get_search_backend, reset_search_backends, tokenize
+from catalog.serializers import ProductSerializer, product_rows, serialize_product_rows
+from core.models import User
+from core.pagination import KeysetPagination
+from core.query_budget import QueryBudgetTestMixin
+from orders.inventory import take_stock
+from orders.models import Order, StockReservation
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_search_backends()
+        self.addCleanup(reset_search_backends)
+        self.client = APIClient()
+        self.category = Category.objects.create(name="Eletrônicos", slug="eletronicos")
+        self.headset = Product.objects.create(
+            category=self.category,
+            name="Fone Neural",
+            description="Audição imersiva com cancelamento ativo.",
+            price="199.90",
+        )
+        self.jacket = Product.objects.create(
+            name="Jaqueta Neon",
+            description="Tecido refletivo para a noite. Combina com fone.",
+            price="349.00",
+        )
+
+    def search(self, term):
+        response = self.client.get("/api/products/", {"search": term})
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.json()]
+
+    def test_tokenize_folds_accents_and_case(self):
+        self.assertEqual(tokenize("Audição IMERSIVA, nível-3"), ["audicao", "imersiva", "nivel", "3"])
+
+    def test_search_matches_accent_folded_prefix(self):
+        self.assertEqual(self.search("audi"), [self.headset.id])
+        self.assertEqual(self.search("eletronico"), [self.headset.id])
+
+    def test_search_ranks_name_matches_first(self):
+        self.assertEqual(self.search("fone"), [self.headset.id, self.jacket.id])
+
+    def test_index_follows_save_and_delete(self):
+        self.assertEqual(self.search("neon"), [self.jacket.id])
+
+        self.jacket.name = "Jaqueta Cromada"
+        self.jacket.save()
+        self.assertEqual(self.search("neon"), [])
+        self.assertEqual(self.search("cromada"), [self.jacket.id])
+
+        self.jacket.delete()
+        self.assertEqual(self.search("cromada"), [])
+
+    def test_search_results_paginate_in_rank_order(self):
+        first = self.client.get("/api/products/", {"search": "fone", "page_size": 1}).json()
+        second = self.client.get(first["next"]).json()
+        self.assertEqual(
+            [item["id"] for item in first["results"] + second["results"]],
+            [self.headset.id, self.jacket.id],
+        )
+        self.assertIsNone(second["next"])
+
+    def test_category_rename_reindexes_products(self):
+        self.category.name = "Áudio"
+        self.category.save()
+        self.assertEqual(self.search("audio"), [self.headset.id])
+
+    @override_settings(CATALOG_SEARCH_MAX_RESULTS=1)
+    def test_result_cap_applies_after_filters(self):
+        # "fone" rankeia o headset primeiro; com preco minimo de 300, sobra a jaqueta.
+        self.assertEqual(self.search("fone"), [self.headset.id])
+        response = self.client.get("/api/products/", {"search": "fone", "max_price": "300"})
+        self.assertEqual([item["id"] for item in response.json()], [self.headset.id])
+        response = self.client.get("/api/products/", {"search": "fone", "min_price": "300"})
+        self.assertEqual([item["id"] for item in response.json()], [self.jacket.id])
+        facets = self.client.get("/api/products/facets/", {"search": "fone", "min_price": "300"}).json()
+        self.assertEqual(facets["total"], 1)
+
+    @override_settings(CATALOG_SEARCH_MAX_RESULTS=1)
+    def test_result_cap_is_the_same_for_both_backends_and_skips_facets(self):
+        for name in ("memory", "postgres"):
+            with self.subTest(backend=name), override_settings(CATALOG_SEARCH_BACKEND=name):
+                reset_search_backends()
+                capped = str(filter_products(Product.objects.all(), {"search": "fone"}).query)
+                uncapped = str(filter_products(Product.objects.all(), {"search": "fone"}, limit=False).query)
+                # O SQLite nao roda to_tsvector: do Postgres so o SQL e conferido.
+                self.assertIn("LIMIT 1", capped)
+                self.assertNotIn("LIMIT", uncapped)
+
+        reset_search_backends()
+        self.assertEqual(self.search("fone"), [self.headset.id])
+        facets = self.client.get("/api/products/facets/", {"search": "fone"}).json()
+        self.assertEqual(facets["total"], 2)
+
+
+class ProductSlugLookupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product = Product.objects.create(
+            name="Camisa Neon 404", slug="camisa-neon", price="89.90"
+        )
+
+    def test_lookup_by_slug(self):
+        response = self.client.get("/api/products/slug/camisa-neon/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["id"], self.product.id)
+
+    def test_lookup_by_legacy_name_slug(self):
+        response = self.client.get("/api/products/slug/camisa-neon-404/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["slug"], "camisa-neon")
+
+    def test_unknown_slug_returns_404(self):
+        response = self.client.get("/api/products/slug/nao-existe/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_repeat_view_returns_304_until_product_changes(self):
+        first = self.client.get("/api/products/slug/camisa-neon/")
+        etag = first["ETag"]
+
+        repeat = self.client.get("/api/products/slug/camisa-neon/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat.content, b"")
+
+        self.product.price = "79.90"
+        self.product.save()
+        changed = self.client.get("/api/products/slug/camisa-neon/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+
+
+class ProductPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        Product.objects.bulk_create(
+            [Product(name=f"Produto {i}", slug=f"produto-{i}", price="10.00") for i in range(5)]
+        )
+
+    def test_cursor_walks_every_product_once(self):
+        seen = []
+        response = self.client.get("/api/products/", {"page_size": 2})
+        while True:
+            body = response.json()
+            seen.extend(item["id"] for item in body["results"])
+            if not body["next"]:
+                break
+            response = self.client.get(body["next"])
+
+        expected = list(Product.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_legacy_callers_still_get_the_full_list(self):
+        with mock.patch.object(KeysetPagination, "max_page_size", 2):
+            response = self.client.get("/api/products/")
+        self.assertIsInstance(response.json(), list)
+        self.assertEqual(len(response.json()), 5)
+        self.assertNotIn("Link", response)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get("/api/products/", {"cursor": "nao-e-um-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name="Gadgets", slug="gadgets")
+        self.product = Product.objects.create(
+            category=self.category, name="Drone", slug="drone", price="500.00"
+        )
+
+    def test_second_read_is_served_without_queries(self):
+        first = self.client.get("/api/products/")
+        self.assertEqual(first["X-Catalog-Cache"], "MISS")
+
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/products/")
+        self.assertEqual(second["X-Catalog-Cache"], "HIT")
+        self.assertEqual(second.json(), first.json())
+
+    def test_any_catalog_write_invalidates_every_entry(self):
+        self.client.get("/api/products/")
+        self.client.get("/api/categories/")
+
+        self.category.name = "Gadgets Pro"
+        self.category.save()
+
+        products = self.client.get("/api/products/")
+        categories = self.client.get("/api/categories/")
+        self.assertEqual(products["X-Catalog-Cache"], "MISS")
+        self.assertEqual(categories["X-Catalog-Cache"], "MISS")
+        self.assertEqual(products.json()[0]["category"]["name"], "Gadgets Pro")
+
+    def test_cached_slug_detail_answers_304_without_queries(self):
+        etag = self.client.get("/api/products/slug/drone/")["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/products/slug/drone/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+)
+class FastProductSerializationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Vestuário", slug="vestuario")
+        Product.objects.create(
+            category=category,
+            name="Camisa 404",
+            slug="camisa-404",
+            description="Algodão <b>orgânico</b>\ncom \"aspas\".",
+            price="89.9",
+            image="products/camisa.png",
+        )
+        Product.objects.create(name="Sem categoria", price="1000", is_active=False)
+        Product.objects.create(name="Só imagem", slug="so-imagem", price="0.05", image="products/só.png")
+
+    def test_rows_render_byte_identical_to_product_serializer(self):
+        request = APIRequestFactory().get("/api/products/")
+        queryset = Product.objects.order_by("id")
+
+        expected = ProductSerializer(queryset, many=True, context={"request": request}).data
+        actual = serialize_product_rows(product_rows(queryset), request)
+
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+    def test_list_endpoint_uses_a_single_query(self):
+        client = APIClient()
+        client.force_authenticate(User(is_staff=True))
+        with self.assertNumQueries(1):
+            response = client.get("/api/products/", {"active": "all"})
+        self.assertEqual(len(response.json()), 3)
+
+
+def gradient_image(width=1000, height=500):
+    from PIL import Image
+
+    image = Image.new("RGB", (width, height))
+    image.putdata(
+        [(x * 255 // (width - 1), y * 255 // (height - 1), 128) for y in range(height) for x in range(width)]
+    )
+    return image
+
+
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+    PRODUCT_IMAGE_WIDTHS=(320, 640),
+)
+class ProductImageTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        overrides = override_settings(MEDIA_ROOT=media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        buffer = io.BytesIO()
+        gradient_image().save(buffer, "PNG")
+        self.png = buffer.getvalue()
+        self.product = Product.objects.create(
+            name="Drone", slug="drone", price="10", image=SimpleUploadedFile("drone.png", self.png)
+        )
+        self.product.refresh_from_db()
+
+    def test_upload_stores_dimensions_blurhash_and_webp_variants(self):
+        from PIL import Image
+
+        meta = self.product.image_meta
+        self.assertEqual((meta["src"], meta["w"], meta["h"]), (self.product.image.name, 1000, 500))
+        # Valor do encoder de referencia (pacote blurhash) para a mesma imagem.
+        self.assertEqual(meta["bh"], "LzHV9Z2swxX8qRWDjtagg0fjfQfj")
+        self.assertEqual([(w, h) for w, h, _ in meta["v"]], [(320, 160), (640, 320)])
+        for width, height, url in meta["v"]:
+            with Image.open(self.product.image.storage.path(url.removeprefix("/media/"))) as variant:
+                self.assertEqual((variant.format, variant.size), ("WEBP", (width, height)))
+
+    def test_api_returns_srcset_without_touching_storage(self):
+        url = FileSystemStorage.url
+        with mock.patch.object(FileSystemStorage, "url", autospec=True, side_effect=url) as storage_url:
+            detail = APIClient().get(f"/api/products/{self.product.id}/").json()["images"]
+        # Os derivados saem do image_meta; so o original passa pelo storage.
+        self.assertNotIn("derived", str(storage_url.call_args_list))
+        self.assertEqual(
+            detail,
+            {
+                "src": "http://testserver/media/products/derived/drone-640w.webp",
+                "srcset": "http://testserver/media/products/derived/drone-320w.webp 320w, "
+                "http://testserver/media/products/derived/drone-640w.webp 640w",
+                "width": 1000,
+                "height": 500,
+                "blurhash": "LzHV9Z2swxX8qRWDjtagg0fjfQfj",
+            },
+        )
+        listed = APIClient().get("/api/products/").json()
+        self.assertEqual(listed[0]["images"], detail)
+
+    def test_upload_through_the_api(self):
+        admin = User.objects.create_user(email="admin@example.com", password="x", is_staff=True)
+        response = self.assertWithinBudget(
+            "post",
+            "/api/products/",
+            {"name": "Foto", "slug": "foto", "price": "5.00", "image": SimpleUploadedFile("foto.png", self.png)},
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(admin).access_token}",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json()["images"]["srcset"].endswith("foto-640w.webp 640w"))
+
+    def test_replacing_the_image_drops_cached_urls(self):
+        old_name = self.product.image.name
+        with mock.patch("catalog.signals.forget_storage_url") as forget:
+            self.product.image = SimpleUploadedFile("drone-v2.png", self.png)
+            self.product.save()
+        forgotten = {call.args[1] for call in forget.call_args_list}
+        self.assertEqual(forgotten, {old_name, self.product.image.name})
+
+    def test_image_is_processed_once_per_upload(self):
+        with mock.patch("catalog.images.build_image_meta", return_value={"src": "?"}) as build:
+            self.product.name = "Drone X"
+            self.product.save()
+            build.assert_not_called()
+
+            self.product.image = "products/sumiu.png"
+            self.product.save()
+        build.assert_called_once()
+
+        Product.objects.filter(pk=self.product.pk).update(image_meta={})
+        self.product.refresh_from_db()
+        with self.assertLogs("catalog.images", "WARNING"):
+            self.product.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_meta, {"src": "products/sumiu.png"})
+        self.assertIsNone(APIClient().get(f"/api/products/{self.product.id}/").json()["images"])
+
+        # Qualquer erro do storage ou do Pillow, nao so OSError/ValueError.
+        self.product.image = "products/outra.png"
+        with mock.patch("catalog.images.build_image_meta", side_effect=RuntimeError("storage")):
+            with self.assertLogs("catalog.images", "ERROR"):
+                self.product.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_meta, {"src": "products/outra.png"})
+
+
+@override_settings(CATALOG_PRICE_BUCKETS=("50", "100"))
+class ProductFacetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_search_backends()
+        self.addCleanup(reset_search_backends)
+        self.gadgets = Category.objects.create(name="Gadgets", slug="gadgets")
+        self.wear = Category.objects.create(name="Vestuario", slug="vestuario")
+        self.drone = Product.objects.create(category=self.gadgets, name="Drone Neon", price="120.00")
+        Product.objects.create(category=self.gadgets, name="Fone Neon", price="80.00")
+        Product.objects.create(category=self.wear, name="Jaqueta", price="49.99", is_active=False)
+        Product.objects.create(name="Avulso", price="50.00")
+
+    def assertConsistent(self):
+        self.assertEqual(stored_facet_counts(), live_facet_counts())
+
+    def facets(self, staff=False, **params):
+        cache.clear()
+        self.client = APIClient()
+        if staff:
+            self.client.force_authenticate(User(is_staff=True))
+        return self.assertWithinBudget("get", "/api/products/facets/", params).json()
+
+    def test_counts_follow_saves_and_deletes(self):
+        self.assertConsistent()
+        self.drone.price = "60.00"
+        self.drone.save()
+        self.assertConsistent()
+        self.drone.category = self.wear
+        self.drone.is_active = False
+        self.drone.save()
+        self.assertConsistent()
+
+        partial = Product.objects.only("id", "name").get(pk=self.drone.pk)
+        partial.name = "Drone X"
+        partial.save()
+        self.assertConsistent()
+
+        self.drone.delete()
+        self.assertConsistent()
+        self.wear.delete()
+        self.assertConsistent()
+
+    def test_facets_come_from_the_aggregate_table(self):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.facets()
+        self.assertIn("catalog_productfacet", ctx.captured_queries[0]["sql"])
+        self.assertNotIn("GROUP BY", ctx.captured_queries[0]["sql"])
+
+        # Como a listagem, so ativos por padrao.
+        self.assertEqual(data["total"], 3)
+        self.assertEqual([(c["slug"], c["count"]) for c in data["categories"]], [("gadgets", 2)])
+        self.assertEqual(
+            data["price_ranges"],
+            [
+                {"min": "0.00", "max": "50.00", "count": 0},
+                {"min": "50.00", "max": "100.00", "count": 2},
+                {"min": "100.00", "max": None, "count": 1},
+            ],
+        )
+        # Inativos so contam para a equipe, mesmo com ?active=all.
+        self.assertEqual(data["is_active"], {"true": 3, "false": 0})
+        self.assertEqual(self.facets(active="all")["total"], 3)
+        self.assertEqual(self.facets(staff=True)["is_active"], {"true": 3, "false": 1})
+
+        data = self.facets(staff=True, active="all")
+        self.assertEqual(data["total"], 4)
+        self.assertEqual(
+            [(c["slug"], c["count"]) for c in data["categories"]], [("gadgets", 2), ("vestuario", 1)]
+        )
+        self.assertEqual([r["count"] for r in data["price_ranges"]], [1, 2, 1])
+
+    def test_filters_narrow_everything_but_the_category_counts(self):
+        data = self.facets(staff=True, category="gadgets", active="all")
+        self.assertEqual(data["total"], 2)
+        self.assertEqual(len(data["categories"]), 2)
+        self.assertEqual([r["count"] for r in data["price_ranges"]], [0, 1, 1])
+
+        data = self.facets(min_price="60", max_price="150")
+        self.assertEqual(data["total"], 2)
+        self.assertEqual([(c["slug"], c["count"]) for c in data["categories"]], [("gadgets", 2)])
+        self.assertEqual([r["count"] for r in data["price_ranges"]], [0, 1, 1])
+
+        get_search_backend().rebuild()
+        data = self.facets(search="neon")
+        self.assertEqual(data["total"], 2)
+        self.assertEqual([(c["slug"], c["count"]) for c in data["categories"]], [("gadgets", 2)])
+        self.assertEqual([r["count"] for r in data["price_ranges"]], [0, 1, 1])
+
+    def test_check_facets_reports_and_repairs_drift(self):
+        ProductFacet.objects.update(count=0)
+        with self.assertRaises(CommandError):
+            call_command("check_facets", stdout=io.StringIO())
+        call_command("check_facets", "--rebuild", stdout=io.StringIO())
+        self.assertConsistent()
+
+
+class ProductFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        gadgets = Category.objects.create(name="Gadgets", slug="gadgets")
+        self.cheap = Product.objects.create(category=gadgets, name="Cabo", price="9.90")
+        self.mid = Product.objects.create(category=gadgets, name="Fone", price="80.00")
+        self.loose = Product.objects.create(name="Avulso", price="80.00")
+        self.hidden = Product.objects.create(category=gadgets, name="Antigo", price="50.00", is_active=False)
+
+    def names(self, **params):
+        response = self.client.get("/api/products/", params)
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.json()]
+
+    def test_list_is_active_only_by_default(self):
+        self.assertNotIn("Antigo", self.names())
+        # Inativos so para a equipe; os demais recebem so ativos.
+        self.assertNotIn("Antigo", self.names(active="all"))
+        self.client.force_authenticate(User(is_staff=True))
+        self.assertEqual(self.names(active="false"), ["Antigo"])
+        self.assertEqual(len(self.names(active="all")), 4)
+        # O detalhe continua enxergando inativos.
+        self.assertEqual(self.client.get(f"/api/products/{self.hidden.pk}/").status_code, 200)
+
+    def test_price_range_and_ordering(self):
+        self.assertEqual(self.names(min_price="10", max_price="80", ordering="price"), ["Fone", "Avulso"])
+        self.assertEqual(self.names(ordering="-price"), ["Avulso", "Fone", "Cabo"])
+        self.assertEqual(self.names(ordering="created_at"), ["Cabo", "Fone", "Avulso"])
+        self.assertEqual(self.names(category="gadgets", ordering="-price"), ["Fone", "Cabo"])
+
+    def test_price_ordering_paginates_by_cursor(self):
+        names, params = [], {"ordering": "price", "page_size": 1}
+        while True:
+            data = self.client.get("/api/products/", params).json()
+            names += [item["name"] for item in data["results"]]
+            if not data["next"]:
+                break
+            params["cursor"] = data["next"].split("cursor=")[1].split("&")[0]
+        self.assertEqual(names, ["Cabo", "Fone", "Avulso"])
+
+    def test_invalid_params_return_400(self):
+        for params in ({"ordering": "name"}, {"min_price": "barato"}, {"max_price": "-1"}, {"active": "sim"}):
+            response = self.client.get("/api/products/", params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(next(iter(params)), response.json())
+
+    def test_every_filter_combination_uses_an_index(self):
+        orderings = ["-created_at", "created_at", "price", "-price"]
+        prices = [{}, {"min_price": "10"}, {"max_price": "100"}, {"min_price": "10", "max_price": "100"}]
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # Tabela minuscula: sem isso o planner prefere seq scan de qualquer jeito.
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            for ordering in orderings:
+                for category in (None, "gadgets"):
+                    for price in prices:
+                        params = {"ordering": ordering, **price, **({"category": category} if category else {})}
+                        queryset = filter_products(Product.objects.all(), params)
+                        plan = queryset.order_by(*product_ordering(params))[:24].explain()
+                        with self.subTest(**params):
+                            if connection.vendor == "postgresql":
+                                self.assertRegex(plan, r"Index (Only )?Scan( Backward)? using catalog_product_\w+_idx")
+                            else:
+                                self.assertRegex(plan, r"catalog_product USING (COVERING )?INDEX catalog_product_\w+_idx")
+
+
+class ProductStockTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User(is_staff=True))
+        self.product = Product.objects.create(name="Drone", slug="drone", price="100.00", stock=7)
+
+    def test_edit_does_not_restore_stock_taken_concurrently(self):
+        def reserve(sender, instance, **kwargs):
+            # Pedido concorrente baixa o estoque entre a leitura e o save.
+            pre_save.disconnect(reserve, sender=Product)
+            take_stock({self.product.pk: 2})
+
+        pre_save.connect(reserve, sender=Product)
+        self.addCleanup(pre_save.disconnect, reserve, sender=Product)
+        response = self.client.patch(f"/api/products/{self.product.pk}/", {"price": "90.00"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.price, Decimal("90.00"))
+        self.assertEqual(self.product.stock, 5)
+
+    def test_stock_is_read_only_in_admin_after_creation(self):
+        model_admin = admin.site._registry[Product]
+        self.assertEqual(model_admin.get_readonly_fields(None, self.product), ("stock",))
+        self.assertEqual(model_admin.get_readonly_fields(None), ())
+
+
+class ProductFeedTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.gadgets = Category.objects.create(name="Gadgets", slug="gadgets")
+        for i in range(5):
+            Product.objects.create(category=self.gadgets, name=f"Fone {i}", price="80.00")
+        Product.objects.filter(name="Fone 0").update(image="products/fone.png")
+        Product.objects.create(name="Avulso", description="Ação ✓", price="9.90", is_active=False)
+        self.admin = User.objects.create_user(email="admin@example.com", password="x", is_staff=True)
+        self.admin_token = RefreshToken.for_user(self.admin).access_token
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def lines(self, response):
+        return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def test_lines_match_the_list_items(self):
+        response = self.assertWithinBudget("get", "/api/products/feed/", {"active": "all"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertTrue(response.streaming)
+        listed = self.client.get("/api/products/", {"active": "all", "ordering": "created_at"}).json()
+        self.assertEqual(self.lines(response), listed)
+        # Fora da equipe, ?active=all continua so com ativos.
+        self.assertEqual(len(self.lines(APIClient().get("/api/products/feed/", {"active": "all"}))), 5)
+        # Mesmos filtros da listagem (so ativos por padrao).
+        response = self.client.get("/api/products/feed/", {"category": "gadgets", "max_price": "100"})
+        self.assertEqual(len(self.lines(response)), 5)
+        self.assertEqual(self.client.get("/api/products/feed/", {"min_price": "x"}).status_code, 400)
+
+    @override_settings(CATALOG_FEED_CHUNK_SIZE=2)
+    def test_streams_in_chunks_and_gzips_on_request(self):
+        response = self.client.get("/api/products/feed/", {"active": "all"})
+        chunks = list(response.streaming_content)
+        self.assertEqual([chunk.count(b"\n") for chunk in chunks], [2, 2, 2])
+
+        response = self.client.get("/api/products/feed/", {"active": "all"}, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), b"".join(chunks))
+
+    async def test_asgi_streams_without_buffering(self):
+        response = await self.async_client.get(
+            "/api/products/feed/", {"active": "all"}, headers={"Authorization": f"Bearer {self.admin_token}"}
+        )
+        # Iterador async: o handler ASGI nao le tudo para uma lista antes de enviar.
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.splitlines()), 6)
+
+    def test_peak_memory_is_flat_at_200k_products(self):
+        def peak_mb():
+            tracemalloc.start()
+            try:
+                response = self.client.get("/api/products/feed/", {"active": "all"}, HTTP_ACCEPT_ENCODING="gzip")
+                size = sum(len(chunk) for chunk in response.streaming_content)
+                return size, tracemalloc.get_traced_memory()[1] / 2**20
+            finally:
+                tracemalloc.stop()
+
+        _, small = peak_mb()
+        Product.objects.bulk_create(
+            Product(category=self.gadgets, name=f"Produto {i}", description="x" * 200, price="10.00")
+            for i in range(3125)
+        )
+        # 200k objetos pelo bulk_create levariam ~10 s: INSERT ... SELECT dobra a tabela.
+        columns = "name, description, price, is_active, image, image_meta, search_document, category_id, created_at, updated_at"
+        with connection.cursor() as cursor:
+            for _ in range(6):
+                cursor.execute(f"INSERT INTO catalog_product ({columns}) SELECT {columns} FROM catalog_product")
+        self.assertGreater(Product.objects.count(), 200_000)
+
+        size, large = peak_mb()
+        self.assertGreater(size, 1_000_000)
+        # A lista materializada passaria de centenas de MB; o feed fica no tamanho de um lote.
+        self.assertLess(large, 16)
+        self.assertLess(large, small + 8)
+
+
+class CatalogImportExportTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.gadgets = Category.objects.create(name="Gadgets", slug="gadgets")
+        self.drone = Product.objects.create(
+            category=self.gadgets, name="Drone", slug="drone", price="100.00", stock=7
+        )
+        Product.objects.create(name="Cabo USB", slug="cabo-usb", price="9.90")
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp, name)
+        with open(path, "w", encoding="utf-8") as stream:
+            stream.write(text)
+        return path
+
+    def run_import(self, path, **options):
+        out, err = io.StringIO(), io.StringIO()
+        call_command("import_catalog", path, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_upserts_by_slug_and_generates_slugs(self):
+        path = self.write(
+            "catalog.csv",
+            "slug,name,price,category,category_name\n"
+            "drone,Drone Pro,120.00,gadgets,\n"
+            ",Cabo USB,12.00,cabos,Cabos\n"
+            ",Cabo USB,15.00,cabos,Cabos\n"
+            "quebrado,Quebrado,caro,,\n",
+        )
+        out, err = self.run_import(path, chunk_size=2)
+
+        self.assertIn("4 linhas (3 gravadas, 1 com erro)", out)
+        self.assertIn("linha 5: price invalido", err)
+        self.drone.refresh_from_db()
+        # Sem coluna stock no arquivo, o estoque fica como estava.
+        self.assertEqual((self.drone.name, self.drone.price, self.drone.stock), ("Drone Pro", Decimal("120.00"), 7))
+        self.assertIn("pro", self.drone.search_document)
+
+        cables = Product.objects.filter(category__slug="cabos").order_by("slug")
+        self.assertEqual(list(cables.values_list("slug", "price")), [
+            ("cabo-usb-2", Decimal("12.00")), ("cabo-usb-3", Decimal("15.00")),
+        ])
+        self.assertEqual(Category.objects.get(slug="cabos").name, "Cabos")
+        self.assertEqual(stored_facet_counts(), live_facet_counts())
+
+    def test_jsonl_gzip_round_trip(self):
+        path = os.path.join(self.tmp, "catalog.jsonl.gz")
+        call_command("export_catalog", path, stderr=io.StringIO())
+        with gzip.open(path, "rt", encoding="utf-8") as stream:
+            rows = [json.loads(line) for line in stream]
+        self.assertEqual([row["slug"] for row in rows], ["drone", "cabo-usb"])
+        self.assertEqual(rows[0]["category"], "gadgets")
+        self.assertEqual(rows[0]["stock"], 7)
+
+        before = list(Product.objects.order_by("id").values_list("slug", "name", "price", "category", "stock"))
+        Product.objects.filter(slug="drone").update(stock=0, price="1.00")
+        out, _ = self.run_import(path)
+        self.assertIn("2 gravadas", out)
+        after = list(Product.objects.order_by("id").values_list("slug", "name", "price", "category", "stock"))
+        self.assertEqual(after, before)
+
+    def test_import_keeps_reserved_stock_and_drops_stale_image_meta(self):
+        order = Order.objects.create(full_name="Ada", email="ada@example.com", address="Rua 1")
+        StockReservation.objects.create(
+            order=order, product=self.drone, quantity=2, expires_at=timezone.now() + timedelta(hours=1)
+        )
+        meta = {"src": "products/cabo.png", "w": 10, "h": 10}
+        Product.objects.filter(slug="cabo-usb").update(image="products/cabo.png", image_meta=meta)
+        Product.objects.filter(slug="drone").update(image="products/drone.png", image_meta={"src": "products/drone.png"})
+        path = self.write(
+            "catalog.csv",
+            "slug,name,price,stock,image\n"
+            "drone,Drone,100.00,50,products/drone-v2.png\n"
+            "cabo-usb,Cabo USB,9.90,3,products/cabo.png\n",
+        )
+        self.run_import(path)
+
+        drone, cable = Product.objects.get(slug="drone"), Product.objects.get(slug="cabo-usb")
+        # Pedido pendente segura 2 do Drone: o 50 do arquivo nao sobrescreve o disponivel.
+        self.assertEqual((drone.stock, cable.stock), (7, 3))
+        self.assertEqual((drone.image_meta, cable.image_meta), ({}, meta))
+
+    def test_import_records_legacy_slug_aliases(self):
+        path = self.write("catalog.csv", "slug,name,price\ndrone,Drone Pro,120.00\n")
+        self.run_import(path)
+        cache.clear()
+
+        response = APIClient().get("/api/products/slug/drone-pro/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["id"], self.drone.id)
+
+    def test_update_columns_do_not_depend_on_row_order(self):
+        Product.objects.filter(slug="cabo-usb").update(stock=4)
+        path = self.write(
+            "catalog.jsonl",
+            '{"slug": "cabo-usb", "name": "Cabo USB", "price": "9.90"}\n'
+            '{"slug": "drone", "name": "Drone", "price": "100.00", "stock": 3}\n',
+        )
+        self.run_import(path)
+        self.assertEqual(list(Product.objects.order_by("slug").values_list("slug", "stock")), [
+            ("cabo-usb", 4), ("drone", 3),
+        ])
+
+        # No CSV vale o cabecalho: celula vazia de stock grava "nao controlado".
+        path = self.write("catalog.csv", "slug,name,price,stock\ncabo-usb,Cabo USB,9.90,\ndrone,Drone,100.00,5\n")
+        self.run_import(path)
+        self.assertEqual(list(Product.objects.order_by("slug").values_list("slug", "stock")), [
+            ("cabo-usb", None), ("drone", 5),
+        ])
+
+    def test_export_to_stdout_streams_csv(self):
+        out = io.StringIO()
+        call_command("export_catalog", "--format", "csv", stdout=out, stderr=io.StringIO())
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "slug,name,description,price,category,category_name,is_active,stock,image")
+        self.assertEqual(lines[1], "drone,Drone,,100.00,gadgets,Gadgets,True,7,")
+        self.assertEqual(len(lines), 3)
+
+
+@override_settings(AI_BACKEND="fake", AI_RETRY_BACKOFF=0, AI_MAX_ATTEMPTS=3, AI_REQUESTS_PER_SECOND=1000)
+class DescriptionJobTests(TestCase):
+    def setUp(self):
+        reset_llm_backend()
+        self.addCleanup(reset_llm_backend)
+        self.products = [
+            Product.objects.create(name=f"Oculos {i}", slug=f"oculos-{i}", price="50.00")
+            for i in range(3)
+        ]
+
+    def test_job_generates_descriptions_with_fake_backend(self):
+        job = create_description_job(Product.objects.all())
+        job = run_description_job(job.pk, workers=1)
+
+        self.assertEqual(job.status, DescriptionJob.STATUS_DONE)
+        self.assertEqual((job.succeeded, job.failed), (3, 0))
+        for product in self.products:
+            product.refresh_from_db()
+            self.assertTrue(product.description.startswith(product.name))
+
+    def test_item_is_retried_and_then_marked_failed(self):
+        responses = [DescriptionGenerationError("timeout"), "Descricao gerada"]
+        with mock.patch("catalog.jobs.request_product_description", side_effect=responses):
+            job = create_description_job(Product.objects.filter(pk=self.products[0].pk))
+            job = run_description_job(job.pk, workers=1)
+
+        item = job.items.get()
+        self.assertEqual((item.status, item.attempts), (DescriptionJobItem.STATUS_DONE, 2))
+
+        with mock.patch(
+            "catalog.jobs.request_product_description",
+            side_effect=DescriptionGenerationError("down"),
+        ):
+            job = create_description_job(Product.objects.filter(pk=self.products[1].pk))
+            job = run_description_job(job.pk, workers=1)
+
+        item = job.items.get()
+        self.assertEqual(job.status, DescriptionJob.STATUS_FAILED)
+        self.assertEqual((item.status, item.attempts, item.error), (DescriptionJobItem.STATUS_FAILED, 3, "down"))
+        self.products[1].refresh_from_db()
+        self.assertIsNone(self.products[1].description)
+
+    def test_running_job_is_only_taken_over_after_its_lease_expires(self):
+        job = create_description_job(Product.objects.all())
+        DescriptionJob.objects.filter(pk=job.pk).update(
+            status=DescriptionJob.STATUS_RUNNING, claimed_by="outro", heartbeat_at=timezone.now()
+        )
+        self.assertIsNone(run_description_job(job.pk, workers=1))
+        self.assertEqual(job.items.filter(status=DescriptionJobItem.STATUS_PENDING).count(), 3)
+
+        DescriptionJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=10))
+        job = run_description_job(job.pk, workers=1)
+        self.assertEqual((job.status, job.succeeded), (DescriptionJob.STATUS_DONE, 3))
+        self.assertNotEqual(job.claimed_by, "outro")
+
+    def test_unexpected_error_does_not_leave_the_job_running(self):
+        job = create_description_job(Product.objects.all())
+        with mock.patch("catalog.jobs.generate_with_retry", side_effect=RuntimeError("bug")):
+            job = run_description_job(job.pk, workers=1)
+        self.assertEqual(job.status, DescriptionJob.STATUS_FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_token_bucket_waits_for_refill(self):
+        now = [0.0]
+        waits = []
+
+        def sleep(seconds):
+            waits.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            bucket.acquire()
+
+        self.assertEqual(waits, [0.5, 0.5])
+
+
+@override_settings(AI_BACKEND="fake", AI_RETRY_BACKOFF=0, AI_MAX_ATTEMPTS=1, AI_REQUESTS_PER_SECOND=1000)
+class GenerationCacheTests(TestCase):
+    def setUp(self):
+        reset_llm_backend()
+        self.addCleanup(reset_llm_backend)
+        for i in range(3):
+            Product.objects.create(name=f"Luva {i}", slug=f"luva-{i}", price="20.00")
+
+    def run_job(self):
+        job = create_description_job(Product.objects.all())
+        return run_description_job(job.pk, workers=1)
+
+    def test_rerunning_on_unchanged_catalog_costs_no_api_calls(self):
+        self.run_job()
+        backend = get_llm_backend()
+        self.assertEqual(backend.calls, 3)
+
+        job = self.run_job()
+        self.assertEqual(job.succeeded, 3)
+        self.assertEqual(backend.calls, 3)
+        self.assertEqual(GeneratedDescription.objects.filter(hits=1).count(), 3)
+
+    def test_cache_hits_do_not_take_rate_limit_tokens(self):
+        self.run_job()
+        with mock.patch.object(TokenBucket, "acquire") as acquire:
+            job = self.run_job()
+        self.assertEqual(job.succeeded, 3)
+        acquire.assert_not_called()
+
+        Product.objects.create(name="Luva nova", slug="luva-nova", price="20.00")
+        with mock.patch.object(TokenBucket, "acquire") as acquire:
+            self.run_job()
+        self.assertEqual(acquire.call_count, 1)
+
+    def test_failures_are_neither_cached_nor_saved(self):
+        with mock.patch.object(
+            ai_services.FakeLLMBackend, "complete", side_effect=DescriptionGenerationError("boom")
+        ):
+            self.assertEqual(
+                ai_services.generate_product_description("Luva 0"), ai_services.FALLBACK_DESCRIPTION
+            )
+            job = self.run_job()
+
+        self.assertEqual(job.failed, 3)
+        self.assertFalse(GeneratedDescription.objects.exists())
+        self.assertFalse(Product.objects.exclude(description=None).exists())
+
+    def test_concurrent_identical_requests_share_one_call(self):
+        backend = get_llm_backend()
+        original = backend.complete
+        started = threading.Semaphore(0)
+
+        def slow_complete(*args, **kwargs):
+            # Segura o lider ate todas as threads terem entrado na chamada.
+            for _ in range(5):
+                started.acquire(timeout=5)
+            time.sleep(0.05)
+            return original(*args, **kwargs)
+
+        def request():
+            started.release()
+            results.append(ai_services.request_product_description("Luva 0"))
+
+        results = []
+        with mock.patch.object(ai_services, "_cache_lookup", return_value=None), mock.patch.object(
+            ai_services, "_cache_store"
+        ), mock.patch.object(backend, "complete", side_effect=slow_complete) as complete:
+            threads = [threading.Thread(target=request) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(complete.call_count, 1)
+        self.assertEqual(len(results), 5)
+        self.assertEqual(len(set(results)), 1)
+
+
+class CatalogQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_search_backends()
+        self.addCleanup(reset_search_backends)
+        self.client = APIClient()
+        categories = [Category.objects.create(name=f"Categoria {i}", slug=f"categoria-{i}") for i in range(3)]
+        self.products = [
+            Product.objects.create(
+                name=f"Neon Camisa {i}", slug=f"neon-camisa-{i}", price="10.00", category=categories[i % 3]
+            )
+            for i in range(30)
+        ]
+        self.category = categories[0]
+        # Steady state: o indice em memoria ja carregado, como em producao.
+        get_search_backend().rebuild()
+        admin = User.objects.create_user(email="admin@example.com", password="x", is_staff=True)
+        self.admin_auth = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(admin).access_token}"}
+        customer = User.objects.create_user(email="ana@example.com", password="x")
+        self.customer_auth = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(customer).access_token}"}
+
+    def test_authenticated_read_routes(self):
+        # Com JWT a busca do usuario entra na conta; staff tem chave de cache propria.
+        for who, auth, used in (("anonymous", {}, 1), ("customer", self.customer_auth, 2), ("staff", self.admin_auth, 2)):
+            for url in [
+                "/api/products/",
+                "/api/products/?active=all&page_size=5",
+                "/api/products/?search=neon&page_size=5",
+                "/api/products/facets/",
+                "/api/products/facets/?search=neon&active=all",
+            ]:
+                with self.subTest(who=who, url=url):
+                    cache.clear()
+                    response = self.assertWithinBudget("get", url, **auth)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response.query_budget[2], used)
+
+    def test_read_routes(self):
+        product = self.products[0]
+        product.slug = "neon-camisa-renomeada"
+        product.save()
+        for url in [
+            "/api/",
+            "/api/categories/",
+            f"/api/categories/{self.category.pk}/",
+            "/api/products/",
+            "/api/products/?page_size=5",
+            "/api/products/?search=neon&page_size=5",
+            f"/api/products/?category={self.category.slug}",
+            f"/api/products/{product.pk}/",
+            "/api/products/slug/neon-camisa-renomeada/",
+            "/api/products/slug/neon-camisa-0/",
+        ]:
+            with self.subTest(url=url):
+                cache.clear()
+                self.assertEqual(self.assertWithinBudget("get", url).status_code, 200)
+
+    def test_write_routes(self):
+        product = self.products[1]
+        response = self.assertWithinBudget(
+            "post", "/api/products/", {"name": "Novo Item", "slug": "novo", "price": "5.00"}, **self.admin_auth
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.assertWithinBudget(
+            "patch", f"/api/products/{product.pk}/", {"price": "7.00"}, format="json", **self.admin_auth
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.assertWithinBudget(
+            "put",
+            f"/api/products/{product.pk}/",
+            {"name": "Trocado", "slug": "trocado", "price": "8.00"},
+            format="json",
+            **self.admin_auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.assertWithinBudget("delete", f"/api/products/{product.pk}/", **self.admin_auth)
+        self.assertEqual(response.status_code, 204)
+
+    def test_cache_stats(self):
+        response = self.assertWithinBudget("get", "/api/catalog/cache-stats/", **self.admin_auth)
+        self.assertEqual(response.status_code, 200)
+
+
+class AsyncCatalogTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_search_backends()
+        self.addCleanup(reset_search_backends)
+        self.category = Category.objects.create(name="Roupas", slug="roupas")
+        self.products = [
+            Product.objects.create(
+                name=f"Neon Camisa {i}", slug=f"neon-camisa-{i}", price="10.00", category=self.category
+            )
+            for i in range(5)
+        ]
+        get_search_backend().rebuild()
+
+    def assertSameAsSync(self, path):
+        sync = self.client.get(f"/api/{path}")
+        async_ = self.assertWithinBudget("get", f"/api/async/{path}")
+        self.assertEqual(async_.status_code, sync.status_code)
+        self.assertIn(async_["X-Catalog-Cache"], ("HIT", "MISS"))
+        if "next" in sync.json():
+            self.assertEqual(async_.json()["results"], sync.json()["results"])
+            self.assertEqual(
+                async_.json()["next"].replace("/api/async/", "/api/"), sync.json()["next"]
+            )
+        else:
+            self.assertEqual(async_.content, sync.content)
+        return async_
+
+    def test_reads_match_the_drf_views(self):
+        product = self.products[0]
+        for path in [
+            "products/",
+            "products/?page_size=2",
+            "products/?search=neon&page_size=2",
+            f"products/?category={self.category.slug}",
+            f"products/{product.pk}/",
+            "categories/",
+            f"categories/{self.category.pk}/",
+        ]:
+            with self.subTest(path=path):
+                self.assertSameAsSync(path)
+
+        response = self.assertSameAsSync("products/?page_size=2")
+        next_page = self.client.get(response.json()["next"])
+        self.assertEqual(len(next_page.json()["results"]), 2)
+
+    def test_slug_lookup_and_conditional_get(self):
+        first = self.assertWithinBudget("get", "/api/async/products/slug/neon-camisa-1/")
+        self.assertEqual(first.json()["id"], self.products[1].pk)
+
+        repeat = self.client.get(
+            "/api/async/products/slug/neon-camisa-1/", HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat["X-Catalog-Cache"], "HIT")
+
+    def test_errors_use_the_drf_format(self):
+        self.assertEqual(
+            self.client.get("/api/async/products/999/").json(), {"detail": "No Product matches the given query."}
+        )
+        self.assertEqual(self.client.get("/api/async/products/slug/nada/").status_code, 404)
+        self.assertEqual(self.client.get("/api/async/products/?cursor=lixo").json(), {"detail": "Invalid cursor."})
+        self.assertEqual(self.client.post("/api/async/products/").status_code, 405)
+
+    async def test_served_by_the_async_handler(self):
+        response = await self.aassertWithinBudget("get", "/api/async/products/?page_size=3")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 3)
+        # A query roda numa thread do sync_to_async e ainda assim e contada.
+        self.assertEqual(response.query_budget, ("product_list", 1, 1))
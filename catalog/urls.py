@@ -1,9 +1,19 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from catalog.views import CategoryViewSet, ProductViewSet
+from catalog import async_views
+from catalog.views import CatalogCacheStatsView, CategoryViewSet, ProductViewSet
 
 router = DefaultRouter()
 router.register("categories", CategoryViewSet)
 router.register("products", ProductViewSet)
 
-urlpatterns = router.urls
+urlpatterns = [
+    path("catalog/cache-stats/", CatalogCacheStatsView.as_view(), name="catalog-cache-stats"),
+    # Leituras async (ORM async), para rodar sob config.asgi.
+    path("async/products/", async_views.product_list, name="async-product-list"),
+    path("async/products/<int:pk>/", async_views.product_detail, name="async-product-detail"),
+    path("async/products/slug/<str:slug>/", async_views.product_by_slug, name="async-product-by-slug"),
+    path("async/categories/", async_views.category_list, name="async-category-list"),
+    path("async/categories/<int:pk>/", async_views.category_detail, name="async-category-detail"),
+] + router.urls
@@ -1,8 +1,46 @@
-from django.db import models
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date
 from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from catalog.cache import CachedCatalogMixin, cache_stats
+from catalog.facets import facet_counts
+from catalog.feed import NDJSONRenderer, feed_chunks, feed_response
+from catalog.filters import filter_products, product_ordering
 from catalog.models import Category, Product
-from catalog.serializers import CategorySerializer, ProductSerializer
+from catalog.serializers import (
+    CategorySerializer,
+    ProductSerializer,
+    product_rows,
+    serialize_product_rows,
+)
+from core.pagination import KeysetPagination
+from core.query_budget import query_budget
+
+
+def product_validators(product):
+    return {
+        "ETag": f'"{product.pk}-{product.updated_at.timestamp():.6f}"',
+        "Last-Modified": http_date(int(product.updated_at.timestamp())),
+    }
+
+
+def conditional_response(request, response):
+    """304 quando If-None-Match/If-Modified-Since batem com o produto em cache."""
+    not_modified = get_conditional_response(
+        request,
+        etag=response["ETag"],
+        last_modified=parse_http_date(response["Last-Modified"]),
+    )
+    if not_modified is None:
+        return response
+    for header in ("ETag", "Last-Modified", "X-Catalog-Cache"):
+        not_modified[header] = response[header]
+    return not_modified
 
 
 class ReadOnlyOrAdmin(permissions.BasePermission):
@@ -12,29 +50,93 @@ class ReadOnlyOrAdmin(permissions.BasePermission):
         )
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(CachedCatalogMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
+    query_budgets = {"list": 1, "retrieve": 1}
 
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
+class ProductViewSet(CachedCatalogMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.select_related("category")
     serializer_class = ProductSerializer
     permission_classes = [ReadOnlyOrAdmin]
+    pagination_class = KeysetPagination
+    # Listagem, facetas e feed dependem de is_staff: com JWT, a busca do
+    # usuario + 1 query (anonimo, so a query). Escritas: usuario do JWT,
+    # validacao do slug, o save e os signals de busca e de alias
+    # (update_or_create, com savepoint quando aninhado), mais o UPDATE do
+    # image_meta quando a imagem muda e o delta das facetas.
+    query_budgets = {
+        "list": 2,
+        "retrieve": 1,
+        "create": 12,
+        "update": 13,
+        "partial_update": 13,
+        "destroy": 8,
+    }
+
+    def get_keyset_ordering(self):
+        return product_ordering(self.request.query_params)
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        search = self.request.query_params.get("search")
-        category_slug = self.request.query_params.get("category")
+        # Detalhe e escritas enxergam inativos; so a listagem filtra.
+        if self.action != "list":
+            return queryset
+        return filter_products(queryset, self.request.query_params, self.request.user.is_staff)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, self.list_rows)
+
+    def list_rows(self, request):
+        rows = product_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serialize_product_rows(page, request))
+        return Response(serialize_product_rows(rows, request))
+
+    @query_budget(2)
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        """Contagens por categoria, faixa de preco e ativo para ?category=/?search=."""
+        return self.cached_response(request, self.facet_data)
+
+    def facet_data(self, request):
+        return Response(facet_counts(request.query_params, request.user.is_staff))
+
+    # A query do feed roda ja no streaming, depois do middleware; a busca em
+    # memoria pode carregar o indice antes.
+    @query_budget(2)
+    @action(detail=False, methods=["get"], renderer_classes=[NDJSONRenderer, JSONRenderer])
+    def feed(self, request):
+        """Catalogo inteiro em NDJSON, com os filtros da listagem, sem cache nem paginacao."""
+        queryset = filter_products(Product.objects.all(), request.query_params, request.user.is_staff)
+        return feed_response(request._request, feed_chunks(queryset, request))
+
+    @query_budget(2)
+    @action(detail=False, methods=["get"], url_path=r"slug/(?P<slug>[^/]+)")
+    def by_slug(self, request, slug=None):
+        response = self.cached_response(request, self.product_by_slug, slug=slug)
+        if response.status_code != 200:
+            return response
+
+        return conditional_response(request, response)
+
+    def product_by_slug(self, request, slug):
+        products = Product.objects.select_related("category")
+        product = products.filter(slug=slug).first()
+        if product is None:
+            product = products.filter(slug_aliases__slug=slug.lower()).first()
+        if product is None:
+            raise Http404
+
+        return Response(self.get_serializer(product).data, headers=product_validators(product))
 
-        if search:
-            queryset = queryset.filter(
-                models.Q(name__icontains=search)
-                | models.Q(description__icontains=search)
-            )
 
-        if category_slug:
-            queryset = queryset.filter(category__slug=category_slug)
+class CatalogCacheStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    query_budgets = {"get": 1}
 
-        return queryset
+    def get(self, request):
+        return Response(cache_stats())
@@ -1,17 +1,14 @@
 import os
 from pathlib import Path
 import dj_database_url
+from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 ENV_PATH = BASE_DIR / ".env"
 
-if ENV_PATH.exists():
-    for line in ENV_PATH.read_text().splitlines():
-        if not line or line.startswith("#") or "=" not in line:
-            continue
-        key, value = line.split("=", 1)
-        os.environ.setdefault(key, value.strip().strip('"').strip("'"))
+# Variaveis ja definidas no ambiente tem prioridade sobre o .env.
+load_dotenv(ENV_PATH, override=False)
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get(
@@ -40,7 +37,6 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'cloudinary',
     'corsheaders',
     'rest_framework',
     'drf_spectacular',
@@ -51,8 +47,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
+    "core.query_budget.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "core.middleware.WhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -62,6 +60,28 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Metricas em /api/metrics (core.metrics). Entre workers do gunicorn elas sao
+# agregadas via PROMETHEUS_MULTIPROC_DIR, definido em gunicorn.conf.py.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "True") == "True"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+if not DEBUG and METRICS_ENABLED and not METRICS_TOKEN:
+    raise RuntimeError("METRICS_TOKEN deve estar definido em producao (/api/metrics e publico sem ele).")
+# Custo maximo aceito do middleware por requisicao (conferido por bench_metrics).
+METRICS_OVERHEAD_BUDGET_MS = 0.25
+
+# Cold start de um worker (settings, apps, WSGI e urlconf), medido por
+# `python manage.py startup_profile`; ~1,5 s antes dos SDKs sob demanda.
+WORKER_BOOT_BUDGET_MS = float(os.environ.get("WORKER_BOOT_BUDGET_MS", "1000"))
+
+# Orcamento de queries por view (core.query_budget): "raise", "warn" ou "off".
+QUERY_BUDGET_MODE = os.environ.get("QUERY_BUDGET_MODE", "warn" if DEBUG else "off")
+# Views de terceiros, pelo mesmo label das metricas.
+QUERY_BUDGETS = {
+    "APIRootView.get": 1,
+    "TokenObtainPairView.post": 1,
+    "TokenRefreshView.post": 1,
+}
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -89,6 +109,22 @@ DATABASES = {
     )
 }
 
+# Cache: locmem por processo so em desenvolvimento. Em producao a versao do
+# catalogo (catalog.cache) precisa ser compartilhada entre os workers: com
+# locmem, cada worker invalidaria so o proprio cache e os outros serviriam
+# paginas antigas.
+REDIS_URL = os.environ.get("REDIS_URL")
+if not DEBUG and not REDIS_URL:
+    raise RuntimeError("REDIS_URL deve estar definido em producao (cache compartilhado entre os workers).")
+CACHES = {
+    "default": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}
+        if REDIS_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+CATALOG_CACHE_TIMEOUT = int(os.environ.get("CATALOG_CACHE_TIMEOUT", "300"))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -105,6 +141,8 @@ REST_FRAMEWORK = {
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ],
 }
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", "24"))
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", "100"))
 
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -128,24 +166,83 @@ STORAGES = {
 }
 
 MEDIA_URL = "/media/"
+MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 WHITENOISE_USE_FINDERS = True
 
-# Diagnostico (remova depois que funcionar)
-print("CLOUDINARY ENV OK?",
-      bool(os.environ.get("CLOUDINARY_CLOUD_NAME")),
-      bool(os.environ.get("CLOUDINARY_API_KEY")),
-      bool(os.environ.get("CLOUDINARY_API_SECRET")))
+if not all(CLOUDINARY_STORAGE.values()):
+    if not DEBUG:
+        raise RuntimeError("Cloudinary env vars faltando no Render.")
+    # Desenvolvimento sem Cloudinary: imagens e derivados ficam em MEDIA_ROOT.
+    STORAGES["default"] = {"BACKEND": "django.core.files.storage.FileSystemStorage"}
 
-if not DEBUG and not all(CLOUDINARY_STORAGE.values()):
-    raise RuntimeError("Cloudinary env vars faltando no Render.")
+# Derivados de Product.image (catalog.images): larguras em WebP para o srcset.
+PRODUCT_IMAGE_WIDTHS = tuple(
+    int(width) for width in os.environ.get("PRODUCT_IMAGE_WIDTHS", "320,640,960,1280").split(",")
+)
+PRODUCT_IMAGE_QUALITY = int(os.environ.get("PRODUCT_IMAGE_QUALITY", "80"))
+# URLs de storage.url() memoizadas por processo (core.storage_urls); 0 desliga.
+STORAGE_URL_CACHE_SIZE = int(os.environ.get("STORAGE_URL_CACHE_SIZE", "10000"))
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")
+# Geracao de descricoes: "openai" ou "fake" (LLM local, sem rede).
+AI_BACKEND = os.getenv("AI_BACKEND", "openai")
+AI_JOBS_IN_PROCESS = os.getenv("AI_JOBS_IN_PROCESS", "True") == "True"
+AI_JOB_WORKERS = int(os.getenv("AI_JOB_WORKERS", "4"))
+# Job sem sinal de vida por AI_JOB_LEASE segundos pode ser retomado por outro processo.
+AI_JOB_LEASE = int(os.getenv("AI_JOB_LEASE", "300"))
+AI_REQUESTS_PER_SECOND = float(os.getenv("AI_REQUESTS_PER_SECOND", "2"))
+AI_MAX_ATTEMPTS = int(os.getenv("AI_MAX_ATTEMPTS", "3"))
+AI_RETRY_BACKOFF = float(os.getenv("AI_RETRY_BACKOFF", "1.0"))
+AI_CACHE_TTL = int(os.getenv("AI_CACHE_TTL", str(30 * 24 * 3600)))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "10000"))
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+# Vazio usa a API real; aponte para orders.fake_stripe em testes/benchmarks.
+STRIPE_API_BASE = os.getenv("STRIPE_API_BASE", "")
+STRIPE_SESSION_REUSE_MARGIN = int(os.environ.get("STRIPE_SESSION_REUSE_MARGIN", "300"))
+# Eventos do webhook: gravados na resposta e processados pelo worker (ou por process_stripe_events).
+STRIPE_EVENTS_WORKER_THREAD = os.environ.get("STRIPE_EVENTS_WORKER_THREAD", "True") == "True"
+STRIPE_EVENTS_POLL_INTERVAL = float(os.environ.get("STRIPE_EVENTS_POLL_INTERVAL", "5"))
+STRIPE_EVENTS_BATCH_SIZE = int(os.environ.get("STRIPE_EVENTS_BATCH_SIZE", "50"))
+STRIPE_EVENTS_MAX_ATTEMPTS = int(os.environ.get("STRIPE_EVENTS_MAX_ATTEMPTS", "5"))
+STRIPE_EVENTS_RETRY_BASE = int(os.environ.get("STRIPE_EVENTS_RETRY_BASE", "30"))
 RESEND_API_KEY = os.environ.get("RESEND_API_KEY")
 RESEND_FROM = os.environ.get("RESEND_FROM")
+RESEND_API_URL = os.environ.get("RESEND_API_URL", "https://api.resend.com")
+# Clientes HTTP de saida (core.http): pool, timeouts e circuit breaker por provedor.
+OUTBOUND_HTTP = {
+    name: {
+        "read_timeout": float(os.environ.get(f"{name.upper()}_READ_TIMEOUT", default)),
+        "failure_threshold": int(os.environ.get("OUTBOUND_FAILURE_THRESHOLD", "5")),
+        "reset_timeout": float(os.environ.get("OUTBOUND_RESET_TIMEOUT", "30")),
+    }
+    for name, default in (("openai", "30"), ("resend", "10"), ("stripe", "20"))
+}
+# Outbox de e-mails: drenado por uma thread no processo web e/ou pelo comando
+# `python manage.py drain_outbox --loop`.
+OUTBOX_WORKER_THREAD = os.environ.get("OUTBOX_WORKER_THREAD", "True") == "True"
+OUTBOX_POLL_INTERVAL = float(os.environ.get("OUTBOX_POLL_INTERVAL", "5"))
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BASE = int(os.environ.get("OUTBOX_RETRY_BASE", "30"))
+# Reservas de estoque: pedido pendente segura o estoque por STOCK_RESERVATION_TTL
+# segundos, renovado ao abrir o checkout (que expira junto; o Stripe aceita de
+# 30 min a 24 h). Vencidas sao devolvidas pela thread ou por `release_expired_stock --loop`.
+STOCK_RESERVATION_TTL = int(os.environ.get("STOCK_RESERVATION_TTL", "3600"))
+STOCK_WORKER_THREAD = os.environ.get("STOCK_WORKER_THREAD", "True") == "True"
+STOCK_RELEASE_INTERVAL = float(os.environ.get("STOCK_RELEASE_INTERVAL", "60"))
+STOCK_RELEASE_BATCH_SIZE = int(os.environ.get("STOCK_RELEASE_BATCH_SIZE", "100"))
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
+# Busca do catalogo: "postgres" (tsvector/GIN) ou "memory" (indice em processo).
+# Vazio escolhe pelo vendor do banco.
+CATALOG_SEARCH_BACKEND = os.getenv("CATALOG_SEARCH_BACKEND", "")
+CATALOG_SEARCH_MAX_RESULTS = int(os.getenv("CATALOG_SEARCH_MAX_RESULTS", "500"))
+# Limites das faixas de preco das facetas. Mudou? Rode `manage.py check_facets --rebuild`.
+CATALOG_PRICE_BUCKETS = tuple(os.getenv("CATALOG_PRICE_BUCKETS", "50,100,250,500,1000").split(","))
+# /api/products/feed/ (NDJSON): produtos lidos e enviados por lote.
+CATALOG_FEED_CHUNK_SIZE = int(os.getenv("CATALOG_FEED_CHUNK_SIZE", "1000"))
 CORS_ALLOWED_ORIGINS = [origin.strip() for origin in os.environ.get("CORS_ALLOWED_ORIGINS", "http://localhost:3000").split(",")]
 SPECTACULAR_SETTINGS = {
     "TITLE": "Loja.IA API",
@@ -154,10 +251,6 @@ SPECTACULAR_SETTINGS = {
     "SERVE_INCLUDE_SCHEMA": False,
 }
 
-import os
-print("--- DEBUG DO SISTEMA ---")
-print(f"Arquivo .env carregado? {os.environ.get('CLOUDINARY_CLOUD_NAME')}")
-print("------------------------")
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '587'))
@@ -18,9 +18,26 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from core.query_budget import query_budget
+
+
+# drf_spectacular (gerador de schema, yaml...) so e importado quando a doc e pedida.
+@query_budget(1)
+def schema_view(request, *args, **kwargs):
+    from drf_spectacular.views import SpectacularAPIView
+
+    return SpectacularAPIView.as_view()(request, *args, **kwargs)
+
+
+@query_budget(1)
+def swagger_view(request, *args, **kwargs):
+    from drf_spectacular.views import SpectacularSwaggerView
+
+    return SpectacularSwaggerView.as_view(url_name='schema')(request, *args, **kwargs)
+
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('catalog.urls')),
@@ -28,8 +45,8 @@ urlpatterns = [
     path('api/', include('core.urls')),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
+    path('api/schema/', schema_view, name='schema'),
+    path('api/docs/', swagger_view, name='swagger-ui'),
 ]
 
 if settings.DEBUG:
@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from core.metrics import install_query_dispatch
+
+        connection_created.connect(install_query_dispatch, dispatch_uid="core.query_dispatch")
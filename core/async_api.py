@@ -0,0 +1,60 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+
+_renderer = JSONRenderer()
+
+
+def json_response(data, status=200, headers=None):
+    """Resposta JSON com os mesmos bytes do JSONRenderer do DRF."""
+    return HttpResponse(
+        _renderer.render(data), status=status, headers=headers, content_type="application/json"
+    )
+
+
+def async_api_view(methods):
+    """Views async fora do DRF (as APIViews ainda sao so sync).
+
+    Confere o metodo, dispensa CSRF (a API nao usa sessao) e devolve os erros
+    no formato {"detail": ...} do DRF.
+    """
+
+    def decorate(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return json_response(
+                    {"detail": f'Method "{request.method}" not allowed.'},
+                    status=405,
+                    headers={"Allow": ", ".join(methods)},
+                )
+            try:
+                return await view(request, *args, **kwargs)
+            except Http404 as exc:
+                return json_response({"detail": str(exc) or "Not found."}, status=404)
+            except APIException as exc:
+                # Como o exception_handler do DRF: erros de validacao vao sem "detail".
+                data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+                return json_response(data, status=exc.status_code)
+
+        return wrapper
+
+    return decorate
+
+
+async def iterate_in_thread(iterator):
+    """Itera um iterador sync (ex.: ORM com .iterator()) item a item numa thread.
+
+    Sob ASGI, o StreamingHttpResponse com iterador sync le tudo para uma lista
+    antes de enviar o primeiro byte; assim cada item sai assim que fica pronto.
+    """
+    iterator = iter(iterator)
+    done = object()
+    step = sync_to_async(next, thread_sensitive=True)
+    while (item := await step(iterator, done)) is not done:
+        yield item
@@ -0,0 +1,62 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWorker:
+    """Thread daemon que executa ``task`` em loop, acordada por wake().
+
+    ``task`` devolve quantos itens processou; enquanto devolver um lote cheio
+    (``batch_size``) o loop segue sem esperar o intervalo.
+    """
+
+    def __init__(self, name, task, interval=5.0, batch_size=None):
+        self.name = name
+        self.task = task
+        self.interval = interval
+        self.batch_size = batch_size
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wakeup.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        from django.db import close_old_connections, connections
+
+        try:
+            while not self._stop.is_set():
+                self._wakeup.clear()
+                processed = 0
+                try:
+                    close_old_connections()
+                    processed = self.task()
+                except Exception:
+                    logger.exception("%s: falha no ciclo do worker", self.name)
+                if self.batch_size and processed and processed >= self.batch_size:
+                    continue
+                self._wakeup.wait(self.interval)
+        finally:
+            connections.close_all()
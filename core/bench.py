@@ -0,0 +1,123 @@
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Resumo em milissegundos de uma lista de duracoes em segundos."""
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+@contextmanager
+def scratch_database(verbosity=0, concurrent=False):
+    """Cria um banco de teste descartavel para os benchmarks.
+
+    Os comandos bench_* nunca escrevem no banco configurado: usam o mesmo
+    mecanismo do test runner (test_<NAME> no Postgres, memoria no SQLite).
+    Com ``concurrent=True`` o SQLite vai para um arquivo temporario, ja que o
+    banco em memoria compartilhado falha com "table is locked" entre threads.
+    """
+    old_name = connection.settings_dict["NAME"]
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    old_test_name = test_settings.get("NAME")
+    tmp_dir = None
+    if concurrent and connection.vendor == "sqlite":
+        tmp_dir = tempfile.mkdtemp(prefix="bench-")
+        test_settings["NAME"] = os.path.join(tmp_dir, "bench.sqlite3")
+
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        test_settings["NAME"] = old_test_name
+        if tmp_dir is not None:
+            os.rmdir(tmp_dir)
+
+
+def seed_users(count, password="bench-password"):
+    """Usuarios sinteticos; o hash da senha e calculado uma unica vez."""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+
+    User = get_user_model()
+    hashed = make_password(password)
+    return User.objects.bulk_create(
+        [User(email=f"bench-{i}@example.com", password=hashed) for i in range(count)],
+        batch_size=1000,
+    )
+
+
+def measure(fn, iterations, setup=None):
+    """Roda ``fn`` N vezes e devolve latencias, vazao e queries por chamada.
+
+    ``setup`` roda antes de cada chamada, fora da medicao (ex.: invalidar cache).
+    """
+    from django.test.utils import CaptureQueriesContext
+
+    samples = []
+    queries = 0
+    wall = 0.0
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+        samples.append(elapsed)
+        wall += elapsed
+        queries += len(ctx.captured_queries)
+    return {
+        **summarize(samples),
+        "throughput_rps": round(iterations / wall, 1) if wall else 0.0,
+        "queries_per_request": round(queries / iterations, 2) if iterations else 0.0,
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance=0.25):
+    """Lista as regressoes em relacao ao baseline salvo.
+
+    Queries por requisicao nao podem crescer; p95 pode piorar ate ``tolerance``
+    (fracao) antes de contar como regressao.
+    """
+    regressions = []
+    for name, expected in baseline.items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if current["queries_per_request"] > expected["queries_per_request"]:
+            regressions.append(
+                f"{name}: queries/req {current['queries_per_request']} > {expected['queries_per_request']}"
+            )
+        limit = expected["p95_ms"] * (1 + tolerance)
+        if current["p95_ms"] > limit:
+            regressions.append(f"{name}: p95 {current['p95_ms']} ms > {round(limit, 3)} ms")
+    return regressions
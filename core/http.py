@@ -0,0 +1,276 @@
+import asyncio
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from core.bench import summarize
+from core.metrics import observe_outbound, observe_rejected
+
+# Padroes por provedor; OUTBOUND_HTTP = {"stripe": {"read_timeout": 30}} sobrescreve.
+DEFAULTS = {
+    "connect_timeout": 3.05,
+    "read_timeout": 20.0,
+    "pool_maxsize": 10,
+    # Um worker async atende muitas requisicoes ao mesmo tempo com um pool so.
+    "async_pool_maxsize": 100,
+    "failure_threshold": 5,
+    "reset_timeout": 30.0,
+}
+PROVIDER_DEFAULTS = {
+    "openai": {"read_timeout": 30.0},
+    "resend": {"read_timeout": 10.0},
+    "stripe": {"read_timeout": 20.0},
+}
+
+
+class CircuitOpenError(Exception):
+    """O provedor falhou demais em sequencia; a chamada nem sai do processo."""
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            # Meio aberto: uma unica chamada de teste passa; as outras falham rapido.
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+        raise CircuitOpenError(f"{self.name}: circuito aberto")
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+class ProviderMetrics:
+    """Contadores em processo (/api/outbound-stats/), espelhados no Prometheus."""
+
+    def __init__(self, name, window=1000):
+        self.name = name
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, elapsed, failed):
+        with self._lock:
+            self.requests += 1
+            self.errors += failed
+            self.latencies.append(elapsed)
+        observe_outbound(self.name, elapsed, failed)
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+        observe_rejected(self.name)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = list(self.latencies)
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "rejected": self.rejected,
+                "latency": summarize(latencies),
+            }
+
+
+def is_failure_status(status_code):
+    # 4xx e problema do pedido, nao do provedor; 429 e 5xx abrem o circuito.
+    return status_code == 429 or status_code >= 500
+
+
+class CallOutcome:
+    status_code = None
+
+
+class Provider:
+    """Conexoes, timeouts, circuit breaker e metricas de um provedor externo."""
+
+    def __init__(self, name, **options):
+        config = {**DEFAULTS, **PROVIDER_DEFAULTS.get(name, {}), **options}
+        self.name = name
+        self.connect_timeout = config["connect_timeout"]
+        self.read_timeout = config["read_timeout"]
+        self.pool_maxsize = config["pool_maxsize"]
+        self.async_pool_maxsize = config["async_pool_maxsize"]
+        self.breaker = CircuitBreaker(
+            name, failure_threshold=config["failure_threshold"], reset_timeout=config["reset_timeout"]
+        )
+        self.metrics = ProviderMetrics(name)
+        self._session = None
+        self._httpx_client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    @contextmanager
+    def call(self):
+        """Envolve uma chamada: falha rapido com o circuito aberto e mede a latencia.
+
+        O bloco pode atribuir ``outcome.status_code``; 429/5xx contam como falha.
+        """
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.metrics.reject()
+            raise
+
+        outcome = CallOutcome()
+        start = time.perf_counter()
+        try:
+            yield outcome
+        except Exception:
+            self.metrics.observe(time.perf_counter() - start, True)
+            self.breaker.record_failure()
+            raise
+        failed = outcome.status_code is not None and is_failure_status(outcome.status_code)
+        self.metrics.observe(time.perf_counter() - start, failed)
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    @property
+    def session(self):
+        """requests.Session com pool keep-alive (Resend, Stripe)."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    # requests/httpx so entram no processo na primeira chamada.
+                    from requests.adapters import HTTPAdapter
+
+                    from core.http_clients import ProviderSession
+
+                    session = ProviderSession(self)
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    @property
+    def httpx_client(self):
+        """httpx.Client com pool keep-alive (SDK da OpenAI)."""
+        if self._httpx_client is None:
+            with self._lock:
+                if self._httpx_client is None:
+                    import httpx
+
+                    from core.http_clients import ProviderTransport
+
+                    self._httpx_client = httpx.Client(
+                        transport=ProviderTransport(
+                            self,
+                            httpx.HTTPTransport(
+                                limits=httpx.Limits(
+                                    max_connections=self.pool_maxsize,
+                                    max_keepalive_connections=self.pool_maxsize,
+                                )
+                            ),
+                        ),
+                        timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                    )
+        return self._httpx_client
+
+    @property
+    def async_client(self):
+        """httpx.AsyncClient do event loop corrente (views async, Stripe async).
+
+        Um por loop: conexoes de um pool async nao podem ser usadas em outro
+        loop. Sob uvicorn ha um loop por worker, entao na pratica e um so.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            import httpx
+
+            from core.http_clients import ProviderAsyncTransport
+
+            client = self._async_clients[loop] = httpx.AsyncClient(
+                transport=ProviderAsyncTransport(
+                    self,
+                    httpx.AsyncHTTPTransport(
+                        limits=httpx.Limits(
+                            max_connections=self.async_pool_maxsize,
+                            max_keepalive_connections=self.async_pool_maxsize,
+                        )
+                    ),
+                ),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            )
+        return client
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+        if self._httpx_client is not None:
+            self._httpx_client.close()
+        # Clientes async so fecham dentro do proprio loop; soltar a referencia basta.
+        self._async_clients.clear()
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name):
+    provider = _providers.get(name)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(name)
+            if provider is None:
+                options = getattr(settings, "OUTBOUND_HTTP", {}).get(name, {})
+                provider = _providers[name] = Provider(name, **options)
+    return provider
+
+
+def reset_providers():
+    with _providers_lock:
+        for provider in _providers.values():
+            provider.close()
+        _providers.clear()
+
+
+def outbound_stats():
+    return {
+        name: {"circuit": provider.breaker.state, **provider.metrics.snapshot()}
+        for name, provider in sorted(_providers.items())
+    }
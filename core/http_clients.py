@@ -0,0 +1,46 @@
+# Carregado sob demanda por core.http: requests e httpx pesam no boot do worker.
+import httpx
+import requests
+
+
+class ProviderSession(requests.Session):
+    def __init__(self, provider):
+        super().__init__()
+        self.provider = provider
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.provider.timeout)
+        with self.provider.call() as outcome:
+            response = super().request(method, url, **kwargs)
+            outcome.status_code = response.status_code
+        return response
+
+
+class ProviderTransport(httpx.BaseTransport):
+    def __init__(self, provider, transport):
+        self.provider = provider
+        self.transport = transport
+
+    def handle_request(self, request):
+        with self.provider.call() as outcome:
+            response = self.transport.handle_request(request)
+            outcome.status_code = response.status_code
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class ProviderAsyncTransport(httpx.AsyncBaseTransport):
+    def __init__(self, provider, transport):
+        self.provider = provider
+        self.transport = transport
+
+    async def handle_async_request(self, request):
+        with self.provider.call() as outcome:
+            response = await self.transport.handle_async_request(request)
+            outcome.status_code = response.status_code
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -0,0 +1,204 @@
+import json
+import random
+import time
+from itertools import count
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from catalog.bench import ADJECTIVES, NOUNS, seed_catalog
+from catalog.cache import bump_catalog_version, get_cache
+from catalog.models import Product
+from catalog.search import get_search_backend, reset_search_backends
+from core.bench import compare_to_baseline, measure, scratch_database, seed_users
+from orders.bench import seed_orders
+from orders.fake_stripe import FakeStripeServer
+from orders.models import Order, StripeEvent
+from orders.stripe_client import reset_stripe_client
+from orders.webhooks import process_pending_events, sign_payload
+
+SCENARIOS = [
+    "catalog_list",
+    "catalog_list_cached",
+    "search",
+    "slug_detail",
+    "order_create",
+    "checkout_session",
+    "webhook_ack",
+    "webhook_process",
+]
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "baseline.json"
+WEBHOOK_SECRET = "whsec_bench"
+
+
+class Command(BaseCommand):
+    help = (
+        "Suite de benchmark ponta a ponta: popula um banco descartavel e mede "
+        "os endpoints reais (latencia, vazao, queries por requisicao), "
+        "comparando com o baseline salvo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--categories", type=int, default=8)
+        parser.add_argument("--products", type=int, default=5_000)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--orders", type=int, default=2_000)
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+        parser.add_argument("--tolerance", type=float, default=0.25, help="Piora aceita no p95 (fracao).")
+        parser.add_argument("--update-baseline", action="store_true", help="Grava o resultado como baseline.")
+        parser.add_argument("--no-compare", action="store_true")
+
+    def handle(self, *args, **options):
+        with scratch_database(), FakeStripeServer() as stripe_server, override_settings(
+            STRIPE_API_BASE=stripe_server.url,
+            STRIPE_SECRET_KEY="sk_test_bench",
+            STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET,
+            STRIPE_EVENTS_WORKER_THREAD=False,
+            OUTBOX_WORKER_THREAD=False,
+        ):
+            reset_stripe_client()
+            reset_search_backends()
+            get_cache().clear()
+            try:
+                self.seed(options)
+                results = {
+                    name: getattr(self, f"scenario_{name}")(options["iterations"])
+                    for name in options["scenarios"]
+                }
+            finally:
+                reset_stripe_client()
+                reset_search_backends()
+
+        report = {
+            "vendor": connection.vendor,
+            "volumes": {key: options[key] for key in ("categories", "products", "users", "orders")},
+            "iterations": options["iterations"],
+            "scenarios": results,
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+
+        baseline_path = Path(options["baseline"])
+        if options["update_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+            self.stderr.write(f"Baseline gravado em {baseline_path}.")
+            return
+        if options["no_compare"] or not baseline_path.exists():
+            return
+
+        baseline = json.loads(baseline_path.read_text())
+        if (baseline.get("vendor"), baseline.get("volumes")) != (report["vendor"], report["volumes"]):
+            self.stderr.write("Banco ou volumes diferentes do baseline; comparacao ignorada.")
+            return
+        regressions = compare_to_baseline(results, baseline["scenarios"], options["tolerance"])
+        if regressions:
+            raise CommandError("Regressoes em relacao ao baseline:\n" + "\n".join(regressions))
+        self.stderr.write("Sem regressoes em relacao ao baseline.")
+
+    def seed(self, options):
+        seed_catalog(options["products"], categories=options["categories"])
+        get_search_backend().rebuild()
+        users = seed_users(options["users"])
+        self.products = list(Product.objects.filter(is_active=True).order_by("id"))
+        seed_orders(options["orders"], self.products, users)
+
+        self.rng = random.Random(1)
+        self.client = Client()
+        self.ids = count(1)
+
+    def order_payload(self, lines=5):
+        return json.dumps(
+            {
+                "full_name": "Bench",
+                "email": "bench@example.com",
+                "address": "Rua do Benchmark, 1",
+                "items": [
+                    {"product_id": product.id, "quantity": self.rng.randint(1, 3)}
+                    for product in self.rng.sample(self.products, lines)
+                ],
+            }
+        )
+
+    def get(self, url):
+        response = self.client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+        return response
+
+    def post(self, url, body, expected=200, **extra):
+        response = self.client.post(url, body, content_type="application/json", **extra)
+        assert response.status_code == expected, (url, response.status_code, response.content[:200])
+        return response
+
+    def scenario_catalog_list(self, iterations):
+        # Versao nova a cada chamada: mede o caminho sem cache.
+        return measure(lambda: self.get("/api/products/?page_size=24"), iterations, setup=bump_catalog_version)
+
+    def scenario_catalog_list_cached(self, iterations):
+        self.get("/api/products/?page_size=24")
+        return measure(lambda: self.get("/api/products/?page_size=24"), iterations)
+
+    def scenario_search(self, iterations):
+        terms = [adjective.lower() for adjective in ADJECTIVES] + [noun.lower()[:3] for noun in NOUNS]
+        return measure(
+            lambda: self.get(f"/api/products/?page_size=24&search={self.rng.choice(terms)}"),
+            iterations,
+            setup=bump_catalog_version,
+        )
+
+    def scenario_slug_detail(self, iterations):
+        return measure(
+            lambda: self.get(f"/api/products/slug/{self.rng.choice(self.products).slug}/"),
+            iterations,
+            setup=bump_catalog_version,
+        )
+
+    def scenario_order_create(self, iterations):
+        return measure(lambda: self.post("/api/orders/", self.order_payload(), expected=201), iterations)
+
+    def scenario_checkout_session(self, iterations):
+        order_ids = [
+            self.post("/api/orders/", self.order_payload(), expected=201).json()["id"]
+            for _ in range(iterations)
+        ]
+        pending = iter(order_ids)
+        return measure(
+            lambda: self.post(
+                "/api/orders/create-checkout-session/", json.dumps({"order_id": next(pending)})
+            ),
+            iterations,
+        )
+
+    def scenario_webhook_ack(self, iterations):
+        # Rajada com reenvios: cada evento chega duas vezes, fora de ordem.
+        order_ids = list(
+            Order.objects.filter(status=Order.STATUS_PENDING).values_list("id", flat=True)[: iterations // 2 or 1]
+        )
+        now = int(time.time())
+        bodies = []
+        for order_id in order_ids:
+            event = {
+                "id": f"evt_bench_{next(self.ids)}",
+                "type": "checkout.session.completed",
+                "created": now,
+                "data": {"object": {"payment_status": "paid", "metadata": {"order_id": str(order_id)}}},
+            }
+            bodies += [json.dumps(event)] * 2
+        self.rng.shuffle(bodies)
+        pending = iter(bodies[:iterations])
+
+        def deliver():
+            body = next(pending)
+            self.post("/api/webhook/", body, HTTP_STRIPE_SIGNATURE=sign_payload(body, WEBHOOK_SECRET))
+
+        return measure(deliver, min(iterations, len(bodies)))
+
+    def scenario_webhook_process(self, iterations):
+        # Um evento por chamada, para que as queries por evento sejam comparaveis.
+        received = StripeEvent.objects.filter(status=StripeEvent.STATUS_RECEIVED).count()
+        with override_settings(STRIPE_EVENTS_BATCH_SIZE=1):
+            return measure(process_pending_events, min(iterations, received) or 1)
@@ -0,0 +1,95 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+
+from catalog.bench import seed_catalog
+from core.bench import scratch_database, summarize
+from core.middleware import MetricsMiddleware
+
+MIDDLEWARE_PATH = "core.middleware.MetricsMiddleware"
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o custo do MetricsMiddleware: isolado (view com N queries) e "
+        "ponta a ponta em GET /api/products/, com e sem o middleware."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000)
+        parser.add_argument("--queries", type=int, default=3, help="Queries da view sintetica.")
+        parser.add_argument("--requests", type=int, default=300)
+        parser.add_argument(
+            "--budget-ms",
+            type=float,
+            default=getattr(settings, "METRICS_OVERHEAD_BUDGET_MS", 0.25),
+            help="Custo maximo aceito por requisicao.",
+        )
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            isolated = self.isolated_overhead(options["iterations"], options["queries"])
+            seed_catalog(500)
+            end_to_end = self.end_to_end(options["requests"])
+
+        result = {
+            "vendor": connection.vendor,
+            "budget_ms": options["budget_ms"],
+            "isolated": isolated,
+            "end_to_end": end_to_end,
+            "within_budget": isolated["overhead_ms"] <= options["budget_ms"],
+        }
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def isolated_overhead(self, iterations, queries):
+        def view(request):
+            with connection.cursor() as cursor:
+                for _ in range(queries):
+                    cursor.execute("SELECT 1")
+            return HttpResponse("ok")
+
+        request = RequestFactory().get("/bench/")
+        middleware = MetricsMiddleware(view)
+
+        def run(handler):
+            samples = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                handler(request)
+                samples.append(time.perf_counter() - start)
+            return statistics.median(samples)
+
+        run(view), run(middleware)
+        bare, measured = run(view), run(middleware)
+        return {
+            "queries_per_request": queries,
+            "bare_p50_ms": round(bare * 1000, 4),
+            "with_metrics_p50_ms": round(measured * 1000, 4),
+            "overhead_ms": round((measured - bare) * 1000, 4),
+        }
+
+    def end_to_end(self, requests):
+        without = [name for name in settings.MIDDLEWARE if name != MIDDLEWARE_PATH]
+        results = {}
+        # Alterna as rodadas para que aquecimento e ruido afetem os dois lados.
+        samples = {"with_metrics": [], "without_metrics": []}
+        for _ in range(3):
+            for label, middleware in (("without_metrics", without), ("with_metrics", settings.MIDDLEWARE)):
+                with override_settings(MIDDLEWARE=middleware, CATALOG_CACHE_TIMEOUT=0):
+                    client = Client()
+                    for _ in range(requests):
+                        start = time.perf_counter()
+                        client.get("/api/products/?page_size=24")
+                        samples[label].append(time.perf_counter() - start)
+        for label, values in samples.items():
+            results[label] = summarize(values)
+        results["overhead_p50_ms"] = round(
+            results["with_metrics"]["p50_ms"] - results["without_metrics"]["p50_ms"], 3
+        )
+        return results
@@ -0,0 +1,54 @@
+import json
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.startup import profile_boot
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o cold start de um worker: tempo ate a urlconf carregada, RSS, "
+        "tempo de import por pacote e o custo de cada SDK carregado sob demanda."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Boots medidos; vale a mediana.")
+        parser.add_argument("--top", type=int, default=15, help="Pacotes mais lentos listados.")
+        parser.add_argument(
+            "--budget-ms",
+            type=float,
+            default=getattr(settings, "WORKER_BOOT_BUDGET_MS", 1000),
+            help="Boot maximo aceito (mediana).",
+        )
+        parser.add_argument("--check", action="store_true", help="Falha se o boot estourar o orcamento.")
+
+    def handle(self, *args, **options):
+        reports = [profile_boot() for _ in range(options["runs"])]
+        boot_ms = statistics.median(report["boot_ms"] for report in reports)
+        last = reports[-1]
+        packages = sorted(last["packages"].items(), key=lambda item: item[1], reverse=True)
+
+        result = {
+            "boot_ms": round(boot_ms, 1),
+            "budget_ms": options["budget_ms"],
+            "rss_mb": round(last["rss_mb"], 1),
+            "loaded_at_boot": last["loaded"],
+            "imports_ms": {name: round(ms, 1) for name, ms in packages[: options["top"]]},
+            "lazy": {
+                name: {key: round(value, 1) for key, value in cost.items()}
+                for name, cost in last["lazy"].items()
+            },
+        }
+        self.stdout.write(json.dumps(result, indent=2))
+
+        if options["check"]:
+            problems = []
+            if boot_ms > options["budget_ms"]:
+                problems.append(f"boot de {boot_ms:.0f} ms acima de {options['budget_ms']:.0f} ms")
+            if last["loaded"]:
+                problems.append(f"SDKs carregados no boot: {', '.join(last['loaded'])}")
+            if problems:
+                raise CommandError("; ".join(problems))
+
@@ -0,0 +1,129 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Com PROMETHEUS_MULTIPROC_DIR definido (gunicorn.conf.py), cada worker grava
+# seus valores em arquivos mmap no diretorio e /api/metrics agrega todos.
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latencia das requisicoes por view.",
+    ["view", "method", "status"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Queries SQL por requisicao.",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_duration_seconds",
+    "Tempo em SQL por requisicao.",
+    ["view"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+OUTBOUND_LATENCY = Histogram(
+    "outbound_request_duration_seconds",
+    "Latencia das chamadas a provedores externos (core.http).",
+    ["provider", "outcome"],
+)
+OUTBOUND_REJECTED = Counter(
+    "outbound_circuit_rejected",
+    "Chamadas recusadas com o circuito aberto.",
+    ["provider"],
+)
+
+
+_query_observers = ContextVar("query_observers", default=())
+
+
+def dispatch_queries(execute, sql, params, many, context):
+    """execute_wrapper fixo de cada conexao: passa a query pelos observadores do contexto.
+
+    connection.execute_wrapper() so vale para a conexao da thread atual; sob
+    ASGI o ORM roda em threads do sync_to_async, que herdam o contexto.
+    """
+    for observer in reversed(_query_observers.get()):
+        execute = partial(observer, execute)
+    return execute(sql, params, many, context)
+
+
+def install_query_dispatch(sender, connection, **kwargs):
+    # Ligado ao sinal connection_created em CoreConfig.ready().
+    if dispatch_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, dispatch_queries)
+
+
+@contextmanager
+def observe_queries(observer):
+    """Passa cada query executada dentro do bloco (nesta task/thread) por ``observer``."""
+    token = _query_observers.set((*_query_observers.get(), observer))
+    try:
+        yield observer
+    finally:
+        _query_observers.reset(token)
+
+
+class QueryStats:
+    """execute_wrapper que conta queries e soma o tempo gasto no banco."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def view_label(request):
+    """Nome estavel da view resolvida: ProductViewSet.list, stripe_webhook_view..."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    func = match.func
+    cls = getattr(func, "cls", None) or getattr(func, "view_class", None)
+    if cls is None:
+        return getattr(func, "__name__", "unknown")
+    actions = getattr(func, "actions", None)
+    method = request.method.lower()
+    action = actions.get(method, method) if actions else method
+    return f"{cls.__name__}.{action}"
+
+
+def observe_request(view, method, status, elapsed, queries):
+    REQUEST_LATENCY.labels(view, method, status).observe(elapsed)
+    REQUEST_DB_QUERIES.labels(view).observe(queries.count)
+    REQUEST_DB_SECONDS.labels(view).observe(queries.seconds)
+
+
+def observe_outbound(provider, elapsed, failed):
+    OUTBOUND_LATENCY.labels(provider, "error" if failed else "ok").observe(elapsed)
+
+
+def observe_rejected(provider):
+    OUTBOUND_REJECTED.labels(provider).inc()
+
+
+def render_metrics():
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
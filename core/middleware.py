@@ -0,0 +1,77 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+from core.metrics import QueryStats, observe_queries, observe_request, view_label
+
+
+class MetricsMiddleware:
+    """Latencia por view e queries/tempo de SQL por requisicao (core.metrics)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "METRICS_ENABLED", True)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with observe_queries(QueryStats()) as queries:
+            response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        with observe_queries(QueryStats()) as queries:
+            response = await self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start, queries)
+        return response
+
+    def observe(self, request, response, elapsed, queries):
+        observe_request(view_label(request), request.method, response.status_code, elapsed, queries)
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """WhiteNoise que tambem roda async, para nao tirar a pilha ASGI do event loop.
+
+    O middleware original e so sync: sob ASGI, toda requisicao passaria por
+    uma thread so por causa dele.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
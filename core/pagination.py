@@ -0,0 +1,162 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(value):
+    # DjangoJSONEncoder corta datetimes em milissegundos; o cursor precisa do
+    # valor exato para a comparacao (created_at, id) nao pular linhas.
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """Paginacao por cursor sobre uma ordenacao composta, (created_at, id) por padrao.
+
+    O cursor guarda os valores da ultima linha, entao cada pagina e um
+    WHERE (created_at, id) < (...) LIMIT n apoiado por indice, sem OFFSET nem
+    COUNT. Requisicoes sem ``cursor``/``page_size`` (os callers antigos do
+    Next.js) recebem a lista completa, como antes da paginacao; para o
+    catalogo inteiro, /api/products/feed/ faz o mesmo em streaming.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = getattr(settings, "API_PAGE_SIZE", 24)
+    max_page_size = getattr(settings, "API_MAX_PAGE_SIZE", 100)
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor."
+
+    def get_ordering(self, view):
+        get_ordering = getattr(view, "get_keyset_ordering", None)
+        if get_ordering is not None:
+            return tuple(get_ordering())
+        return tuple(getattr(view, "keyset_ordering", self.ordering))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, values):
+        raw = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (binascii.Error, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering_fields):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def after(self, values):
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.ordering_fields, values):
+            lookup = "lt" if descending else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return condition
+
+    def row_values(self, row):
+        if isinstance(row, dict):
+            return [row[name] for name, _ in self.ordering_fields]
+        return [getattr(row, name) for name, _ in self.ordering_fields]
+
+    def page_queryset(self, queryset, request, view=None):
+        """Queryset da pagina (uma linha a mais, para saber se ha proxima)."""
+        self.request = request
+        self.legacy = (
+            self.cursor_query_param not in request.query_params
+            and self.page_size_query_param not in request.query_params
+        )
+        ordering = self.get_ordering(view)
+        self.ordering_fields = [(field.lstrip("-"), field.startswith("-")) for field in ordering]
+        self.size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*ordering)
+        if self.legacy:
+            return queryset
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            try:
+                queryset = queryset.filter(self.after(cursor))
+            except (TypeError, ValueError, ValidationError, decimal.InvalidOperation):
+                raise NotFound(self.invalid_cursor_message)
+        return queryset[: self.size + 1]
+
+    def page_rows(self, rows):
+        if self.legacy:
+            self.has_next = False
+            return rows
+        self.has_next = len(rows) > self.size
+        rows = rows[: self.size]
+        self.next_cursor = self.encode_cursor(self.row_values(rows[-1])) if self.has_next else None
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.page_rows(list(self.page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset para views async (ORM async; ``request`` do DRF)."""
+        return self.page_rows([row async for row in self.page_queryset(queryset, request, view)])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if self.legacy:
+            return Response(data)
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor opaco devolvido em `next`.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Itens por pagina (maximo {self.max_page_size}).",
+                "schema": {"type": "integer"},
+            },
+        ]
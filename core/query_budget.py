@@ -0,0 +1,179 @@
+import logging
+import traceback
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from core.metrics import observe_queries, view_label
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = str(Path(settings.BASE_DIR).resolve())
+# Middlewares e execute_wrappers aparecem em toda pilha; nao dizem nada da origem.
+# (metrics.py tambem tem o dispatch_queries, por onde toda query passa.)
+WRAPPER_FILES = {
+    str(Path(__file__).with_name(name).resolve())
+    for name in ("query_budget.py", "metrics.py", "middleware.py")
+}
+ORM_DIR = str(Path("django", "db"))
+MANAGE_PY = str(Path(PROJECT_ROOT, "manage.py"))
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(limit):
+    """Declara o maximo de queries de uma view (funcao) ou acao de viewset.
+
+    Acoes herdadas (list, retrieve...) usam ``query_budgets = {"list": 2}``
+    na classe; views de terceiros entram em settings.QUERY_BUDGETS.
+    """
+
+    def decorate(func):
+        func.query_budget = limit
+        return func
+
+    return decorate
+
+
+def declared_budget(func, action):
+    """Orcamento declarado para a view resolvida, ou None."""
+    cls = getattr(func, "cls", None) or getattr(func, "view_class", None)
+    if cls is None:
+        budget = getattr(func, "query_budget", None)
+    else:
+        budget = getattr(cls, "query_budgets", {}).get(action)
+        if budget is None:
+            budget = getattr(getattr(cls, action, None), "query_budget", None)
+    return budget
+
+
+def budget_for(request):
+    """(label, budget) da requisicao; budget None quando nao ha declaracao."""
+    label = view_label(request)
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return label, None
+    budget = getattr(settings, "QUERY_BUDGETS", {}).get(label)
+    if budget is None:
+        budget = declared_budget(match.func, label.rsplit(".", 1)[-1])
+    return label, budget
+
+
+def _frame_label(filename, frame):
+    if filename.startswith(PROJECT_ROOT) and "site-packages" not in filename:
+        path = Path(filename).relative_to(PROJECT_ROOT)
+    else:
+        path = filename.split("site-packages")[-1].lstrip("/")
+    return f"{path}:{frame.lineno} in {frame.name}"
+
+
+def query_origin():
+    """De onde veio a query: o frame mais interno fora do ORM e, se for outro,
+    o frame mais interno do projeto (ex.: "rest_framework/fields.py:... <- orders/views.py:...").
+
+    Middlewares, execute_wrappers, testes e manage.py nao contam.
+    """
+    nearest = project = None
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        filename = str(Path(frame.filename).resolve())
+        if filename in WRAPPER_FILES or Path(filename).name.startswith("test") or filename == MANAGE_PY:
+            continue
+        in_project = filename.startswith(PROJECT_ROOT) and "site-packages" not in filename
+        if nearest is None and (in_project or ORM_DIR not in filename):
+            nearest = _frame_label(filename, frame)
+        if in_project:
+            project = _frame_label(filename, frame)
+            break
+    if nearest is None:
+        return "?"
+    return nearest if project in (None, nearest) else f"{nearest} <- {project}"
+
+
+class QueryRecorder:
+    """execute_wrapper que guarda o SQL e a origem de cada query."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, query_origin()))
+        return execute(sql, params, many, context)
+
+    def report(self, label, budget):
+        lines = [f"{label}: {len(self.queries)} queries (orcamento {budget})"]
+        for index, (sql, origin) in enumerate(self.queries, 1):
+            lines.append(f"  {index}. [{origin}] {sql[:300]}")
+        return "\n".join(lines)
+
+
+class QueryBudgetMiddleware:
+    """Confere o orcamento de queries de cada view.
+
+    QUERY_BUDGET_MODE: "raise" (testes), "warn" (padrao com DEBUG) ou "off".
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        mode = getattr(settings, "QUERY_BUDGET_MODE", "off")
+        if mode == "off":
+            return self.get_response(request)
+
+        with observe_queries(QueryRecorder()) as recorder:
+            response = self.get_response(request)
+        return self.check(request, response, recorder, mode)
+
+    async def __acall__(self, request):
+        mode = getattr(settings, "QUERY_BUDGET_MODE", "off")
+        if mode == "off":
+            return await self.get_response(request)
+
+        with observe_queries(QueryRecorder()) as recorder:
+            response = await self.get_response(request)
+        return self.check(request, response, recorder, mode)
+
+    def check(self, request, response, recorder, mode):
+        label, budget = budget_for(request)
+        response.query_budget = (label, budget, len(recorder.queries))
+        if budget is not None and len(recorder.queries) > budget:
+            message = recorder.report(label, budget)
+            if mode == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning("Orcamento de queries excedido\n%s", message)
+        return response
+
+
+class QueryBudgetTestMixin:
+    """assertWithinBudget (e aassertWithinBudget, pelo AsyncClient): faz a requisicao
+    com o orcamento valendo e falha com o SQL."""
+
+    def assertWithinBudget(self, method, url, *args, **kwargs):
+        from django.test import override_settings
+
+        with override_settings(QUERY_BUDGET_MODE="raise"):
+            response = getattr(self.client, method)(url, *args, **kwargs)
+        return self.checkBudget(response)
+
+    async def aassertWithinBudget(self, method, url, *args, **kwargs):
+        from django.test import override_settings
+
+        with override_settings(QUERY_BUDGET_MODE="raise"):
+            response = await getattr(self.async_client, method)(url, *args, **kwargs)
+        return self.checkBudget(response)
+
+    def checkBudget(self, response):
+        label, budget, used = response.query_budget
+        self.assertIsNotNone(budget, f"{label} nao declara orcamento de queries")
+        return response
@@ -0,0 +1,83 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+# SDKs que o worker so deve importar na primeira chamada.
+LAZY_MODULES = ("httpx", "openai", "stripe", "cloudinary", "cloudinary_storage.storage", "PIL.Image")
+LAZY_MARKER = "--- lazy ---"
+
+# Roda num interpretador novo: o que um worker do gunicorn faz ate a primeira
+# resposta (settings, apps, WSGI e urlconf), e depois cada SDK preguicoso.
+BOOT_SCRIPT = """
+import importlib, json, os, sys, time
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+report = {"boot_ms": (time.perf_counter() - start) * 1000, "rss_mb": rss_mb()}
+modules = json.loads(sys.argv[1])
+report["loaded"] = [name for name in modules if name in sys.modules]
+
+print(%r, file=sys.stderr, flush=True)
+report["lazy"] = {}
+for name in modules:
+    before, start = rss_mb(), time.perf_counter()
+    importlib.import_module(name)
+    report["lazy"][name] = {
+        "import_ms": (time.perf_counter() - start) * 1000,
+        "rss_mb": rss_mb() - before,
+    }
+print(json.dumps(report))
+""" % LAZY_MARKER
+
+
+def parse_importtime(stderr):
+    """Tempo proprio de import (ms) somado por pacote de topo, so ate o marcador."""
+    packages = defaultdict(float)
+    for line in stderr.splitlines():
+        if line.startswith(LAZY_MARKER):
+            break
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        if own.strip().isdigit():
+            packages[name.strip().split(".")[0]] += int(own) / 1000
+    return dict(packages)
+
+
+def profile_boot(modules=LAZY_MODULES, env=None):
+    """Sobe o Django num processo novo e mede o boot do worker.
+
+    Devolve boot_ms, rss_mb, os SDKs de ``modules`` ja carregados no boot
+    (deveria ser vazio), o custo de cada um na primeira chamada e o tempo de
+    import por pacote.
+    """
+    env = {**os.environ, **(env or {})}
+    env.setdefault("DJANGO_SETTINGS_MODULE", os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings"))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT_SCRIPT, json.dumps(list(modules))],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if result.returncode:
+        raise RuntimeError(f"Boot falhou:\n{result.stderr[-2000:]}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report["packages"] = parse_importtime(result.stderr)
+    return report
@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# storage.url() do cloudinary_storage monta a URL pelo SDK (~50 us por
+# chamada) e roda uma vez por linha serializada. A URL so depende do storage,
+# do nome do arquivo e das opcoes (transformacoes), entao fica num LRU por processo.
+
+_urls = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def max_entries():
+    return getattr(settings, "STORAGE_URL_CACHE_SIZE", 10_000)
+
+
+def storage_key(storage):
+    # LazyObject (default_storage) repassa __class__ e os atributos do storage real.
+    cls = storage.__class__
+    return f"{cls.__module__}.{cls.__qualname__}", getattr(storage, "base_url", None)
+
+
+def storage_url(storage, name, **options):
+    """storage.url(name, **options), memoizado por (storage, nome, opcoes) com despejo LRU."""
+    limit = max_entries()
+    if limit <= 0:
+        return storage.url(name, **options)
+
+    key = (storage_key(storage), name, tuple(sorted(options.items())))
+    try:
+        hash(key)
+    except TypeError:
+        # Opcao nao hasheavel (lista de transformacoes, dict): sem cache.
+        return storage.url(name, **options)
+    with _lock:
+        url = _urls.get(key)
+        if url is not None:
+            _urls.move_to_end(key)
+            _stats["hits"] += 1
+            return url
+        _stats["misses"] += 1
+
+    url = storage.url(name, **options)
+    with _lock:
+        _urls[key] = url
+        _urls.move_to_end(key)
+        while len(_urls) > limit:
+            _urls.popitem(last=False)
+    return url
+
+
+def forget_storage_url(storage, name):
+    """Tira um arquivo do cache, com todas as opcoes (imagem trocada ou removida)."""
+    prefix = (storage_key(storage), name)
+    with _lock:
+        for key in [key for key in _urls if key[:2] == prefix]:
+            del _urls[key]
+
+
+def clear_storage_urls():
+    with _lock:
+        _urls.clear()
+        _stats.update(hits=0, misses=0)
+
+
+def storage_url_stats():
+    with _lock:
+        return {**_stats, "entries": len(_urls), "max_entries": max_entries()}
+
+
+@receiver(setting_changed)
+def _storage_settings_changed(setting, **kwargs):
+    if setting in ("STORAGES", "MEDIA_URL", "MEDIA_ROOT", "STORAGE_URL_CACHE_SIZE"):
+        clear_storage_urls()
@@ -1,3 +1,490 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import urlencode
 
-# Create your tests here.
+import requests
+from django.conf import settings
+from django.db import connection
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+
+from catalog.bench import seed_catalog
+from catalog.cache import get_cache
+from catalog.models import Category, Product
+from core.bench import compare_to_baseline, seed_users
+from core.http import CircuitBreaker, CircuitOpenError, Provider, get_provider, reset_providers
+from core.models import User
+from core.query_budget import QueryBudgetExceeded, QueryBudgetTestMixin, declared_budget
+from core.startup import LAZY_MODULES, profile_boot
+from core.storage_urls import clear_storage_urls, forget_storage_url, storage_url, storage_url_stats
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body):
+        raw = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self):
+        self.handle_path()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.handle_path()
+
+    def handle_path(self):
+        stub = self.server.stub
+        stub.connections.add(self.client_address)
+        stub.requests.append((self.path, dict(self.headers)))
+        if self.path == "/slow":
+            time.sleep(0.5)
+        if self.path == "/fail" or stub.down:
+            self.reply(503, {"error": "down"})
+        elif self.path == "/missing":
+            self.reply(404, {"error": "not found"})
+        elif self.path == "/emails":
+            self.reply(200, {"id": "email_1"})
+        elif self.path == "/chat/completions":
+            self.reply(
+                200,
+                {
+                    "id": "chatcmpl-1",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": "gpt-4o-mini",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": "Descricao do stub"},
+                        }
+                    ],
+                },
+            )
+        else:
+            self.reply(200, {"ok": True})
+
+
+class StubServer:
+    def __init__(self):
+        self.connections = set()
+        self.requests = []
+        self.down = False
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        # O teste de timeout fecha a conexao antes da resposta; sem traceback no stderr.
+        self.httpd.handle_error = lambda request, client_address: None
+        self.url = "http://%s:%s" % self.httpd.server_address[:2]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StubServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = StubServer()
+        cls.addClassCleanup(cls.stub.stop)
+
+    def setUp(self):
+        self.stub.connections.clear()
+        self.stub.requests.clear()
+        self.stub.down = False
+        reset_providers()
+        self.addCleanup(reset_providers)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_threshold_and_probes_once_after_timeout(self):
+        now = [0.0]
+        breaker = CircuitBreaker("x", failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        now[0] = 10
+        breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        now = [0.0]
+        breaker = CircuitBreaker("x", failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 10
+        breaker.before_call()
+        breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+
+class ProviderTests(StubServerMixin, SimpleTestCase):
+    def test_session_reuses_connection(self):
+        provider = Provider("stub")
+        for _ in range(5):
+            self.assertEqual(provider.session.get(f"{self.stub.url}/ok").status_code, 200)
+        self.assertEqual(len(self.stub.connections), 1)
+        self.assertEqual(provider.metrics.snapshot()["requests"], 5)
+
+    def test_server_errors_open_the_circuit(self):
+        provider = Provider("stub", failure_threshold=3, reset_timeout=60)
+        for _ in range(3):
+            self.assertEqual(provider.session.get(f"{self.stub.url}/fail").status_code, 503)
+
+        with self.assertRaises(CircuitOpenError):
+            provider.session.get(f"{self.stub.url}/ok")
+        self.assertEqual(len(self.stub.requests), 3)
+        snapshot = provider.metrics.snapshot()
+        self.assertEqual((snapshot["errors"], snapshot["rejected"]), (3, 1))
+
+    def test_client_errors_do_not_count_as_failures(self):
+        provider = Provider("stub", failure_threshold=1)
+        provider.session.get(f"{self.stub.url}/missing")
+        provider.session.get(f"{self.stub.url}/ok")
+        self.assertEqual(provider.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_read_timeout_is_applied(self):
+        provider = Provider("stub", read_timeout=0.1, failure_threshold=1)
+        with self.assertRaises(requests.Timeout):
+            provider.session.get(f"{self.stub.url}/slow")
+        self.assertEqual(provider.breaker.state, CircuitBreaker.OPEN)
+
+    def test_httpx_client_shares_breaker_and_pool(self):
+        provider = Provider("stub", failure_threshold=2)
+        for _ in range(3):
+            provider.httpx_client.get(f"{self.stub.url}/ok")
+        self.assertEqual(len(self.stub.connections), 1)
+
+        self.stub.down = True
+        provider.httpx_client.get(f"{self.stub.url}/ok")
+        provider.httpx_client.get(f"{self.stub.url}/ok")
+        with self.assertRaises(CircuitOpenError):
+            provider.httpx_client.get(f"{self.stub.url}/ok")
+
+
+class IntegrationClientTests(StubServerMixin, TestCase):
+    def test_resend_uses_shared_provider(self):
+        from orders.email_resend import send_order_confirmation_email
+
+        order = SimpleNamespace(id=1, full_name="Ada", email="ada@example.com", total_amount="10.00")
+        with override_settings(RESEND_API_URL=self.stub.url):
+            for _ in range(3):
+                self.assertEqual(send_order_confirmation_email(order, idempotency_key="order-1"), "email_1")
+
+        self.assertEqual(len(self.stub.connections), 1)
+        self.assertEqual(self.stub.requests[0][1]["Idempotency-Key"], "order-1")
+        self.assertEqual(get_provider("resend").metrics.snapshot()["requests"], 3)
+
+    def test_resend_fails_fast_when_circuit_is_open(self):
+        from orders.email_resend import send_order_confirmation_email
+
+        order = SimpleNamespace(id=1, full_name="Ada", email="ada@example.com", total_amount="10.00")
+        self.stub.down = True
+        with override_settings(
+            RESEND_API_URL=self.stub.url, OUTBOUND_HTTP={"resend": {"failure_threshold": 2}}
+        ):
+            for _ in range(2):
+                with self.assertRaises(Exception):
+                    send_order_confirmation_email(order)
+            with self.assertRaises(CircuitOpenError):
+                send_order_confirmation_email(order)
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_openai_backend_uses_provider_pool(self):
+        from catalog.ai_services import OpenAIBackend
+
+        with override_settings(OPENAI_BASE_URL=self.stub.url):
+            backend = OpenAIBackend("sk-test")
+            for _ in range(2):
+                self.assertEqual(backend.complete("system", "Produto: X"), "Descricao do stub")
+
+        self.assertEqual(len(self.stub.connections), 1)
+        self.assertEqual(get_provider("openai").metrics.snapshot()["requests"], 2)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(StubServerMixin, TestCase):
+    def test_request_latency_and_sql_are_recorded_per_view(self):
+        category = Category.objects.create(name="Perifericos", slug="perifericos")
+        Product.objects.create(name="Teclado", slug="teclado", price="10.00", category=category)
+        labels = {"view": "ProductViewSet.list"}
+        before = (
+            sample("http_request_duration_seconds_count", method="GET", status="200", **labels),
+            sample("http_request_db_queries_sum", **labels),
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get("/api/products/?page_size=5").status_code, 200)
+
+        self.assertEqual(
+            sample("http_request_duration_seconds_count", method="GET", status="200", **labels),
+            before[0] + 1,
+        )
+        self.assertEqual(sample("http_request_db_queries_sum", **labels), before[1] + len(ctx.captured_queries))
+
+    def test_function_views_are_labelled_by_name(self):
+        before = sample("http_request_duration_seconds_count", view="stripe_webhook_view", method="POST", status="400")
+        self.client.post("/api/webhook/", "{}", content_type="application/json")
+        self.assertEqual(
+            sample("http_request_duration_seconds_count", view="stripe_webhook_view", method="POST", status="400"),
+            before + 1,
+        )
+
+    def test_outbound_calls_are_recorded(self):
+        provider = Provider("metrics-stub")
+        provider.session.get(f"{self.stub.url}/ok")
+        provider.session.get(f"{self.stub.url}/fail")
+        self.assertEqual(
+            sample("outbound_request_duration_seconds_count", provider="metrics-stub", outcome="ok"), 1
+        )
+        self.assertEqual(
+            sample("outbound_request_duration_seconds_count", provider="metrics-stub", outcome="error"), 1
+        )
+
+    def test_exposition_endpoint(self):
+        self.client.get("/api/categories/")
+        response = self.client.get("/api/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"http_request_duration_seconds_bucket", response.content)
+
+        with override_settings(METRICS_TOKEN="segredo"):
+            self.assertEqual(self.client.get("/api/metrics").status_code, 401)
+            response = self.client.get("/api/metrics", HTTP_AUTHORIZATION="Bearer segredo")
+            self.assertEqual(response.status_code, 200)
+
+    def test_metrics_are_aggregated_across_processes(self):
+        script = (
+            "from core.metrics import REQUEST_LATENCY; "
+            "REQUEST_LATENCY.labels('ProductViewSet.list', 'GET', 200).observe(0.01)"
+        )
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": metrics_dir, "PYTHONPATH": str(settings.BASE_DIR)}
+            for _ in range(2):
+                subprocess.run([sys.executable, "-c", script], env=env, check=True)
+
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry, path=metrics_dir)
+            count = registry.get_sample_value(
+                "http_request_duration_seconds_count",
+                {"view": "ProductViewSet.list", "method": "GET", "status": "200"},
+            )
+        self.assertEqual(count, 2)
+
+
+class BenchSuiteTests(TestCase):
+    def test_compare_to_baseline_flags_queries_and_p95(self):
+        baseline = {
+            "catalog_list": {"p95_ms": 10.0, "queries_per_request": 1.0},
+            "order_create": {"p95_ms": 10.0, "queries_per_request": 5.0},
+        }
+        results = {
+            "catalog_list": {"p95_ms": 12.4, "queries_per_request": 1.0},
+            "order_create": {"p95_ms": 13.0, "queries_per_request": 6.0},
+        }
+        regressions = compare_to_baseline(results, baseline, tolerance=0.25)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(line.startswith("order_create") for line in regressions))
+
+    def test_seeders_build_orders_with_snapshots(self):
+        from orders.bench import seed_orders
+        from orders.models import Order, OrderItem
+
+        seed_catalog(20, categories=2)
+        users = seed_users(3)
+        products = list(Product.objects.order_by("id"))
+        seed_orders(10, products, users, lines=2)
+
+        self.assertEqual(OrderItem.objects.count(), 20)
+        order = Order.objects.order_by("id").first()
+        self.assertEqual(len(order.line_items), 2)
+        self.assertEqual(order.user, users[0])
+        self.assertEqual(
+            order.total_amount,
+            sum(item.price * item.quantity for item in order.items.all()),
+        )
+
+
+def api_views(patterns=None, prefix=""):
+    """(rota, label, funcao, acao) de cada view registrada sob /api/."""
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from api_views(pattern.url_patterns, route)
+            continue
+        if not isinstance(pattern, URLPattern) or not route.lstrip("^").startswith("api/"):
+            continue
+        func = pattern.callback
+        cls = getattr(func, "cls", None) or getattr(func, "view_class", None)
+        if cls is None:
+            yield route, func.__name__, func, None
+        elif getattr(func, "actions", None):
+            for action in func.actions.values():
+                yield route, f"{cls.__name__}.{action}", func, action
+        else:
+            for method in cls.http_method_names:
+                if method not in ("head", "options") and hasattr(cls, method):
+                    yield route, f"{cls.__name__}.{method}", func, method
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def test_every_api_route_declares_a_budget(self):
+        missing = sorted(
+            {
+                f"{label} ({route})"
+                for route, label, func, action in api_views()
+                if label not in settings.QUERY_BUDGETS and declared_budget(func, action) is None
+            }
+        )
+        self.assertEqual(missing, [])
+
+    def test_core_routes(self):
+        response = self.assertWithinBudget(
+            "post", "/api/register/", {"email": "ada@example.com", "password": "s3nha-forte!"}
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.assertWithinBudget(
+            "post", "/api/token/", {"email": "ada@example.com", "password": "s3nha-forte!"}
+        )
+        self.assertEqual(response.status_code, 200)
+        tokens = response.json()
+        response = self.assertWithinBudget("post", "/api/token/refresh/", {"refresh": tokens["refresh"]})
+        self.assertEqual(response.status_code, 200)
+
+        User.objects.filter(email="ada@example.com").update(is_staff=True)
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {tokens['access']}"}
+        self.assertEqual(self.assertWithinBudget("get", "/api/outbound-stats/", **auth).status_code, 200)
+        self.assertEqual(self.assertWithinBudget("get", "/api/metrics").status_code, 200)
+
+    @override_settings(QUERY_BUDGETS={"CategoryViewSet.list": 0})
+    def test_exceeding_the_budget_reports_sql_and_origin(self):
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            self.assertWithinBudget("get", "/api/categories/")
+        message = str(raised.exception)
+        self.assertIn("CategoryViewSet.list: 1 queries (orcamento 0)", message)
+        self.assertIn('FROM "catalog_category"', message)
+
+    @override_settings(QUERY_BUDGETS={"CategoryViewSet.list": 0}, QUERY_BUDGET_MODE="warn")
+    def test_warn_mode_logs_instead_of_raising(self):
+        with self.assertLogs("core.query_budget", "WARNING"):
+            self.assertEqual(self.client.get("/api/categories/").status_code, 200)
+
+
+class StartupTests(SimpleTestCase):
+    def test_worker_boot_is_lazy(self):
+        report = profile_boot()
+
+        # Nenhum SDK pesado no boot; cada um entra na primeira chamada.
+        self.assertEqual(report["loaded"], [])
+        self.assertEqual(set(report["lazy"]), set(LAZY_MODULES))
+        # O tempo de boot fica para `startup_profile --check`, fora da suite.
+        self.assertIn("django", report["packages"])
+
+    def test_lazy_clients_still_build(self):
+        reset_providers()
+        self.addCleanup(reset_providers)
+        provider = get_provider("stripe")
+
+        self.assertIsInstance(provider.session, requests.Session)
+        self.assertEqual(provider.httpx_client.timeout.connect, provider.connect_timeout)
+
+
+class CountingStorage(FileSystemStorage):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    def url(self, name):
+        self.calls += 1
+        return super().url(name)
+
+
+class TransformingStorage(CountingStorage):
+    def url(self, name, **options):
+        url = super().url(name)
+        return f"{url}?{urlencode(sorted(options.items()))}" if options else url
+
+
+@override_settings(STORAGE_URL_CACHE_SIZE=2)
+class StorageURLTests(SimpleTestCase):
+    def setUp(self):
+        clear_storage_urls()
+        self.addCleanup(clear_storage_urls)
+
+    def test_urls_are_memoized_per_storage_and_name(self):
+        storage = CountingStorage(base_url="/media/")
+        cdn = CountingStorage(base_url="https://cdn.example.com/")
+
+        self.assertEqual(storage_url(storage, "a.png"), "/media/a.png")
+        self.assertEqual(storage_url(storage, "a.png"), "/media/a.png")
+        self.assertEqual(storage_url(cdn, "a.png"), "https://cdn.example.com/a.png")
+        self.assertEqual((storage.calls, cdn.calls), (1, 1))
+        self.assertEqual(storage_url_stats()["hits"], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        storage = CountingStorage(base_url="/media/")
+        storage_url(storage, "a.png")
+        storage_url(storage, "b.png")
+        storage_url(storage, "a.png")
+        storage_url(storage, "c.png")  # despeja b.png, o menos usado
+
+        storage_url(storage, "a.png")
+        storage_url(storage, "b.png")
+        self.assertEqual(storage.calls, 4)
+        self.assertEqual(storage_url_stats()["entries"], 2)
+
+    def test_options_are_part_of_the_key(self):
+        storage = TransformingStorage(base_url="/media/")
+        self.assertEqual(storage_url(storage, "a.png"), "/media/a.png")
+        self.assertEqual(storage_url(storage, "a.png", width=200, crop="fill"), "/media/a.png?crop=fill&width=200")
+        self.assertEqual(storage_url(storage, "a.png", crop="fill", width=200), "/media/a.png?crop=fill&width=200")
+        self.assertEqual(storage.calls, 2)
+
+        # Opcao nao hasheavel nao entra no cache.
+        storage_url(storage, "a.png", transformation=[{"width": 100}])
+        storage_url(storage, "a.png", transformation=[{"width": 100}])
+        self.assertEqual(storage.calls, 4)
+
+        forget_storage_url(storage, "a.png")
+        self.assertEqual(storage_url_stats()["entries"], 0)
+
+    def test_disabled_with_zero_entries(self):
+        storage = CountingStorage(base_url="/media/")
+        with override_settings(STORAGE_URL_CACHE_SIZE=0):
+            storage_url(storage, "a.png")
+            storage_url(storage, "a.png")
+        self.assertEqual(storage.calls, 2)
@@ -1,7 +1,9 @@
 from django.urls import path
 
-from core.views import RegisterView
+from core.views import OutboundStatsView, RegisterView, metrics_view
 
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="register"),
+    path("outbound-stats/", OutboundStatsView.as_view(), name="outbound-stats"),
+    path("metrics", metrics_view, name="metrics"),
 ]
@@ -1,7 +1,12 @@
+from django.conf import settings
+from django.http import HttpResponse
 from rest_framework import permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core.http import outbound_stats
+from core.metrics import render_metrics
+from core.query_budget import query_budget
 from core.models import User
 
 
@@ -13,6 +18,7 @@ class RegisterSerializer(serializers.Serializer):
 
 class RegisterView(APIView):
     permission_classes = [permissions.AllowAny]
+    query_budgets = {"post": 3}
 
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
@@ -34,3 +40,21 @@ class RegisterView(APIView):
             user.save(update_fields=["first_name"])
 
         return Response({"detail": "User created."}, status=status.HTTP_201_CREATED)
+
+
+class OutboundStatsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    query_budgets = {"get": 1}
+
+    def get(self, request):
+        return Response(outbound_stats())
+
+
+@query_budget(0)
+def metrics_view(request):
+    """Exposicao no formato do Prometheus; com METRICS_TOKEN (obrigatorio sem DEBUG) exige Bearer."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
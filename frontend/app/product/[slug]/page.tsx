@@ -31,18 +31,19 @@ export default function ProductDetailsPage() {
 
     const load = async () => {
       try {
-        const response = await fetch(`${API_URL}/api/products/`);
+        const response = await fetch(
+          `${API_URL}/api/products/slug/${encodeURIComponent(slug)}/`,
+        );
+        if (response.status === 404) {
+          if (isMounted) {
+            setProduct(null);
+          }
+          return;
+        }
         if (!response.ok) {
           throw new Error("Failed to load product");
         }
-        const data = (await response.json()) as Product[];
-        const found =
-          data.find((item) => item.slug === slug) ??
-          data.find(
-            (item) =>
-              item.name?.toLowerCase().replace(/\s+/g, "-") === slug.toLowerCase(),
-          ) ??
-          null;
+        const found = (await response.json()) as Product;
         if (isMounted) {
           setProduct(found);
         }
@@ -0,0 +1,49 @@
+import gc
+import os
+import shutil
+import tempfile
+
+# Metricas do Prometheus compartilhadas entre os workers (core.metrics). A
+# variavel precisa existir antes do primeiro import do prometheus_client.
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "loja-ia-metrics")
+)
+
+# O master importa o Django e a urlconf uma vez; os workers nascem por fork e
+# compartilham essas paginas (copy-on-write) em vez de repetir o boot.
+# `python manage.py startup_profile` mede o que cada worker pagaria sem isso.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "True") == "True"
+
+
+def on_starting(server):
+    # Arquivos de um boot anterior somariam contadores de processos mortos.
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from django.urls import get_resolver
+
+    # Views, serializers e o resolver ficam prontos antes do fork.
+    get_resolver().url_patterns
+    # Objetos do boot saem do GC: as coletas nos workers nao tocam (e nao
+    # copiam) essas paginas.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Sem preload o master nem configurou o Django (e nao tem conexoes).
+    if not preload_app:
+        return
+    # Nenhuma conexao do master pode ser reaproveitada pelo worker.
+    from django.db import connections
+
+    connections.close_all()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
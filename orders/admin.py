@@ -1,11 +1,23 @@
 from django.contrib import admin
 
-from orders.models import Order, OrderItem
+from orders.models import EmailOutbox, Order, OrderItem, StockReservation, StripeEvent
 
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
+    readonly_fields = ("product_name",)
+
+
+class StockReservationInline(admin.TabularInline):
+    model = StockReservation
+    extra = 0
+    can_delete = False
+    fields = ("product", "quantity", "status", "expires_at")
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Order)
@@ -13,5 +25,27 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ("id", "full_name", "email", "status", "total_amount", "created_at")
     list_filter = ("status", "created_at")
     search_fields = ("full_name", "email", "id")
-    inlines = [OrderItemInline]
-    readonly_fields = ("created_at",)
+    inlines = [OrderItemInline, StockReservationInline]
+    readonly_fields = (
+        "created_at",
+        "line_items",
+        "checkout_session_id",
+        "checkout_session_url",
+        "checkout_session_expires_at",
+    )
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ("id", "order", "kind", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status", "kind")
+    search_fields = ("idempotency_key", "order__email")
+    readonly_fields = ("created_at", "sent_at", "provider_id", "last_error")
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ("event_id", "type", "status", "attempts", "received_at", "processed_at")
+    list_filter = ("status", "type")
+    search_fields = ("event_id",)
+    readonly_fields = ("payload", "stripe_created", "received_at", "processed_at", "last_error")
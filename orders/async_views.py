@@ -0,0 +1,57 @@
+import json
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from core.async_api import async_api_view, json_response
+from core.query_budget import query_budget
+from orders.checkout import aget_or_create_checkout_session
+from orders.models import Order
+from orders.webhooks import arecord_event
+
+# Checkout e webhook para o config.asgi: enquanto o Stripe responde, o worker
+# segue atendendo outras requisicoes (orders.views tem as versoes sync).
+
+
+@query_budget(4)
+@async_api_view(["POST"])
+async def create_checkout_session(request):
+    import stripe
+
+    try:
+        order_id = json.loads(request.body or b"{}").get("order_id")
+    except (ValueError, AttributeError):
+        order_id = None
+    if not order_id:
+        return json_response({"detail": "order_id is required."}, status=400)
+
+    try:
+        order = await Order.objects.aget(id=order_id)
+    except (Order.DoesNotExist, ValueError):
+        return json_response({"detail": "Order not found."}, status=404)
+    if order.status != Order.STATUS_PENDING:
+        return json_response({"detail": "Order is not pending."}, status=409)
+
+    try:
+        url, _ = await aget_or_create_checkout_session(order)
+    except stripe.error.StripeError as exc:
+        return json_response(
+            {"detail": "Failed to create payment session.", "error": str(exc)}, status=502
+        )
+    return json_response({"url": url})
+
+
+@query_budget(3)
+@async_api_view(["POST"])
+async def stripe_webhook(request):
+    import stripe
+
+    try:
+        stripe.Webhook.construct_event(
+            request.body, request.META.get("HTTP_STRIPE_SIGNATURE"), settings.STRIPE_WEBHOOK_SECRET
+        )
+    except (ValueError, stripe.error.SignatureVerificationError):
+        return HttpResponse(status=400)
+
+    await arecord_event(request.body)
+    return HttpResponse(status=200)
@@ -0,0 +1,37 @@
+import random
+
+from orders.checkout import line_item
+from orders.models import Order, OrderItem
+
+
+def seed_orders(count, products, users=(), lines=3, seed=42, batch_size=1000):
+    """Pedidos sinteticos com itens e snapshot de line_items, via bulk_create."""
+    rng = random.Random(seed)
+    users = list(users)
+    orders = []
+    picks = []
+    for i in range(count):
+        chosen = rng.sample(products, min(lines, len(products)))
+        quantities = [rng.randint(1, 3) for _ in chosen]
+        orders.append(
+            Order(
+                full_name=f"Cliente {i}",
+                email=f"cliente-{i}@example.com",
+                address="Rua do Benchmark, 1",
+                user=users[i % len(users)] if users else None,
+                total_amount=sum(p.price * q for p, q in zip(chosen, quantities)),
+                line_items=[line_item(p.name, p.price, q) for p, q in zip(chosen, quantities)],
+            )
+        )
+        picks.append(list(zip(chosen, quantities)))
+
+    orders = Order.objects.bulk_create(orders, batch_size=batch_size)
+    OrderItem.objects.bulk_create(
+        [
+            OrderItem.from_product(product, quantity, order=order)
+            for order, chosen in zip(orders, picks)
+            for product, quantity in chosen
+        ],
+        batch_size=batch_size,
+    )
+    return orders
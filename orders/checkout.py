@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from orders.inventory import hold_for_checkout
+from orders.models import Order
+from orders.stripe_client import get_stripe_client
+
+
+def line_item(name, price, quantity):
+    """Linha do snapshot do pedido; ``price`` e o Decimal unitario em reais."""
+    return {"name": name, "unit_amount": int(price * 100), "quantity": quantity}
+
+
+def stripe_line_items(order):
+    line_items = order.line_items
+    if not line_items:
+        # Pedidos anteriores ao snapshot (ou criados fora do serializer).
+        line_items = [
+            line_item(item.product.name, item.price, item.quantity)
+            for item in order.items.select_related("product")
+        ]
+    return [
+        {
+            "price_data": {
+                "currency": "brl",
+                "product_data": {"name": line["name"]},
+                "unit_amount": line["unit_amount"],
+            },
+            "quantity": line["quantity"],
+        }
+        for line in line_items
+    ]
+
+
+def reusable_session_url(order):
+    """URL da sessao ja criada, se o pedido segue pendente e ela nao esta perto de expirar."""
+    if order.status != Order.STATUS_PENDING or not order.checkout_session_url:
+        return None
+    margin = timedelta(seconds=getattr(settings, "STRIPE_SESSION_REUSE_MARGIN", 300))
+    expires_at = order.checkout_session_expires_at
+    if expires_at is None or expires_at <= timezone.now() + margin:
+        return None
+    return order.checkout_session_url
+
+
+def session_params(order, line_items, expires_at=None):
+    params = {
+        "mode": "payment",
+        "line_items": line_items,
+        "success_url": (
+            f"{settings.FRONTEND_URL}"
+            "/checkout/success?session_id={CHECKOUT_SESSION_ID}"
+        ),
+        "cancel_url": f"{settings.FRONTEND_URL}/checkout",
+        "metadata": {"order_id": str(order.id)},
+    }
+    if expires_at is not None:
+        # Com estoque reservado a sessao expira junto com a reserva.
+        params["expires_at"] = int(expires_at.timestamp())
+    return params
+
+
+def idempotency_key(order, expires_at=None):
+    # Cliques repetidos antes da primeira resposta usam a mesma chave e
+    # recebem a mesma sessao do Stripe. Com estoque reservado a chave segue o
+    # hold (hold novo, chave nova); sem, muda quando a sessao expira.
+    anchor = expires_at or order.checkout_session_expires_at
+    return f"checkout-{order.id}-{int(anchor.timestamp()) if anchor else 0}"
+
+
+def apply_session(order, session):
+    """Copia a sessao para o pedido; devolve os campos a salvar."""
+    order.checkout_session_id = session.id
+    order.checkout_session_url = session.url or ""
+    order.checkout_session_expires_at = (
+        datetime.fromtimestamp(session.expires_at, tz=dt_timezone.utc) if session.expires_at else None
+    )
+    return ["checkout_session_id", "checkout_session_url", "checkout_session_expires_at"]
+
+
+def get_or_create_checkout_session(order):
+    """Devolve (url, criada). Levanta stripe.StripeError se o Stripe falhar."""
+    url = reusable_session_url(order)
+    if url:
+        return url, False
+
+    expires_at = hold_for_checkout(order)
+    session = get_stripe_client().v1.checkout.sessions.create(
+        params=session_params(order, stripe_line_items(order), expires_at),
+        options={"idempotency_key": idempotency_key(order, expires_at)},
+    )
+    order.save(update_fields=apply_session(order, session))
+    return session.url, True
+
+
+async def aget_or_create_checkout_session(order):
+    """get_or_create_checkout_session para views async: a chamada ao Stripe
+    nao prende thread nenhuma enquanto espera."""
+    url = reusable_session_url(order)
+    if url:
+        return url, False
+
+    if order.line_items:
+        line_items = stripe_line_items(order)
+    else:
+        line_items = await sync_to_async(stripe_line_items)(order)
+    expires_at = await sync_to_async(hold_for_checkout)(order)
+    session = await get_stripe_client().v1.checkout.sessions.create_async(
+        params=session_params(order, line_items, expires_at),
+        options={"idempotency_key": idempotency_key(order, expires_at)},
+    )
+    await order.asave(update_fields=apply_session(order, session))
+    return session.url, True
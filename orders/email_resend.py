@@ -1,11 +1,13 @@
 import os
 from typing import Optional
 
-import requests
+from django.conf import settings
+
+from core.http import get_provider
 
 
 def send_order_confirmation_email(order, idempotency_key: Optional[str] = None) -> Optional[str]:
-    url = "https://api.resend.com/emails"
+    url = f"{getattr(settings, 'RESEND_API_URL', 'https://api.resend.com')}/emails"
     headers = {
         "Authorization": f"Bearer {os.environ.get('RESEND_API_KEY')}",
         "Content-Type": "application/json",
@@ -36,7 +38,8 @@ def send_order_confirmation_email(order, idempotency_key: Optional[str] = None)
         "text": text,
     }
 
-    response = requests.post(url, json=payload, headers=headers, timeout=10)
+    # Pool keep-alive, timeouts e circuit breaker vem do provedor "resend".
+    response = get_provider("resend").session.post(url, json=payload, headers=headers)
     if not (200 <= response.status_code < 300):
         raise Exception(response.text)
 
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers e corpo saem em writes separados; com Nagle ligado o delayed
+    # ACK do cliente somaria ~40 ms a cada requisicao keep-alive.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        raw = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        params = dict(parse_qsl(self.rfile.read(length).decode()))
+        server = self.server.fake
+        server.record(self.client_address)
+
+        if self.path != "/v1/checkout/sessions":
+            self.send_json(404, {"error": {"type": "invalid_request_error", "message": "Unknown path."}})
+            return
+        if server.latency:
+            time.sleep(server.latency)
+        expires_at = params.get("expires_at")
+        if expires_at and int(expires_at) < time.time() + 30 * 60:
+            # Como o Stripe: a sessao precisa durar pelo menos 30 minutos.
+            self.send_json(
+                400,
+                {"error": {"type": "invalid_request_error", "message": "expires_at must be at least 30 minutes away."}},
+            )
+            return
+        session = server.create_session(params, self.headers.get("Idempotency-Key"))
+        if session is None:
+            # Como o Stripe: a chave de idempotencia so vale com os mesmos params.
+            self.send_json(
+                400,
+                {"error": {"type": "idempotency_error", "message": "Keys can only be reused with the same parameters."}},
+            )
+            return
+        self.send_json(200, session)
+
+
+class FakeStripeServer:
+    """Servidor HTTP local que imita POST /v1/checkout/sessions.
+
+    Usado pelos testes e pelo bench_checkout via STRIPE_API_BASE. Respeita o
+    header Idempotency-Key e conta requisicoes e conexoes TCP abertas.
+    """
+
+    def __init__(self, latency=0.0, ttl=86400):
+        self.latency = latency
+        self.ttl = ttl
+        self.requests = 0
+        self.connections = set()
+        self.sessions = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.connections.clear()
+            self.sessions.clear()
+            self._by_key.clear()
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, client_address):
+        with self._lock:
+            self.requests += 1
+            self.connections.add(client_address)
+
+    def create_session(self, params, idempotency_key=None):
+        """Sessao nova ou a da chave; None se a chave ja veio com outros params."""
+        with self._lock:
+            if idempotency_key and idempotency_key in self._by_key:
+                session = self._by_key[idempotency_key]
+                return session if self.sessions[session["id"]]["params"] == params else None
+            session_id = f"cs_test_{len(self.sessions) + 1}"
+            session = {
+                "id": session_id,
+                "object": "checkout.session",
+                "mode": params.get("mode", "payment"),
+                "status": "open",
+                "payment_status": "unpaid",
+                "url": f"{self.url}/pay/{session_id}",
+                "expires_at": int(params.get("expires_at") or time.time() + self.ttl),
+                "metadata": {
+                    key[len("metadata[") : -1]: value
+                    for key, value in params.items()
+                    if key.startswith("metadata[")
+                },
+            }
+            self.sessions[session_id] = {"params": params, "session": session}
+            if idempotency_key:
+                self._by_key[idempotency_key] = session
+            return session
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeStripeHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-stripe", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
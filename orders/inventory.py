@@ -0,0 +1,173 @@
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Exists, F, OuterRef, Q, Value, When
+from django.utils import timezone
+
+from catalog.models import Product
+from core.background import BackgroundWorker
+from orders.models import Order, StockReservation
+
+# Estoque sem select_for_update: o pedido baixa todos os seus produtos com um
+# UPDATE condicional (stock >= quantidade) na transacao que o cria. Checkouts
+# concorrentes no mesmo produto so disputam a linha durante esse UPDATE, e
+# nunca vendem alem do estoque. Produtos com stock NULL nao sao controlados.
+
+# Folga depois do fim da sessao do Stripe, para o checkout.session.expired
+# chegar antes da expiracao local.
+CHECKOUT_GRACE = timedelta(minutes=5)
+# O Stripe so aceita expires_at a pelo menos 30 min; um hold mais curto que
+# isso (com folga para a ida ao Stripe) nao e reaproveitado.
+MIN_SESSION_LIFETIME = timedelta(minutes=35)
+
+
+class InsufficientStock(Exception):
+    pass
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, "STOCK_RESERVATION_TTL", 3600))
+
+
+def tracked_quantities(products, quantities):
+    """So os produtos com estoque controlado: ``{product_id: quantidade}``."""
+    return {pk: quantity for pk, quantity in quantities.items() if products[pk].stock is not None}
+
+
+def out_of_stock(quantities, products=None):
+    """Produtos sem estoque para ``quantities``, pelo snapshot ou lendo o banco."""
+    if products is None:
+        stock = dict(Product.objects.filter(pk__in=quantities).values_list("pk", "stock"))
+    else:
+        stock = {pk: products[pk].stock for pk in quantities}
+    return sorted(pk for pk, quantity in quantities.items() if stock.get(pk) is not None and stock[pk] < quantity)
+
+
+def _per_product(quantities):
+    return Case(*[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()], default=Value(0))
+
+
+def annotate_reserved(products):
+    """Anota ``reserved``: o produto tem reserva ativa (pedido pendente)."""
+    active = StockReservation.objects.filter(product=OuterRef("pk"), status=StockReservation.STATUS_ACTIVE)
+    return products.annotate(reserved=Exists(active))
+
+
+def take_stock(quantities):
+    """Baixa ``{product_id: quantidade}`` num UPDATE so, tudo ou nada.
+
+    Deve rodar dentro de transaction.atomic(): se faltar estoque de algum
+    produto levanta InsufficientStock, e o rollback desfaz as outras baixas.
+    """
+    if not quantities:
+        return
+    enough = reduce(or_, (Q(pk=pk, stock__gte=quantity) for pk, quantity in quantities.items()))
+    updated = Product.objects.filter(enough).update(stock=F("stock") - _per_product(quantities))
+    if updated < len(quantities):
+        raise InsufficientStock
+
+
+def reserve_stock(order, quantities):
+    expires_at = timezone.now() + reservation_ttl()
+    StockReservation.objects.bulk_create(
+        [
+            StockReservation(order=order, product_id=pk, quantity=quantity, expires_at=expires_at)
+            for pk, quantity in quantities.items()
+        ]
+    )
+    transaction.on_commit(wake_stock_worker)
+
+
+def commit_reservations(order_ids):
+    return StockReservation.objects.filter(
+        order_id__in=order_ids, status=StockReservation.STATUS_ACTIVE
+    ).update(status=StockReservation.STATUS_COMMITTED)
+
+
+def release_reservations(order_ids):
+    """Devolve ao estoque as reservas ativas dos pedidos.
+
+    Quem chama acabou de tirar os pedidos de pending com um UPDATE condicional
+    na mesma transacao, entao so um processo libera cada pedido.
+    """
+    reservations = StockReservation.objects.filter(order_id__in=order_ids, status=StockReservation.STATUS_ACTIVE)
+    quantities = {}
+    for pk, quantity in reservations.values_list("product_id", "quantity"):
+        quantities[pk] = quantities.get(pk, 0) + quantity
+    if not quantities:
+        return 0
+    Product.objects.filter(pk__in=quantities).update(stock=F("stock") + _per_product(quantities))
+    return reservations.update(status=StockReservation.STATUS_RELEASED)
+
+
+def hold_for_checkout(order):
+    """Estende as reservas ate o fim da sessao do Stripe.
+
+    Devolve o expires_at a passar para a sessao, ou None se o pedido nao
+    reserva estoque (a sessao fica com a validade padrao do Stripe). Ate a
+    sessao ser gravada, cliques repetidos recebem o mesmo expires_at: usam a
+    mesma chave de idempotencia, e o Stripe recusa a chave com outros params.
+    """
+    held = order.checkout_hold_expires_at
+    previous = order.checkout_session_expires_at
+    fresh = held is not None and held >= timezone.now() + MIN_SESSION_LIFETIME
+    if fresh and (previous is None or held > previous):
+        return held
+
+    # Em segundos inteiros, como o expires_at que o Stripe devolve.
+    expires_at = (timezone.now() + reservation_ttl()).replace(microsecond=0)
+    extended = StockReservation.objects.filter(order=order, status=StockReservation.STATUS_ACTIVE).update(
+        expires_at=expires_at + CHECKOUT_GRACE
+    )
+    if not extended:
+        return None
+    claimed = Order.objects.filter(pk=order.pk, checkout_hold_expires_at=held).update(
+        checkout_hold_expires_at=expires_at
+    )
+    if not claimed:
+        # Outro clique gravou o hold primeiro: a sessao usa o dele.
+        order.refresh_from_db(fields=["checkout_hold_expires_at"])
+        return order.checkout_hold_expires_at
+    order.checkout_hold_expires_at = expires_at
+    return expires_at
+
+
+def release_expired_reservations(batch_size=None):
+    """Falha os pedidos pendentes com reserva vencida e devolve o estoque."""
+    batch_size = batch_size or getattr(settings, "STOCK_RELEASE_BATCH_SIZE", 100)
+    order_ids = list(
+        StockReservation.objects.filter(status=StockReservation.STATUS_ACTIVE, expires_at__lte=timezone.now())
+        .order_by()
+        .values_list("order_id", flat=True)
+        .distinct()[:batch_size]
+    )
+    if not order_ids:
+        return 0
+    with transaction.atomic():
+        statuses = dict(
+            Order.objects.select_for_update(skip_locked=True).filter(pk__in=order_ids).values_list("pk", "status")
+        )
+        pending = [pk for pk, status in statuses.items() if status == Order.STATUS_PENDING]
+        Order.objects.filter(pk__in=pending).update(status=Order.STATUS_FAILED)
+        # Pedido que saiu de pending por outro caminho (ex.: admin) so acerta a reserva.
+        paid = [pk for pk, status in statuses.items() if status == Order.STATUS_PAID]
+        commit_reservations(paid)
+        release_reservations([pk for pk in statuses if pk not in paid])
+    return len(order_ids)
+
+
+stock_worker = BackgroundWorker(
+    "stock-reservations",
+    release_expired_reservations,
+    interval=getattr(settings, "STOCK_RELEASE_INTERVAL", 60.0),
+    batch_size=getattr(settings, "STOCK_RELEASE_BATCH_SIZE", 100),
+)
+
+
+def wake_stock_worker():
+    # So garante a thread rodando; as reservas novas vencem daqui a uma hora.
+    if getattr(settings, "STOCK_WORKER_THREAD", True):
+        stock_worker.start()
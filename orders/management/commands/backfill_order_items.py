@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from orders.models import OrderItem
+from orders.snapshots import backfill_item_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Preenche o snapshot de produto (nome, imagem) dos itens de pedido que "
+        "ainda nao tem, em lotes. Pode rodar de novo sem efeito."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        pending = OrderItem.objects.filter(product_name="").count()
+        filled = backfill_item_snapshots(batch_size=options["batch_size"])
+        self.stdout.write(f"{filled} de {pending} itens preenchidos.")
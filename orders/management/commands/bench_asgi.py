@@ -0,0 +1,150 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from catalog.bench import seed_catalog
+from catalog.models import Product
+from core.bench import scratch_database, summarize
+from orders.bench import seed_orders
+from orders.fake_stripe import FakeStripeServer
+
+SERVERS = {
+    # Workers sync: cada checkout prende um worker enquanto o Stripe responde.
+    "wsgi": (
+        ["-m", "gunicorn", "config.wsgi", "-c", "gunicorn.conf.py", "--workers", "{workers}", "--bind", "127.0.0.1:{port}"],
+        "/api/orders/create-checkout-session/",
+    ),
+    # Event loop: a espera pelo Stripe nao ocupa o worker.
+    "asgi": (
+        ["-m", "uvicorn", "config.asgi:application", "--workers", "{workers}", "--port", "{port}", "--no-access-log"],
+        "/api/async/orders/create-checkout-session/",
+    ),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def database_url():
+    """DATABASE_URL do banco descartavel, para os servidores em subprocesso."""
+    db = connection.settings_dict
+    if connection.vendor == "sqlite":
+        return f"sqlite:///{db['NAME']}"
+    return f"postgres://{db['USER']}:{db['PASSWORD']}@{db['HOST'] or 'localhost'}:{db['PORT'] or 5432}/{db['NAME']}"
+
+
+def post(url, body):
+    request = urllib.request.Request(
+        url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    except OSError:
+        status = None
+    return time.perf_counter() - start, status
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara checkouts concorrentes contra um Stripe lento no gunicorn "
+        "(config.wsgi) e no uvicorn (config.asgi), com o mesmo numero de workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Checkouts por servidor.")
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--latency", type=float, default=0.2, help="Latencia do Stripe falso (s).")
+        parser.add_argument("--servers", default="wsgi,asgi")
+
+    def handle(self, *args, **options):
+        servers = options["servers"].split(",")
+        unknown = set(servers) - set(SERVERS)
+        if unknown:
+            raise CommandError(f"Servidores desconhecidos: {', '.join(sorted(unknown))}")
+
+        results = {}
+        with scratch_database(concurrent=True), FakeStripeServer(latency=options["latency"]) as stripe_server:
+            seed_catalog(100)
+            products = list(Product.objects.filter(is_active=True))
+            orders = seed_orders(options["requests"] * len(servers), products)
+            # O sqlite e um arquivo: os servidores precisam ver os dados ja gravados.
+            connection.close()
+            env = {
+                **os.environ,
+                "DATABASE_URL": database_url(),
+                "STRIPE_API_BASE": stripe_server.url,
+                "STRIPE_SECRET_KEY": "sk_test_bench",
+                "QUERY_BUDGET_MODE": "off",
+                "GUNICORN_PRELOAD": "True",
+            }
+            for index, name in enumerate(servers):
+                chunk = orders[index * options["requests"] : (index + 1) * options["requests"]]
+                results[name] = self.run(name, [order.id for order in chunk], env, stripe_server, options)
+
+        results["stripe_latency_ms"] = options["latency"] * 1000
+        results["concurrency"] = options["concurrency"]
+        results["workers"] = options["workers"]
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run(self, name, order_ids, env, stripe_server, options):
+        args, path = SERVERS[name]
+        port = free_port()
+        command = [sys.executable] + [arg.format(port=port, workers=options["workers"]) for arg in args]
+        log = tempfile.TemporaryFile()
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            self.wait_ready(server, base, log)
+            stripe_calls = stripe_server.requests
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+                outcomes = list(pool.map(lambda order_id: post(base + path, {"order_id": order_id}), order_ids))
+            wall = time.perf_counter() - start
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            log.close()
+
+        samples = [elapsed for elapsed, status in outcomes if status == 200]
+        return {
+            **summarize(samples),
+            "throughput_rps": round(len(samples) / wall, 1) if wall else 0.0,
+            "errors": len(outcomes) - len(samples),
+            "stripe_requests": stripe_server.requests - stripe_calls,
+        }
+
+    def wait_ready(self, server, base, log, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                log.seek(0)
+                raise CommandError(f"Servidor saiu com {server.returncode}:\n{log.read().decode()[-2000:]}")
+            try:
+                with urllib.request.urlopen(base + "/api/categories/", timeout=2):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"Servidor nao respondeu em {timeout}s")
@@ -0,0 +1,93 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from catalog.bench import seed_catalog
+from catalog.models import Product
+from core.bench import scratch_database, summarize
+from orders.fake_stripe import FakeStripeServer
+from orders.stripe_client import reset_stripe_client
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede POST /api/orders/create-checkout-session/ contra o Stripe falso: "
+        "primeira chamada, chamadas repetidas e conexoes abertas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=100)
+        parser.add_argument("--lines", type=int, default=10)
+        parser.add_argument("--repeats", type=int, default=3)
+        parser.add_argument("--latency", type=float, default=0.05, help="Latencia do Stripe falso (s).")
+
+    def handle(self, *args, **options):
+        with scratch_database(), FakeStripeServer(latency=options["latency"]) as stripe_server:
+            with override_settings(STRIPE_API_BASE=stripe_server.url, STRIPE_SECRET_KEY="sk_test_bench"):
+                reset_stripe_client()
+                try:
+                    result = self.run(stripe_server, options)
+                finally:
+                    reset_stripe_client()
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def run(self, stripe_server, options):
+        seed_catalog(max(options["lines"] * 5, 100))
+        product_ids = list(Product.objects.filter(is_active=True).values_list("id", flat=True))
+        rng = random.Random(1)
+        client = Client()
+
+        order_ids = []
+        for _ in range(options["orders"]):
+            response = client.post(
+                "/api/orders/",
+                json.dumps(
+                    {
+                        "full_name": "Bench",
+                        "email": "bench@example.com",
+                        "address": "Rua do Benchmark, 1",
+                        "items": [
+                            {"product_id": product_id, "quantity": rng.randint(1, 3)}
+                            for product_id in rng.sample(product_ids, options["lines"])
+                        ],
+                    }
+                ),
+                content_type="application/json",
+            )
+            order_ids.append(response.json()["id"])
+
+        def checkout(order_id):
+            start = time.perf_counter()
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.post(
+                    "/api/orders/create-checkout-session/",
+                    json.dumps({"order_id": order_id}),
+                    content_type="application/json",
+                )
+            assert response.status_code == 200, response.content
+            return time.perf_counter() - start, len(ctx.captured_queries)
+
+        first, first_queries = zip(*(checkout(order_id) for order_id in order_ids))
+        stripe_calls = stripe_server.requests
+        repeat, repeat_queries = zip(
+            *(checkout(order_id) for _ in range(options["repeats"]) for order_id in order_ids)
+        )
+
+        return {
+            "vendor": connection.vendor,
+            "orders": len(order_ids),
+            "lines_per_order": options["lines"],
+            "stripe_latency_ms": options["latency"] * 1000,
+            "first_call": summarize(first),
+            "first_call_queries": max(first_queries),
+            "repeat_call": summarize(repeat),
+            "repeat_call_queries": max(repeat_queries),
+            "stripe_requests": stripe_server.requests,
+            "stripe_requests_on_repeat": stripe_server.requests - stripe_calls,
+            "stripe_connections": len(stripe_server.connections),
+        }
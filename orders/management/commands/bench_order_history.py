@@ -0,0 +1,73 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from catalog.bench import seed_catalog
+from catalog.models import Product
+from core.bench import measure, scratch_database, seed_users
+from orders.bench import seed_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede GET /api/orders/ (historico do /my-orders e /profile) para um usuario "
+        "com muitos pedidos: queries por pagina, latencia e o historico inteiro."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=500)
+        parser.add_argument("--lines", type=int, default=3)
+        parser.add_argument("--products", type=int, default=200)
+        parser.add_argument("--iterations", type=int, default=50)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            seed_catalog(options["products"])
+            products = list(Product.objects.filter(is_active=True).order_by("id"))
+            (user,) = seed_users(1)
+            seed_orders(options["orders"], products, [user], lines=options["lines"])
+            client = Client(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+
+            def get(url):
+                response = client.get(url)
+                assert response.status_code == 200, (url, response.status_code)
+                return response
+
+            result = {
+                "vendor": connection.vendor,
+                "orders": options["orders"],
+                "lines_per_order": options["lines"],
+                "pages": {
+                    f"page_size={size}": measure(lambda: get(f"/api/orders/?page_size={size}"), options["iterations"])
+                    for size in (10, 50, 100)
+                },
+                # Sem cursor/page_size: a lista pura dos clientes antigos (ate max_page_size).
+                "legacy_list": measure(lambda: get("/api/orders/"), options["iterations"]),
+                "full_history": self.walk(get),
+            }
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def walk(self, get):
+        """Percorre o historico inteiro pelos links "next", de 100 em 100."""
+        url = "/api/orders/?page_size=100"
+        pages = orders = 0
+        queries = set()
+        start = time.perf_counter()
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                data = get(url).json()
+            queries.add(len(ctx.captured_queries))
+            pages += 1
+            orders += len(data["results"])
+            url = data["next"]
+        return {
+            "pages": pages,
+            "orders": orders,
+            "queries_per_page": sorted(queries),
+            "seconds": round(time.perf_counter() - start, 4),
+        }
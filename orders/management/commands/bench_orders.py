@@ -0,0 +1,90 @@
+import json
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from catalog.bench import seed_catalog
+from catalog.models import Product
+from core.bench import scratch_database, summarize
+
+
+class Command(BaseCommand):
+    help = "Mede a vazao de criacao de pedidos concorrentes via POST /api/orders/."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=400)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--lines", type=int, default=10)
+        parser.add_argument("--products", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with scratch_database(concurrent=True):
+            seed_catalog(options["products"])
+            product_ids = list(Product.objects.filter(is_active=True).values_list("id", flat=True))
+            rng = random.Random(1)
+
+            def payload():
+                return json.dumps(
+                    {
+                        "full_name": "Bench",
+                        "email": "bench@example.com",
+                        "address": "Rua do Benchmark, 1",
+                        "items": [
+                            {"product_id": rng.choice(product_ids), "quantity": rng.randint(1, 3)}
+                            for _ in range(options["lines"])
+                        ],
+                    }
+                )
+
+            client = Client()
+            with CaptureQueriesContext(connection) as ctx:
+                client.post("/api/orders/", payload(), content_type="application/json")
+            queries_per_order = len(ctx.captured_queries)
+
+            payloads = [payload() for _ in range(options["orders"])]
+            lock = threading.Lock()
+            samples = []
+            errors = []
+
+            def worker(chunk):
+                worker_client = Client()
+                for body in chunk:
+                    start = time.perf_counter()
+                    response = worker_client.post(
+                        "/api/orders/", body, content_type="application/json"
+                    )
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        if response.status_code == 201:
+                            samples.append(elapsed)
+                        else:
+                            errors.append(response.status_code)
+                connection.close()
+
+            threads = [
+                threading.Thread(target=worker, args=(payloads[i :: options["threads"]],))
+                for i in range(options["threads"])
+            ]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - start
+
+        result = {
+            "vendor": connection.vendor,
+            "threads": options["threads"],
+            "lines_per_order": options["lines"],
+            "queries_per_order": queries_per_order,
+            "orders_created": len(samples),
+            "errors": len(errors),
+            "orders_per_sec": round(len(samples) / wall, 1) if wall else 0.0,
+            "latency": summarize(samples),
+        }
+        self.stdout.write(json.dumps(result, indent=2))
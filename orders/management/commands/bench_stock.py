@@ -0,0 +1,94 @@
+import json
+import logging
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.test import Client, override_settings
+
+from catalog.models import Product
+from core.bench import scratch_database, summarize
+from orders.models import OrderItem, StockReservation
+
+
+class Command(BaseCommand):
+    help = (
+        "Dispara pedidos concorrentes num unico produto (drop) via POST /api/orders/ "
+        "com mais demanda que estoque: confere que nada e vendido alem do estoque e "
+        "mede pedidos/s, comparando com o mesmo produto sem controle de estoque."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stock", type=int, default=200)
+        parser.add_argument("--attempts", type=int, default=600, help="Pedidos disparados (quantidade 1 cada).")
+        parser.add_argument("--threads", type=int, default=16)
+
+    def handle(self, *args, **options):
+        # Cada 400 de estoque esgotado viraria um warning de django.request.
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+        with scratch_database(concurrent=True), override_settings(STOCK_WORKER_THREAD=False):
+            hot = Product.objects.create(name="Drop", slug="drop", price="199.90", stock=options["stock"])
+            untracked = Product.objects.create(name="Sem estoque", slug="sem-estoque", price="199.90")
+
+            results = {"tracked": self.storm(hot, options), "untracked": self.storm(untracked, options)}
+            sold = OrderItem.objects.filter(product=hot).aggregate(total=Sum("quantity"))["total"] or 0
+            reserved = (
+                StockReservation.objects.filter(product=hot).aggregate(total=Sum("quantity"))["total"] or 0
+            )
+            hot.refresh_from_db()
+            results["tracked"].update(
+                initial_stock=options["stock"], sold=sold, reserved=reserved, final_stock=hot.stock
+            )
+
+        result = {"vendor": connection.vendor, "threads": options["threads"], **results}
+        self.stdout.write(json.dumps(result, indent=2))
+        tracked = result["tracked"]
+        if tracked["sold"] > options["stock"] or tracked["sold"] + tracked["final_stock"] != options["stock"]:
+            raise CommandError("Estoque inconsistente: venda alem do estoque.")
+
+    def storm(self, product, options):
+        body = json.dumps(
+            {
+                "full_name": "Bench",
+                "email": "bench@example.com",
+                "address": "Rua do Benchmark, 1",
+                "items": [{"product_id": product.id, "quantity": 1}],
+            }
+        )
+        lock = threading.Lock()
+        samples = []
+        statuses = {}
+
+        def worker(count):
+            client = Client()
+            for _ in range(count):
+                start = time.perf_counter()
+                response = client.post("/api/orders/", body, content_type="application/json")
+                elapsed = time.perf_counter() - start
+                with lock:
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                    if response.status_code == 201:
+                        samples.append(elapsed)
+            connection.close()
+
+        threads = options["threads"]
+        per_thread = [options["attempts"] // threads + (i < options["attempts"] % threads) for i in range(threads)]
+        workers = [threading.Thread(target=worker, args=(count,)) for count in per_thread]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        return {
+            "attempts": options["attempts"],
+            "created": statuses.get(201, 0),
+            "rejected": statuses.get(400, 0),
+            "errors": sum(count for code, count in statuses.items() if code not in (201, 400)),
+            "orders_per_sec": round(statuses.get(201, 0) / wall, 1) if wall else 0.0,
+            "requests_per_sec": round(options["attempts"] / wall, 1) if wall else 0.0,
+            "latency": summarize(samples),
+        }
@@ -0,0 +1,139 @@
+import json
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+
+from core.bench import scratch_database, summarize
+from orders.models import EmailOutbox, Order, StripeEvent
+from orders.webhooks import process_pending_events, sign_payload
+
+SECRET = "whsec_bench"
+
+
+def checkout_event(event_id, order_id, event_type, created):
+    return {
+        "id": event_id,
+        "object": "event",
+        "type": event_type,
+        "created": created,
+        "data": {
+            "object": {
+                "object": "checkout.session",
+                "payment_status": "paid" if event_type == "checkout.session.completed" else "unpaid",
+                "metadata": {"order_id": str(order_id)},
+            }
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Dispara rajadas de eventos assinados (com reenvios e fora de ordem) "
+        "contra /api/webhook/ e mede o ack e a vazao do processamento."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=300)
+        parser.add_argument("--duplicates", type=int, default=3, help="Entregas por evento.")
+        parser.add_argument("--threads", type=int, default=8)
+
+    def handle(self, *args, **options):
+        with scratch_database(concurrent=True), override_settings(
+            STRIPE_WEBHOOK_SECRET=SECRET,
+            STRIPE_EVENTS_WORKER_THREAD=False,
+            OUTBOX_WORKER_THREAD=False,
+        ):
+            orders = Order.objects.bulk_create(
+                [
+                    Order(full_name="Bench", email="bench@example.com", address="Rua 1")
+                    for _ in range(options["orders"])
+                ]
+            )
+            order_ids = [order.id for order in orders]
+            rng = random.Random(1)
+            now = int(time.time())
+
+            # Um quarto dos pedidos expira; os outros sao pagos e recebem um
+            # "expired" atrasado (created maior) que nao deve desfazer o pagamento.
+            events = []
+            expected = {}
+            for index, order_id in enumerate(order_ids):
+                if index % 4 == 0:
+                    events.append(checkout_event(f"evt_exp_{order_id}", order_id, "checkout.session.expired", now))
+                    expected[order_id] = Order.STATUS_FAILED
+                else:
+                    events.append(checkout_event(f"evt_paid_{order_id}", order_id, "checkout.session.completed", now))
+                    events.append(checkout_event(f"evt_late_{order_id}", order_id, "checkout.session.expired", now + 60))
+                    expected[order_id] = Order.STATUS_PAID
+
+            deliveries = [json.dumps(event) for event in events for _ in range(options["duplicates"])]
+            rng.shuffle(deliveries)
+
+            lock = threading.Lock()
+            samples = []
+            errors = []
+
+            def worker(chunk):
+                client = Client()
+                for body in chunk:
+                    start = time.perf_counter()
+                    response = client.post(
+                        "/api/webhook/",
+                        body,
+                        content_type="application/json",
+                        HTTP_STRIPE_SIGNATURE=sign_payload(body, SECRET),
+                    )
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        if response.status_code == 200:
+                            samples.append(elapsed)
+                        else:
+                            errors.append(response.status_code)
+                connection.close()
+
+            threads = [
+                threading.Thread(target=worker, args=(deliveries[i :: options["threads"]],))
+                for i in range(options["threads"])
+            ]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            ack_wall = time.perf_counter() - start
+
+            stored = StripeEvent.objects.count()
+            start = time.perf_counter()
+            processed = 0
+            while True:
+                batch = process_pending_events()
+                processed += batch
+                if not batch:
+                    break
+            process_wall = time.perf_counter() - start
+
+            statuses = dict(Order.objects.values_list("id", "status"))
+            mismatched = sum(1 for order_id, status in expected.items() if statuses[order_id] != status)
+            emails = EmailOutbox.objects.count()
+            paid = sum(1 for status in expected.values() if status == Order.STATUS_PAID)
+
+        result = {
+            "vendor": connection.vendor,
+            "threads": options["threads"],
+            "deliveries": len(deliveries),
+            "unique_events": len(events),
+            "events_stored": stored,
+            "ack_errors": len(errors),
+            "acks_per_sec": round(len(samples) / ack_wall, 1) if ack_wall else 0.0,
+            "ack_latency": summarize(samples),
+            "events_processed": processed,
+            "events_per_sec": round(processed / process_wall, 1) if process_wall else 0.0,
+            "orders_with_wrong_status": mismatched,
+            "confirmation_emails": emails,
+            "expected_emails": paid,
+        }
+        self.stdout.write(json.dumps(result, indent=2))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.outbox import drain_outbox, outbox_settings
+
+
+class Command(BaseCommand):
+    help = "Envia os e-mails pendentes do outbox (uma vez ou em loop)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Continua rodando como worker.")
+        parser.add_argument("--interval", type=float, default=5.0)
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"] or outbox_settings()["batch_size"]
+        while True:
+            processed = drain_outbox(batch_size=batch_size)
+            if processed:
+                self.stdout.write(f"{processed} e-mail(s) processado(s).")
+            if not options["loop"]:
+                break
+            if processed < batch_size:
+                time.sleep(options["interval"])
@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = "Processa os eventos do Stripe recebidos pelo webhook (uma vez ou em loop)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Continua rodando como worker.")
+        parser.add_argument("--interval", type=float, default=5.0)
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"] or getattr(settings, "STRIPE_EVENTS_BATCH_SIZE", 50)
+        while True:
+            processed = process_pending_events(batch_size=batch_size)
+            if processed:
+                self.stdout.write(f"{processed} evento(s) processado(s).")
+            if not options["loop"]:
+                break
+            if processed < batch_size:
+                time.sleep(options["interval"])
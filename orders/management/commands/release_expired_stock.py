@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.inventory import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Falha pedidos pendentes com reserva vencida e devolve o estoque (uma vez ou em loop)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Continua rodando como worker.")
+        parser.add_argument("--interval", type=float, default=60.0)
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"] or getattr(settings, "STOCK_RELEASE_BATCH_SIZE", 100)
+        while True:
+            released = release_expired_reservations(batch_size=batch_size)
+            if released:
+                self.stdout.write(f"{released} pedido(s) com reserva vencida.")
+            if not options["loop"]:
+                break
+            if released < batch_size:
+                time.sleep(options["interval"])
@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.models import StripeEvent
+from orders.webhooks import process_pending_events, record_event
+
+
+class Command(BaseCommand):
+    help = (
+        "Reprocessa eventos do Stripe: volta eventos gravados para 'received' "
+        "ou importa um arquivo JSONL exportado do Stripe."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--event-id", action="append", default=[], help="Pode repetir.")
+        parser.add_argument("--status", choices=[StripeEvent.STATUS_FAILED, StripeEvent.STATUS_PROCESSED])
+        parser.add_argument("--file", help="Um evento JSON por linha.")
+        parser.add_argument("--no-process", action="store_true", help="So reenfileira.")
+
+    def handle(self, *args, **options):
+        if not (options["event_id"] or options["status"] or options["file"]):
+            raise CommandError("Informe --event-id, --status ou --file.")
+
+        queued = 0
+        if options["event_id"] or options["status"]:
+            events = StripeEvent.objects.all()
+            if options["event_id"]:
+                events = events.filter(event_id__in=options["event_id"])
+            if options["status"]:
+                events = events.filter(status=options["status"])
+            # Os handlers sao condicionais ao status do pedido, entao
+            # reprocessar um evento ja aplicado nao tem efeito.
+            queued += events.update(
+                status=StripeEvent.STATUS_RECEIVED, attempts=0, last_error="", processed_at=None
+            )
+
+        if options["file"]:
+            with open(options["file"], encoding="utf-8") as handle:
+                for line in handle:
+                    if line.strip() and record_event(json.loads(line)):
+                        queued += 1
+
+        self.stdout.write(f"{queued} evento(s) reenfileirado(s).")
+        if not options["no_process"]:
+            total = 0
+            while True:
+                processed = process_pending_events()
+                total += processed
+                if not processed:
+                    break
+            self.stdout.write(f"{total} evento(s) processado(s).")
@@ -0,0 +1,55 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:19
+
+from django.db import migrations, models
+
+
+def line_item(name, price, quantity):
+    # Copia de orders.checkout.line_item no momento da migration.
+    return {"name": name, "unit_amount": int(price * 100), "quantity": quantity}
+
+
+def backfill_line_items(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    db = schema_editor.connection.alias
+
+    line_items = {}
+    for item in OrderItem.objects.using(db).select_related("product").order_by("id"):
+        line_items.setdefault(item.order_id, []).append(
+            line_item(item.product.name, item.price, item.quantity)
+        )
+    orders = list(Order.objects.using(db).filter(pk__in=list(line_items)))
+    for order in orders:
+        order.line_items = line_items[order.pk]
+    Order.objects.using(db).bulk_update(orders, ["line_items"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_stripe_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='checkout_session_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='checkout_session_id',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='checkout_session_url',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='line_items',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunPython(backfill_line_items, migrations.RunPython.noop),
+    ]
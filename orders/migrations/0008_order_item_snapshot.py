@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+
+def fill_snapshots(apps, schema_editor):
+    # Copia de orders.snapshots.backfill_item_snapshots no momento da migration.
+    OrderItem = apps.get_model("orders", "OrderItem")
+    items = OrderItem.objects.using(schema_editor.connection.alias)
+    pending = items.filter(product_name="").select_related("product").order_by("id")
+    last_id = 0
+    while batch := list(pending.filter(id__gt=last_id)[:1000]):
+        for item in batch:
+            item.product_name = item.product.name
+            item.product_image = item.product.image.name if item.product.image else ""
+            item.product_image_meta = item.product.image_meta
+        items.bulk_update(batch, ["product_name", "product_image", "product_image_meta"])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_product_image_meta'),
+        ('orders', '0007_order_line_items'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_image',
+            field=models.ImageField(blank=True, default='', editable=False, upload_to='products/'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_image_meta',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='product_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_snapshots, migrations.RunPython.noop),
+    ]
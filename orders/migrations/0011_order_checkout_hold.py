@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_stripe_event_backoff'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='checkout_hold_expires_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 from catalog.models import Product
 
@@ -24,18 +25,149 @@ class Order(models.Model):
     status = models.CharField(
         max_length=32, choices=STATUS_CHOICES, default=STATUS_PENDING
     )
+    # Snapshot das linhas no formato do Stripe (nome, centavos, quantidade),
+    # montado na criacao do pedido para o checkout nao ler itens e produtos.
+    line_items = models.JSONField(default=list, blank=True, editable=False)
+    checkout_session_id = models.CharField(max_length=255, blank=True, default="")
+    checkout_session_url = models.TextField(blank=True, default="")
+    checkout_session_expires_at = models.DateTimeField(null=True, blank=True)
+    # expires_at pedido ao Stripe na sessao em criacao (orders.inventory.hold_for_checkout).
+    checkout_hold_expires_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="orders_order_user_created_idx"),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.full_name}"
 
 
+def product_snapshot(product):
+    """Campos de snapshot do OrderItem (tambem usado pelo backfill)."""
+    return {
+        "product_name": product.name,
+        "product_image": product.image.name if product.image else "",
+        "product_image_meta": product.image_meta,
+    }
+
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Snapshot do produto na compra: o historico de pedidos nao le catalog_product
+    # e continua mostrando o que foi comprado se o produto mudar depois.
+    product_name = models.CharField(max_length=255, blank=True, default="", editable=False)
+    product_image = models.ImageField(upload_to="products/", blank=True, default="", editable=False)
+    product_image_meta = models.JSONField(default=dict, blank=True, editable=False)
+
+    @classmethod
+    def from_product(cls, product, quantity, **kwargs):
+        return cls(product=product, quantity=quantity, price=product.price, **product_snapshot(product), **kwargs)
+
+    def __str__(self):
+        return f"{self.product_name or self.product_id} x {self.quantity}"
+
+
+class StockReservation(models.Model):
+    """Estoque baixado por um pedido pendente (orders/inventory.py).
+
+    Pago, a reserva vira definitiva; falha ou expiracao devolvem o estoque.
+    """
+
+    STATUS_ACTIVE = "active"
+    STATUS_COMMITTED = "committed"
+    STATUS_RELEASED = "released"
+
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, "Active"),
+        (STATUS_COMMITTED, "Committed"),
+        (STATUS_RELEASED, "Released"),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="reservations")
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name="+")
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "expires_at"], name="orders_reservation_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} x {self.quantity} #{self.order_id} ({self.status})"
+
+
+class StripeEvent(models.Model):
+    """Eventos de webhook recebidos; a unique em event_id descarta reenvios."""
+
+    STATUS_RECEIVED = "received"
+    STATUS_PROCESSED = "processed"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_RECEIVED, "Received"),
+        (STATUS_PROCESSED, "Processed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    stripe_created = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_RECEIVED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "stripe_created", "id"], name="orders_stripe_event_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.event_id}"
+
+
+class EmailOutbox(models.Model):
+    """E-mails a enviar, gravados na mesma transacao da mudanca de status."""
+
+    KIND_ORDER_CONFIRMATION = "order_confirmation"
+
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="emails")
+    kind = models.CharField(max_length=32, default=KIND_ORDER_CONFIRMATION)
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    provider_id = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="orders_outbox_due_idx"),
+        ]
 
     def __str__(self):
-        return f"{self.product.name} x {self.quantity}"
+        return f"{self.kind} #{self.order_id} ({self.status})"
 
 # Create your models here.
@@ -0,0 +1,113 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.background import BackgroundWorker
+from orders.email_resend import send_order_confirmation_email
+from orders.models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def outbox_settings():
+    return {
+        "batch_size": getattr(settings, "OUTBOX_BATCH_SIZE", 20),
+        "max_attempts": getattr(settings, "OUTBOX_MAX_ATTEMPTS", 8),
+        "retry_base": getattr(settings, "OUTBOX_RETRY_BASE", 30),
+        "lease": getattr(settings, "OUTBOX_LEASE_SECONDS", 120),
+    }
+
+
+def enqueue_order_confirmation(order_id):
+    """Grava o e-mail de confirmacao; deve rodar dentro da transacao do pagamento.
+
+    A chave de idempotencia e a mesma enviada a Resend (order-<id>), entao
+    reenvios do webhook nao geram um segundo e-mail.
+    """
+    email, created = EmailOutbox.objects.get_or_create(
+        idempotency_key=f"order-{order_id}",
+        defaults={"order_id": order_id, "kind": EmailOutbox.KIND_ORDER_CONFIRMATION},
+    )
+    if created:
+        transaction.on_commit(wake_outbox_worker)
+    return email
+
+
+def claim_batch(batch_size, lease):
+    """Reserva um lote de e-mails vencidos empurrando next_attempt_at para frente.
+
+    O envio acontece fora da transacao; se o processo morrer no meio, a
+    reserva expira e outro worker pega o lote.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("order")
+            .filter(status=EmailOutbox.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        if batch:
+            EmailOutbox.objects.filter(pk__in=[email.pk for email in batch]).update(
+                next_attempt_at=now + timedelta(seconds=lease)
+            )
+    return batch
+
+
+def deliver(email, max_attempts, retry_base):
+    try:
+        provider_id = send_order_confirmation_email(email.order, idempotency_key=email.idempotency_key)
+    except Exception as exc:
+        attempts = email.attempts + 1
+        if attempts >= max_attempts:
+            status = EmailOutbox.STATUS_FAILED
+            next_attempt_at = timezone.now()
+        else:
+            status = EmailOutbox.STATUS_PENDING
+            next_attempt_at = timezone.now() + timedelta(seconds=retry_base * 2 ** (attempts - 1))
+        EmailOutbox.objects.filter(pk=email.pk).update(
+            status=status,
+            attempts=F("attempts") + 1,
+            next_attempt_at=next_attempt_at,
+            last_error=str(exc)[:2000],
+        )
+        logger.warning("[EMAIL][RESEND] erro %s order_id=%s tentativa=%s", exc, email.order_id, attempts)
+        return False
+
+    EmailOutbox.objects.filter(pk=email.pk).update(
+        status=EmailOutbox.STATUS_SENT,
+        attempts=F("attempts") + 1,
+        provider_id=provider_id or "",
+        last_error="",
+        sent_at=timezone.now(),
+    )
+    logger.info("[EMAIL][RESEND] enviado id=%s order_id=%s", provider_id, email.order_id)
+    return True
+
+
+def drain_outbox(batch_size=None):
+    """Envia um lote de e-mails pendentes. Devolve quantos foram processados."""
+    options = outbox_settings()
+    batch_size = batch_size or options["batch_size"]
+
+    batch = claim_batch(batch_size, options["lease"])
+    for email in batch:
+        deliver(email, options["max_attempts"], options["retry_base"])
+    return len(batch)
+
+
+outbox_worker = BackgroundWorker(
+    "email-outbox",
+    drain_outbox,
+    interval=getattr(settings, "OUTBOX_POLL_INTERVAL", 5.0),
+    batch_size=getattr(settings, "OUTBOX_BATCH_SIZE", 20),
+)
+
+
+def wake_outbox_worker():
+    if getattr(settings, "OUTBOX_WORKER_THREAD", True):
+        outbox_worker.wake()
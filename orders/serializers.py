@@ -4,6 +4,9 @@ from django.db import transaction
 from rest_framework import serializers
 
 from catalog.models import Product
+from catalog.serializers import CachedImageField, image_set
+from orders.checkout import line_item
+from orders.inventory import InsufficientStock, out_of_stock, reserve_stock, take_stock, tracked_quantities
 from orders.models import Order, OrderItem
 
 
@@ -12,14 +15,28 @@ class OrderItemSerializer(serializers.Serializer):
     quantity = serializers.IntegerField(min_value=1)
 
 
+class OrderItemListSerializer(serializers.ListSerializer):
+    def get_attribute(self, instance):
+        # Pedido recem-criado: os itens gravados no create, sem reler order.items.
+        created_items = getattr(instance, "created_items", None)
+        return super().get_attribute(instance) if created_items is None else created_items
+
+
 class OrderItemDetailSerializer(serializers.ModelSerializer):
-    product_id = serializers.IntegerField(source="product.id", read_only=True)
-    product_name = serializers.CharField(source="product.name", read_only=True)
-    product_image = serializers.ImageField(source="product.image", read_only=True)
+    """Item do historico, servido so do snapshot (sem ler o produto)."""
+
+    product_id = serializers.IntegerField(read_only=True)
+    product_name = serializers.CharField(read_only=True)
+    product_image = CachedImageField(read_only=True)
+    product_images = serializers.SerializerMethodField()
 
     class Meta:
         model = OrderItem
-        fields = ["product_id", "product_name", "product_image", "quantity", "price"]
+        fields = ["product_id", "product_name", "product_image", "product_images", "quantity", "price"]
+        list_serializer_class = OrderItemListSerializer
+
+    def get_product_images(self, obj):
+        return image_set(obj.product_image_meta, self.context.get("request"))
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -43,33 +60,48 @@ class OrderSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         items_data = validated_data.pop("items", [])
-        product_ids = [item["product_id"] for item in items_data]
-        products = Product.objects.in_bulk(product_ids)
 
-        missing_ids = [pid for pid in product_ids if pid not in products]
+        # Linhas repetidas do mesmo produto viram um unico OrderItem.
+        quantities = {}
+        for item in items_data:
+            product_id = item["product_id"]
+            quantities[product_id] = quantities.get(product_id, 0) + item["quantity"]
+
+        products = Product.objects.filter(is_active=True).in_bulk(list(quantities))
+        missing_ids = [pid for pid in quantities if pid not in products]
         if missing_ids:
             raise serializers.ValidationError(
                 {"items": f"Invalid product_id(s): {missing_ids}"}
             )
 
-        with transaction.atomic():
-            order = Order.objects.create(**validated_data)
-            total = Decimal("0.00")
-
-            for item in items_data:
-                product = products[item["product_id"]]
-                quantity = item["quantity"]
-                line_total = product.price * quantity
-                total += line_total
-
-                OrderItem.objects.create(
-                    order=order,
-                    product=product,
-                    quantity=quantity,
-                    price=product.price,
-                )
-
-            order.total_amount = total
-            order.save(update_fields=["total_amount"])
-
+        # Esgotado pelo snapshot ja falha aqui, sem disputar a linha no UPDATE.
+        tracked = tracked_quantities(products, quantities)
+        sold_out = out_of_stock(tracked, products)
+        if sold_out:
+            raise serializers.ValidationError({"items": f"Insufficient stock for product_id(s): {sold_out}"})
+
+        total = Decimal("0.00")
+        items = []
+        line_items = []
+        for product_id, quantity in quantities.items():
+            product = products[product_id]
+            total += product.price * quantity
+            items.append(OrderItem.from_product(product, quantity))
+            line_items.append(line_item(product.name, product.price, quantity))
+
+        try:
+            with transaction.atomic():
+                take_stock(tracked)
+                order = Order.objects.create(total_amount=total, line_items=line_items, **validated_data)
+                for item in items:
+                    item.order = order
+                OrderItem.objects.bulk_create(items)
+                if tracked:
+                    reserve_stock(order, tracked)
+        except InsufficientStock:
+            # Outro pedido levou o estoque entre a leitura e o UPDATE.
+            sold_out = out_of_stock(tracked) or sorted(tracked)
+            raise serializers.ValidationError({"items": f"Insufficient stock for product_id(s): {sold_out}"})
+
+        order.created_items = items
         return order
@@ -0,0 +1,24 @@
+from orders.models import OrderItem, product_snapshot
+
+SNAPSHOT_FIELDS = ("product_name", "product_image", "product_image_meta")
+
+
+def backfill_item_snapshots(batch_size=1000):
+    """Preenche o snapshot dos itens sem nome de produto, em lotes por id.
+
+    Idempotente: so toca itens com product_name vazio. Devolve quantos itens
+    foram preenchidos.
+    """
+    pending = OrderItem.objects.filter(product_name="").select_related("product").order_by("id")
+    filled = 0
+    last_id = 0
+    while True:
+        batch = list(pending.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return filled
+        for item in batch:
+            for field, value in product_snapshot(item.product).items():
+                setattr(item, field, value)
+        OrderItem.objects.bulk_update(batch, SNAPSHOT_FIELDS)
+        filled += len(batch)
+        last_id = batch[-1].id
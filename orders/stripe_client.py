@@ -0,0 +1,50 @@
+import threading
+from typing import TYPE_CHECKING, Optional
+
+from django.conf import settings
+
+from core.http import get_provider
+
+if TYPE_CHECKING:
+    import stripe
+
+_client: Optional["stripe.StripeClient"] = None
+_client_lock = threading.Lock()
+
+
+def get_stripe_client() -> "stripe.StripeClient":
+    """StripeClient do processo, sobre a Session do provedor "stripe" (core.http).
+
+    Substitui o ``stripe.api_key`` global: a chave fica no client, e
+    STRIPE_API_BASE permite apontar para um servidor local (orders.fake_stripe).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # O SDK so e importado na primeira chamada ao Stripe.
+                import stripe
+
+                from orders.stripe_http import ProviderAsyncHTTPClient
+
+                provider = get_provider("stripe")
+                options = {
+                    # Sync pela Session do provedor; *_async pelo AsyncClient dele.
+                    "http_client": stripe.RequestsClient(
+                        session=provider.session,
+                        timeout=provider.timeout,
+                        async_fallback_client=ProviderAsyncHTTPClient(provider),
+                    ),
+                    "max_network_retries": getattr(settings, "STRIPE_MAX_NETWORK_RETRIES", 2),
+                }
+                api_base = getattr(settings, "STRIPE_API_BASE", "")
+                if api_base:
+                    options["base_addresses"] = {"api": api_base}
+                _client = stripe.StripeClient(settings.STRIPE_SECRET_KEY, **options)
+    return _client
+
+
+def reset_stripe_client():
+    global _client
+    with _client_lock:
+        _client = None
@@ -0,0 +1,48 @@
+# Importado sob demanda por orders.stripe_client (o SDK do Stripe nao entra no boot).
+import asyncio
+
+import stripe
+
+from core.http import CircuitOpenError
+
+
+class ProviderAsyncHTTPClient(stripe.HTTPClient):
+    """Lado async do StripeClient: as chamadas *_async saem pelo httpx.AsyncClient
+    do provedor "stripe" (core.http), com o mesmo circuit breaker e metricas.
+
+    Retries e telemetria continuam no RequestsClient, que delega aqui via
+    ``async_fallback_client``.
+    """
+
+    name = "core.http-httpx"
+
+    def __init__(self, provider):
+        super().__init__()
+        self.provider = provider
+
+    async def _send(self, method, url, headers, post_data, stream=False):
+        client = self.provider.async_client
+        request = client.build_request(method, url, headers=headers, content=post_data)
+        try:
+            return await client.send(request, stream=stream)
+        except CircuitOpenError as exc:
+            raise stripe.APIConnectionError(str(exc), should_retry=False) from exc
+        except Exception as exc:
+            raise stripe.APIConnectionError(
+                f"Erro de rede falando com o Stripe ({type(exc).__name__}).", should_retry=True
+            ) from exc
+
+    async def request_async(self, method, url, headers, post_data=None):
+        response = await self._send(method, url, headers, post_data)
+        return response.content, response.status_code, response.headers
+
+    async def request_stream_async(self, method, url, headers, post_data=None):
+        # O corpo fica aberto ate o SDK consumir aiter_bytes() (ex.: resposta em stream).
+        response = await self._send(method, url, headers, post_data, stream=True)
+        return response.aiter_bytes(), response.status_code, response.headers
+
+    async def sleep_async(self, secs):
+        await asyncio.sleep(secs)
+
+    async def close_async(self):
+        pass
@@ -1,3 +1,693 @@
-from django.test import TestCase
+import io
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from catalog.models import Product
+from orders.bench import seed_orders
+from orders.fake_stripe import FakeStripeServer
+from orders.inventory import CHECKOUT_GRACE, InsufficientStock, release_expired_reservations, take_stock
+from orders.models import EmailOutbox, Order, OrderItem, StockReservation, StripeEvent
+from orders.outbox import drain_outbox, enqueue_order_confirmation
+from orders.stripe_client import reset_stripe_client
+from orders.stripe_http import ProviderAsyncHTTPClient
+from orders.webhooks import mark_failed, mark_paid, process_pending_events, sign_payload
+from core.http import get_provider
+from core.models import User
+from core.query_budget import QueryBudgetTestMixin
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class OrderCreateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.products = Product.objects.bulk_create(
+            [Product(name=f"Produto {i}", slug=f"produto-{i}", price="10.50") for i in range(60)]
+        )
+
+    def post_order(self, items):
+        return self.client.post(
+            "/api/orders/",
+            {
+                "full_name": "Ada Lovelace",
+                "email": "ada@example.com",
+                "address": "Rua 1",
+                "items": items,
+            },
+            format="json",
+        )
+
+    def test_duplicate_lines_are_merged(self):
+        product = self.products[0]
+        response = self.post_order(
+            [{"product_id": product.id, "quantity": 1}, {"product_id": product.id, "quantity": 2}]
+        )
+        self.assertEqual(response.status_code, 201)
+
+        order = Order.objects.get(pk=response.json()["id"])
+        self.assertEqual(order.total_amount, Decimal("31.50"))
+        self.assertEqual(list(order.items.values_list("product_id", "quantity")), [(product.id, 3)])
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        counts = []
+        for size in (1, 50):
+            items = [{"product_id": p.id, "quantity": 1} for p in self.products[:size]]
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.post_order(items)
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(response.json()["items_detail"]), size)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_inactive_products_are_rejected(self):
+        product = self.products[0]
+        product.is_active = False
+        product.save()
+
+        response = self.post_order([{"product_id": product.id, "quantity": 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class OrderHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="ada@example.com", password="x")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+        self.products = Product.objects.bulk_create(
+            [
+                Product(name=f"Produto {i}", slug=f"produto-{i}", price=Decimal("10.50"), image=f"products/p{i}.png")
+                for i in range(5)
+            ]
+        )
+
+    def create_orders(self, count):
+        return seed_orders(count, self.products, [self.user], lines=3)
+
+    def test_history_is_served_from_the_item_snapshot(self):
+        self.create_orders(1)
+        Product.objects.filter(pk__in=[p.pk for p in self.products]).update(name="Renomeado")
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/orders/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any("catalog_product" in q["sql"] for q in ctx.captured_queries))
+
+        item = response.json()[0]["items_detail"][0]
+        self.assertTrue(item["product_name"].startswith("Produto "))
+        self.assertRegex(item["product_image"], r"/products/p\d\.png$")
+
+    def test_query_count_does_not_grow_with_history(self):
+        counts = []
+        for count in (1, 40):
+            self.create_orders(count)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get("/api/orders/", {"page_size": 100})
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(len(response.json()["results"]), 41)
+        self.assertEqual(counts[0], counts[1])
+
+    def test_backfill_fills_missing_snapshots(self):
+        self.create_orders(3)
+        OrderItem.objects.update(product_name="", product_image="", product_image_meta={})
+
+        out = io.StringIO()
+        call_command("backfill_order_items", "--batch-size", "2", stdout=out)
+        self.assertIn("9 de 9", out.getvalue())
+        self.assertFalse(OrderItem.objects.filter(product_name="").exists())
+        item = OrderItem.objects.select_related("product").first()
+        self.assertEqual((item.product_name, item.product_image.name), (item.product.name, item.product.image.name))
+
+        call_command("backfill_order_items", stdout=out)
+        self.assertIn("0 de 0", out.getvalue())
+
+
+@override_settings(OUTBOX_WORKER_THREAD=False, OUTBOX_RETRY_BASE=60, OUTBOX_MAX_ATTEMPTS=2)
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.order = Order.objects.create(
+            full_name="Ada Lovelace", email="ada@example.com", address="Rua 1", total_amount="10.00"
+        )
+
+    def test_enqueue_is_idempotent_per_order(self):
+        enqueue_order_confirmation(self.order.id)
+        enqueue_order_confirmation(self.order.id)
+        self.assertEqual(EmailOutbox.objects.get().idempotency_key, f"order-{self.order.id}")
+
+    def test_drain_sends_with_idempotency_key(self):
+        enqueue_order_confirmation(self.order.id)
+        with mock.patch(
+            "orders.outbox.send_order_confirmation_email", return_value="email_123"
+        ) as send:
+            self.assertEqual(drain_outbox(), 1)
+            self.assertEqual(drain_outbox(), 0)
+
+        send.assert_called_once()
+        self.assertEqual(send.call_args.kwargs["idempotency_key"], f"order-{self.order.id}")
+        email = EmailOutbox.objects.get()
+        self.assertEqual((email.status, email.provider_id, email.attempts), (EmailOutbox.STATUS_SENT, "email_123", 1))
+
+    def test_failures_back_off_and_give_up(self):
+        enqueue_order_confirmation(self.order.id)
+        with mock.patch(
+            "orders.outbox.send_order_confirmation_email", side_effect=Exception("503")
+        ):
+            drain_outbox()
+            email = EmailOutbox.objects.get()
+            self.assertEqual((email.status, email.attempts), (EmailOutbox.STATUS_PENDING, 1))
+            self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+            EmailOutbox.objects.update(next_attempt_at=timezone.now())
+            drain_outbox()
+
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.last_error), (EmailOutbox.STATUS_FAILED, 2, "503"))
+
+
+@override_settings(
+    STRIPE_WEBHOOK_SECRET="whsec_test",
+    STRIPE_EVENTS_WORKER_THREAD=False,
+    OUTBOX_WORKER_THREAD=False,
+    STRIPE_EVENTS_MAX_ATTEMPTS=2,
+)
+class StripeWebhookTests(TestCase):
+    def setUp(self):
+        self.order = Order.objects.create(
+            full_name="Ada Lovelace", email="ada@example.com", address="Rua 1", total_amount="10.00"
+        )
+
+    def event(self, event_id, event_type="checkout.session.completed", created=1000, **session):
+        session.setdefault("payment_status", "paid")
+        session.setdefault("metadata", {"order_id": str(self.order.id)})
+        return {"id": event_id, "type": event_type, "created": created, "data": {"object": session}}
+
+    def deliver(self, event, secret="whsec_test"):
+        body = json.dumps(event)
+        return self.client.post(
+            "/api/webhook/",
+            body,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=sign_payload(body, secret),
+        )
+
+    def test_ack_only_records_the_event(self):
+        response = self.deliver(self.event("evt_1"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(StripeEvent.objects.get().status, StripeEvent.STATUS_RECEIVED)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.STATUS_PENDING)
+
+    def test_invalid_signature_is_rejected(self):
+        response = self.deliver(self.event("evt_1"), secret="whsec_other")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_duplicates_are_processed_once(self):
+        for _ in range(3):
+            self.assertEqual(self.deliver(self.event("evt_1")).status_code, 200)
+
+        self.assertEqual(process_pending_events(), 1)
+        self.assertEqual(process_pending_events(), 0)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.STATUS_PAID)
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+    def test_late_expired_event_does_not_undo_payment(self):
+        self.deliver(self.event("evt_expired", "checkout.session.expired", created=2000))
+        self.deliver(self.event("evt_paid", created=1000))
+
+        process_pending_events()
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.STATUS_PAID)
+        self.assertEqual(
+            set(StripeEvent.objects.values_list("status", flat=True)), {StripeEvent.STATUS_PROCESSED}
+        )
+
+    def test_unpaid_completed_session_waits_for_async_payment(self):
+        self.deliver(self.event("evt_1", payment_status="unpaid"))
+        self.deliver(self.event("evt_2", "checkout.session.async_payment_succeeded", created=1001))
+
+        process_pending_events()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.STATUS_PAID)
+
+    @override_settings(STOCK_WORKER_THREAD=False)
+    def test_events_of_a_rotated_session_do_not_touch_the_order(self):
+        product = Product.objects.create(name="Drop", slug="drop", price="10.00", stock=0)
+        StockReservation.objects.create(
+            order=self.order, product=product, quantity=1, expires_at=timezone.now() + timedelta(hours=1)
+        )
+        Order.objects.filter(pk=self.order.pk).update(checkout_session_id="cs_new")
+        # A sessao antiga expira depois que o checkout abriu a nova.
+        self.deliver(self.event("evt_old", "checkout.session.expired", created=1000, id="cs_old"))
+        process_pending_events()
+        self.order.refresh_from_db()
+        product.refresh_from_db()
+        self.assertEqual((self.order.status, product.stock), (Order.STATUS_PENDING, 0))
+
+        self.deliver(self.event("evt_new", created=1001, id="cs_new"))
+        process_pending_events()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.STATUS_PAID)
+        self.assertEqual(StockReservation.objects.get().status, StockReservation.STATUS_COMMITTED)
+
+    def test_handler_errors_are_retried_then_marked_failed(self):
+        self.deliver(self.event("evt_1"))
+        with mock.patch("orders.webhooks.enqueue_order_confirmation", side_effect=Exception("boom")):
+            process_pending_events()
+            # Backoff: a volta seguinte do worker nao pega o evento de novo.
+            self.assertEqual(process_pending_events(), 0)
+            event = StripeEvent.objects.get()
+            self.assertGreater(event.next_attempt_at, timezone.now() + timedelta(seconds=20))
+            StripeEvent.objects.update(next_attempt_at=timezone.now())
+            process_pending_events()
+
+        event = StripeEvent.objects.get()
+        self.assertEqual((event.status, event.attempts, event.last_error), (StripeEvent.STATUS_FAILED, 2, "boom"))
+        # O savepoint desfaz a mudanca de status junto com a falha.
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.STATUS_PENDING)
+
+
+@override_settings(STOCK_WORKER_THREAD=False, STOCK_RESERVATION_TTL=3600)
+class StockReservationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.hot = Product.objects.create(name="Drop", slug="drop", price="99.00", stock=3)
+        self.other = Product.objects.create(name="Bone", slug="bone", price="40.00", stock=10)
+        self.free = Product.objects.create(name="Adesivo", slug="adesivo", price="5.00")
+
+    def post_order(self, *lines):
+        return self.client.post(
+            "/api/orders/",
+            {
+                "full_name": "Ada Lovelace",
+                "email": "ada@example.com",
+                "address": "Rua 1",
+                "items": [{"product_id": product.id, "quantity": quantity} for product, quantity in lines],
+            },
+            format="json",
+        )
+
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.stock
+
+    def test_order_takes_stock_and_reserves_it(self):
+        response = self.post_order((self.hot, 2), (self.other, 1), (self.free, 50))
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual((self.stock(self.hot), self.stock(self.other), self.stock(self.free)), (1, 9, None))
+        reservations = StockReservation.objects.filter(order_id=response.json()["id"])
+        self.assertEqual(
+            sorted(reservations.values_list("product_id", "quantity", "status")),
+            sorted([(self.hot.id, 2, "active"), (self.other.id, 1, "active")]),
+        )
+
+    def test_insufficient_stock_rejects_the_whole_order(self):
+        response = self.post_order((self.other, 1), (self.hot, 4))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f"[{self.hot.id}]", str(response.json()["items"]))
+        self.assertEqual((self.stock(self.hot), self.stock(self.other)), (3, 10))
+        self.assertFalse(Order.objects.exists())
+
+    def test_conditional_update_is_all_or_nothing(self):
+        # Estoque lido antes do UPDATE ja nao vale (outro pedido levou o Drop).
+        with self.assertRaises(InsufficientStock):
+            with transaction.atomic():
+                take_stock({self.other.id: 5, self.hot.id: 4})
+        self.assertEqual((self.stock(self.hot), self.stock(self.other)), (3, 10))
+
+        with mock.patch("orders.serializers.out_of_stock", side_effect=[[], [self.hot.id]]):
+            Product.objects.filter(pk=self.hot.pk).update(stock=0)
+            response = self.post_order((self.other, 1), (self.hot, 1))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stock(self.other), 10)
+
+    def test_payment_commits_and_failure_releases(self):
+        paid = Order.objects.get(pk=self.post_order((self.hot, 1)).json()["id"])
+        failed = Order.objects.get(pk=self.post_order((self.hot, 2)).json()["id"])
+        self.assertEqual(self.stock(self.hot), 0)
+
+        mark_paid({"payment_status": "paid", "metadata": {"order_id": str(paid.id)}})
+        mark_failed({"metadata": {"order_id": str(failed.id)}})
+        mark_failed({"metadata": {"order_id": str(failed.id)}})
+
+        self.assertEqual(self.stock(self.hot), 2)
+        self.assertEqual(StockReservation.objects.get(order=paid).status, StockReservation.STATUS_COMMITTED)
+        self.assertEqual(StockReservation.objects.get(order=failed).status, StockReservation.STATUS_RELEASED)
+
+    def test_expired_reservations_fail_the_order_and_return_stock(self):
+        expired = Order.objects.get(pk=self.post_order((self.hot, 2)).json()["id"])
+        fresh = Order.objects.get(pk=self.post_order((self.hot, 1)).json()["id"])
+        StockReservation.objects.filter(order=expired).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        out = io.StringIO()
+        call_command("release_expired_stock", stdout=out)
+        self.assertIn("1 pedido", out.getvalue())
+
+        expired.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((expired.status, fresh.status), (Order.STATUS_FAILED, Order.STATUS_PENDING))
+        self.assertEqual(self.stock(self.hot), 2)
+        self.assertEqual(release_expired_reservations(), 0)
+
+    def test_deleting_a_pending_order_returns_stock(self):
+        user = User.objects.create_user(email="ada@example.com", password="x")
+        order_id = self.post_order((self.hot, 3)).json()["id"]
+        Order.objects.filter(pk=order_id).update(user=user)
+
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.delete(f"/api/orders/{order_id}/").status_code, 204)
+        self.assertEqual(self.stock(self.hot), 3)
+
+        # Pedido que o webhook ja tirou de pending nao devolve o estoque de novo.
+        order_id = self.post_order((self.hot, 1)).json()["id"]
+        Order.objects.filter(pk=order_id).update(user=user, status=Order.STATUS_FAILED)
+        self.assertEqual(self.client.delete(f"/api/orders/{order_id}/").status_code, 204)
+        self.assertEqual(self.stock(self.hot), 2)
+
+
+class CheckoutSessionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stripe = FakeStripeServer().start()
+        cls.addClassCleanup(cls.stripe.stop)
+
+    def setUp(self):
+        overrides = override_settings(STRIPE_API_BASE=self.stripe.url, STRIPE_SECRET_KEY="sk_test_fake")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        reset_stripe_client()
+        self.addCleanup(reset_stripe_client)
+        self.stripe.reset()
+
+        self.client = APIClient()
+        self.products = Product.objects.bulk_create(
+            [Product(name=f"Produto {i}", slug=f"produto-{i}", price="10.50") for i in range(20)]
+        )
+
+    def create_order(self, lines):
+        response = self.client.post(
+            "/api/orders/",
+            {
+                "full_name": "Ada Lovelace",
+                "email": "ada@example.com",
+                "address": "Rua 1",
+                "items": [{"product_id": p.id, "quantity": 2} for p in self.products[:lines]],
+            },
+            format="json",
+        )
+        return Order.objects.get(pk=response.json()["id"])
+
+    def checkout(self, order):
+        return self.client.post(
+            "/api/orders/create-checkout-session/", {"order_id": order.id}, format="json"
+        )
+
+    def test_order_stores_line_item_snapshot(self):
+        order = self.create_order(2)
+        self.assertEqual(
+            order.line_items,
+            [
+                {"name": "Produto 0", "unit_amount": 1050, "quantity": 2},
+                {"name": "Produto 1", "unit_amount": 1050, "quantity": 2},
+            ],
+        )
+
+    def test_checkout_queries_do_not_grow_with_items(self):
+        small, large = self.create_order(1), self.create_order(20)
+
+        with CaptureQueriesContext(connection) as small_ctx:
+            self.assertEqual(self.checkout(small).status_code, 200)
+        with CaptureQueriesContext(connection) as large_ctx:
+            self.assertEqual(self.checkout(large).status_code, 200)
+
+        self.assertEqual(len(small_ctx.captured_queries), len(large_ctx.captured_queries))
+        params = self.stripe.sessions[Order.objects.get(pk=large.pk).checkout_session_id]["params"]
+        self.assertEqual(params["line_items[19][price_data][product_data][name]"], "Produto 19")
+        self.assertEqual(params["metadata[order_id]"], str(large.id))
+
+    def test_repeat_checkout_reuses_unexpired_session(self):
+        order = self.create_order(3)
+        first = self.checkout(order).json()["url"]
+        second = self.checkout(order).json()["url"]
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.stripe.requests, 1)
+
+        Order.objects.filter(pk=order.pk).update(checkout_session_expires_at=timezone.now())
+        third = self.checkout(order).json()["url"]
+        self.assertNotEqual(third, first)
+        self.assertEqual(self.stripe.requests, 2)
+
+    @override_settings(STOCK_WORKER_THREAD=False, STOCK_RESERVATION_TTL=3600)
+    def test_session_expires_with_the_stock_reservation(self):
+        Product.objects.filter(pk=self.products[0].pk).update(stock=5)
+        order = self.create_order(2)
+        self.assertEqual(self.checkout(order).status_code, 200)
+
+        order.refresh_from_db()
+        params = self.stripe.sessions[order.checkout_session_id]["params"]
+        expires_at = int(params["expires_at"])
+        self.assertAlmostEqual(expires_at, time.time() + 3600, delta=60)
+        reservation = StockReservation.objects.get(order=order)
+        self.assertEqual(reservation.expires_at, order.checkout_session_expires_at + CHECKOUT_GRACE)
+
+        # Sem estoque controlado, a sessao fica com a validade padrao.
+        untracked = self.create_order(1)
+        Product.objects.filter(pk=self.products[0].pk).update(stock=None)
+        StockReservation.objects.filter(order=untracked).delete()
+        self.checkout(untracked)
+        untracked.refresh_from_db()
+        self.assertNotIn("expires_at", self.stripe.sessions[untracked.checkout_session_id]["params"])
+
+        Order.objects.filter(pk=order.pk).update(status=Order.STATUS_FAILED)
+        self.assertEqual(self.checkout(order).status_code, 409)
+
+    @override_settings(STOCK_WORKER_THREAD=False, STOCK_RESERVATION_TTL=3600)
+    def test_repeated_click_reuses_the_hold_until_the_session_expires(self):
+        Product.objects.filter(pk=self.products[0].pk).update(stock=5)
+        order = self.create_order(1)
+        first = self.checkout(order).json()["url"]
+        # Segundo clique antes da primeira resposta ser gravada, segundos depois:
+        # mesma chave e mesmo expires_at, entao o Stripe devolve a mesma sessao.
+        Order.objects.filter(pk=order.pk).update(checkout_session_url="", checkout_session_expires_at=None)
+        later = timezone.now() + timedelta(seconds=3)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            response = self.checkout(order)
+        self.assertEqual((response.status_code, response.json()["url"]), (200, first))
+        self.assertEqual(len(self.stripe.sessions), 1)
+
+        # Sessao perto de expirar: hold novo, chave nova e sessao nova.
+        held = Order.objects.get(pk=order.pk).checkout_hold_expires_at
+        with mock.patch("django.utils.timezone.now", return_value=held - timedelta(seconds=60)):
+            self.assertNotEqual(self.checkout(order).json()["url"], first)
+        order.refresh_from_db()
+        self.assertEqual(order.checkout_hold_expires_at, order.checkout_session_expires_at)
+        self.assertEqual(order.checkout_hold_expires_at, held - timedelta(seconds=60) + timedelta(seconds=3600))
+
+    @override_settings(STOCK_WORKER_THREAD=False, STOCK_RESERVATION_TTL=3600)
+    def test_stale_hold_gets_a_new_expiry_and_key(self):
+        Product.objects.filter(pk=self.products[0].pk).update(stock=5)
+        order = self.create_order(1)
+        # Chamada anterior ao Stripe falhou e o hold ficou a 20 min do fim.
+        stale = (timezone.now() + timedelta(minutes=20)).replace(microsecond=0)
+        Order.objects.filter(pk=order.pk).update(checkout_hold_expires_at=stale)
+        self.stripe.create_session({"expires_at": str(int(stale.timestamp()))}, f"checkout-{order.id}-0")
+
+        response = self.checkout(order)
+        self.assertEqual(response.status_code, 200)
+        order.refresh_from_db()
+        self.assertAlmostEqual(order.checkout_hold_expires_at.timestamp(), time.time() + 3600, delta=60)
+        self.assertEqual(order.checkout_session_expires_at, order.checkout_hold_expires_at)
+
+    def test_orders_without_snapshot_fall_back_to_items(self):
+        order = self.create_order(2)
+        Order.objects.filter(pk=order.pk).update(line_items=[])
+
+        self.assertEqual(self.checkout(order).status_code, 200)
+        order.refresh_from_db()
+        params = self.stripe.sessions[order.checkout_session_id]["params"]
+        self.assertEqual(params["line_items[1][price_data][unit_amount]"], "1050")
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET="whsec_test", STRIPE_EVENTS_WORKER_THREAD=False, ADMIN_TEST_TOKEN="")
+class OrderQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stripe = FakeStripeServer().start()
+        cls.addClassCleanup(cls.stripe.stop)
+
+    def setUp(self):
+        overrides = override_settings(STRIPE_API_BASE=self.stripe.url, STRIPE_SECRET_KEY="sk_test_fake")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        reset_stripe_client()
+        self.addCleanup(reset_stripe_client)
+        self.stripe.reset()
+
+        self.client = APIClient()
+        self.products = Product.objects.bulk_create(
+            [Product(name=f"Produto {i}", slug=f"produto-{i}", price="10.50") for i in range(10)]
+        )
+        self.user = User.objects.create_user(email="ada@example.com", password="x")
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(self.user).access_token}"}
+
+    def create_order(self, lines=5):
+        response = self.assertWithinBudget(
+            "post",
+            "/api/orders/",
+            {
+                "full_name": "Ada Lovelace",
+                "email": "ada@example.com",
+                "address": "Rua 1",
+                "items": [{"product_id": p.id, "quantity": 1} for p in self.products[:lines]],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.json()["id"])
+        Order.objects.filter(pk=order.pk).update(user=self.user)
+        return order
+
+    def test_read_routes_do_not_grow_with_orders_or_items(self):
+        orders = [self.create_order(lines) for lines in (1, 5, 10)]
+        for url in ["/api/", "/api/orders/", "/api/orders/?page_size=2", f"/api/orders/{orders[-1].pk}/"]:
+            with self.subTest(url=url):
+                self.assertEqual(self.assertWithinBudget("get", url, **self.auth).status_code, 200)
+
+    def test_write_routes(self):
+        order = self.create_order()
+        response = self.assertWithinBudget(
+            "post", "/api/orders/create-checkout-session/", {"order_id": order.pk}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.assertWithinBudget(
+            "patch", f"/api/orders/{order.pk}/", {"address": "Rua 2"}, format="json", **self.auth
+        )
+        self.assertEqual(response.status_code, 200)
+        # PUT exige "items", que o pedido nao deixa reescrever: fica no 400.
+        response = self.assertWithinBudget(
+            "put",
+            f"/api/orders/{order.pk}/",
+            {"full_name": "Ada", "email": "ada@example.com", "address": "Rua 3"},
+            format="json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.assertWithinBudget("delete", f"/api/orders/{order.pk}/", **self.auth)
+        self.assertEqual(response.status_code, 204)
+
+    def test_webhook_and_test_resend(self):
+        body = json.dumps({"id": "evt_1", "type": "checkout.session.completed", "created": 1, "data": {"object": {}}})
+        response = self.assertWithinBudget(
+            "post",
+            "/api/webhook/",
+            body,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=sign_payload(body, "whsec_test"),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.assertWithinBudget("get", "/api/test-resend/").status_code, 403)
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET="whsec_test", STRIPE_EVENTS_WORKER_THREAD=False)
+class AsyncCheckoutTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stripe = FakeStripeServer().start()
+        cls.addClassCleanup(cls.stripe.stop)
+
+    def setUp(self):
+        overrides = override_settings(STRIPE_API_BASE=self.stripe.url, STRIPE_SECRET_KEY="sk_test_fake")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        reset_stripe_client()
+        self.addCleanup(reset_stripe_client)
+        self.stripe.reset()
+
+        product = Product.objects.create(name="Produto", slug="produto", price="10.50")
+        response = APIClient().post(
+            "/api/orders/",
+            {
+                "full_name": "Ada Lovelace",
+                "email": "ada@example.com",
+                "address": "Rua 1",
+                "items": [{"product_id": product.id, "quantity": 2}],
+            },
+            format="json",
+        )
+        self.order = Order.objects.get(pk=response.json()["id"])
+
+    async def checkout(self, body):
+        return await self.aassertWithinBudget(
+            "post", "/api/async/orders/create-checkout-session/", body, content_type="application/json"
+        )
+
+    async def test_checkout_creates_then_reuses_the_session(self):
+        first = await self.checkout({"order_id": self.order.id})
+        self.assertEqual(first.status_code, 200)
+        second = await self.checkout({"order_id": self.order.id})
+        self.assertEqual(second.json(), first.json())
+
+        order = await Order.objects.aget(pk=self.order.pk)
+        self.assertEqual(first.json()["url"], order.checkout_session_url)
+        self.assertEqual(len(self.stripe.sessions), 1)
+        params = self.stripe.sessions[order.checkout_session_id]["params"]
+        self.assertEqual(params["line_items[0][price_data][unit_amount]"], "1050")
+        self.assertEqual(params["metadata[order_id]"], str(order.id))
+
+    async def test_checkout_errors(self):
+        self.assertEqual((await self.checkout({})).status_code, 400)
+        self.assertEqual((await self.checkout({"order_id": 999})).status_code, 404)
+        # Porta sem servidor: a falha de conexao vira StripeError e 502.
+        with override_settings(STRIPE_API_BASE="http://127.0.0.1:9", STRIPE_MAX_NETWORK_RETRIES=0):
+            reset_stripe_client()
+            response = await self.checkout({"order_id": self.order.id})
+        self.assertEqual(response.status_code, 502)
+
+    async def test_stream_requests_go_through_the_provider_client(self):
+        client = ProviderAsyncHTTPClient(get_provider("stripe"))
+        body, status, headers = await client.request_stream_async(
+            "post", f"{self.stripe.url}/v1/checkout/sessions", {}, b"metadata[order_id]=1"
+        )
+        payload = json.loads(b"".join([chunk async for chunk in body]))
+
+        self.assertEqual((status, headers["content-type"]), (200, "application/json"))
+        self.assertIn(payload["id"], self.stripe.sessions)
+
+    async def test_webhook_records_each_event_once(self):
+        body = json.dumps({"id": "evt_async", "type": "checkout.session.completed", "created": 1, "data": {"object": {}}})
+        headers = {"Stripe-Signature": sign_payload(body, "whsec_test")}
+        response = await self.aassertWithinBudget(
+            "post", "/api/async/webhook/", body, content_type="application/json", headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        # Repetido: o savepoint do TestCase soma um ROLLBACK TO, fora do orcamento.
+        response = await self.async_client.post(
+            "/api/async/webhook/", body, content_type="application/json", headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await StripeEvent.objects.filter(event_id="evt_async").acount(), 1)
+
+        response = await self.async_client.post(
+            "/api/async/webhook/", body, content_type="application/json", headers={"Stripe-Signature": "t=1,v1=x"}
+        )
+        self.assertEqual(response.status_code, 400)
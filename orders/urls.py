@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from orders import async_views
 from orders.views import OrderViewSet, stripe_webhook_view, test_resend_view
 
 router = DefaultRouter()
@@ -9,4 +10,7 @@ urlpatterns = [
     path('', include(router.urls)),
     path('webhook/', stripe_webhook_view, name='stripe-webhook'),
     path('test-resend/', test_resend_view, name='test-resend'),
+    # Versoes async (config.asgi) do checkout e do webhook.
+    path('async/orders/create-checkout-session/', async_views.create_checkout_session, name='async-checkout-session'),
+    path('async/webhook/', async_views.stripe_webhook, name='async-stripe-webhook'),
 ]
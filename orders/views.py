@@ -3,23 +3,40 @@ from django.shortcuts import get_object_or_404
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-import stripe
 
+from orders.checkout import get_or_create_checkout_session
+from orders.inventory import release_reservations
 from orders.models import Order
 from orders.serializers import OrderSerializer
 from orders.email_resend import send_order_confirmation_email
+from orders.webhooks import record_event
+from core.pagination import KeysetPagination
+from core.query_budget import query_budget
 
 import os
 import re
 from types import SimpleNamespace
 
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 
-
 class OrderViewSet(viewsets.ModelViewSet):
     queryset = Order.objects.prefetch_related("items").all()
     serializer_class = OrderSerializer
+    pagination_class = KeysetPagination
+    # Com estoque controlado, create soma a baixa e as reservas (7) e destroy,
+    # alem do usuario, pedido, itens e DELETEs do CASCADE, o UPDATE condicional
+    # do status e a devolucao do estoque (13); savepoints contam quando aninhado.
+    query_budgets = {
+        "list": 3,
+        "retrieve": 3,
+        "create": 7,
+        "update": 5,
+        "partial_update": 5,
+        "destroy": 13,
+    }
 
     # --- CORRE��O AQUI: getattr para evitar erro 500 ---
     def get_authenticators(self):
@@ -45,7 +62,28 @@ class OrderViewSet(viewsets.ModelViewSet):
         # Se for usu�rio an�nimo (visitante), retorna nada (seguran�a)
         if not user or user.is_anonymous:
             return Order.objects.none()
-        return Order.objects.filter(user=user)
+        # items_detail sai do snapshot dos itens: pedidos + itens, sem join com produto.
+        return Order.objects.filter(user=user).prefetch_related("items")
+
+    def update(self, request, *args, **kwargs):
+        # O UpdateModelMixin descarta o prefetch depois de salvar e a resposta
+        # faria uma query por pedido; refaz o prefetch dos itens.
+        partial = kwargs.pop("partial", False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        instance._prefetched_objects_cache = {}
+        prefetch_related_objects([instance], "items")
+        return Response(serializer.data)
+
+    def perform_destroy(self, instance):
+        # O CASCADE apagaria as reservas ativas sem devolver o estoque. Como no
+        # webhook e na expiracao, so devolve quem tirar o pedido de pending.
+        with transaction.atomic():
+            if Order.objects.filter(pk=instance.pk, status=Order.STATUS_PENDING).update(status=Order.STATUS_FAILED):
+                release_reservations([instance.pk])
+            instance.delete()
 
     def perform_create(self, serializer):
         if self.request.user.is_authenticated:
@@ -54,6 +92,8 @@ class OrderViewSet(viewsets.ModelViewSet):
             serializer.save()
 
     # --- A��o de Checkout do Stripe ---
+    # Pedido, hold das reservas (reservas e pedido) e a sessao gravada.
+    @query_budget(4)
     @action(detail=False, methods=["post"], url_path="create-checkout-session")
     def create_checkout_session(self, request):
         print("--- Iniciando Checkout Session ---")  # Debug
@@ -65,8 +105,6 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        stripe.api_key = settings.STRIPE_SECRET_KEY
-
         try:
             order = Order.objects.get(id=order_id)
         except Order.DoesNotExist:
@@ -75,88 +113,52 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        line_items = []
-        for item in order.items.all():
-            # Converter pre�o para centavos (inteiro)
-            unit_amount = int(item.price * 100)
-            line_items.append(
-                {
-                    "price_data": {
-                        "currency": "brl",
-                        "product_data": {"name": item.product.name},
-                        "unit_amount": unit_amount,
-                    },
-                    "quantity": item.quantity,
-                }
+        # Pedido pago ou falho (estoque ja devolvido) nao abre outra sessao.
+        if order.status != Order.STATUS_PENDING:
+            return Response(
+                {"detail": "Order is not pending."},
+                status=status.HTTP_409_CONFLICT,
             )
 
-        success_url = (
-            f"{settings.FRONTEND_URL}"
-            "/checkout/success?session_id={CHECKOUT_SESSION_ID}"
-        )
-
-        cancel_url = f"{settings.FRONTEND_URL}/checkout"
+        # Linhas vem do snapshot do pedido; uma sessao ainda valida e reaproveitada.
+        import stripe
 
         try:
-            session = stripe.checkout.Session.create(
-                mode="payment",
-                line_items=line_items,
-                success_url=success_url,
-                cancel_url=cancel_url,
-                metadata={"order_id": str(order.id)},
-            )
+            url, _ = get_or_create_checkout_session(order)
         except stripe.error.StripeError as exc:
             return Response(
                 {"detail": "Failed to create payment session.", "error": str(exc)},
                 status=status.HTTP_502_BAD_GATEWAY,
             )
 
-        return Response({"url": session.url}, status=status.HTTP_200_OK)
+        return Response({"url": url}, status=status.HTTP_200_OK)
 
 
 @csrf_exempt
+@query_budget(3)
 def stripe_webhook_view(request):
+    import stripe
+
     payload = request.body
     sig_header = request.META.get("HTTP_STRIPE_SIGNATURE")
-    event = None
 
     try:
-        event = stripe.Webhook.construct_event(
+        stripe.Webhook.construct_event(
             payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
         )
     except ValueError as e:
         print(f"[STRIPE][WEBHOOK] payload inválido: {e}")
-        event = None
+        return HttpResponse(status=400)
     except stripe.error.SignatureVerificationError as e:
         print(f"[STRIPE][WEBHOOK] assinatura inválida: {e}")
-        event = None
-
-    if event and event["type"] == "checkout.session.completed":
-        session = event["data"]["object"]
-
-        order_id = session.get("metadata", {}).get("order_id")
-
-        if order_id:
-            try:
-                order = Order.objects.get(id=order_id)
-                order.status = "paid"
-                order.save()
-                try:
-                    email_id = send_order_confirmation_email(
-                        order, idempotency_key=f"order-{order.id}"
-                    )
-                    print(
-                        f"[EMAIL][RESEND] enviado id={email_id} to={order.email} order_id={order.id}"
-                    )
-                except Exception as e:
-                    print(f"[EMAIL][RESEND] erro {e} order_id={order.id}")
-                print(f"PEDIDO {order_id} ATUALIZADO PARA PAGO!")
-            except Order.DoesNotExist:
-                print(f"Pedido {order_id} n�o encontrado.")
+        return HttpResponse(status=400)
 
+    # So registra e responde; o processamento fica com orders.webhooks.
+    record_event(payload)
     return HttpResponse(status=200)
 
 
+@query_budget(0)
 def test_resend_view(request):
     if request.method != "GET":
         return JsonResponse({"ok": False, "error": "Metodo nao permitido."}, status=405)
@@ -0,0 +1,166 @@
+import hashlib
+import hmac
+import json
+import logging
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.background import BackgroundWorker
+from orders.inventory import commit_reservations, release_reservations
+from orders.models import Order, StripeEvent
+from orders.outbox import enqueue_order_confirmation
+
+logger = logging.getLogger(__name__)
+
+PAID_PAYMENT_STATUSES = {None, "paid", "no_payment_required"}
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """Header Stripe-Signature para um payload (benchmarks, testes e replay local)."""
+    timestamp = int(timestamp or time.time())
+    if isinstance(payload, str):
+        payload = payload.encode()
+    signed = f"{timestamp}.".encode() + payload
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def record_event(payload):
+    """Grava o evento ja verificado. Devolve False se o event_id ja foi visto."""
+    event = payload if isinstance(payload, dict) else json.loads(payload)
+    try:
+        with transaction.atomic():
+            StripeEvent.objects.create(
+                event_id=event["id"],
+                type=event.get("type", ""),
+                payload=event,
+                stripe_created=event.get("created") or 0,
+            )
+    except IntegrityError:
+        return False
+
+    transaction.on_commit(wake_event_worker)
+    return True
+
+
+# Para a view async: transaction.atomic() nao existe no lado async do ORM, entao
+# o INSERT (com savepoint) roda inteiro numa thread, como o proprio ORM async faz.
+arecord_event = sync_to_async(record_event)
+
+
+def _order_id(session):
+    order_id = (session.get("metadata") or {}).get("order_id")
+    try:
+        return int(order_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _current_session(order_id, session):
+    """Pedido pendente cuja sessao atual e a do evento.
+
+    Perto de expirar, o checkout abre outra sessao (orders.checkout); eventos
+    da sessao antiga nao mexem no pedido. Pedido sem sessao gravada aceita
+    qualquer uma.
+    """
+    return Order.objects.filter(
+        pk=order_id, status=Order.STATUS_PENDING, checkout_session_id__in=[session.get("id") or "", ""]
+    )
+
+
+def mark_paid(session):
+    order_id = _order_id(session)
+    if order_id is None or session.get("payment_status") not in PAID_PAYMENT_STATUSES:
+        return
+    # UPDATE condicional: reenvios e eventos fora de ordem nao mexem em
+    # pedidos que ja sairam de pending.
+    updated = _current_session(order_id, session).update(status=Order.STATUS_PAID)
+    if updated:
+        commit_reservations([order_id])
+        enqueue_order_confirmation(order_id)
+
+
+def mark_failed(session):
+    order_id = _order_id(session)
+    if order_id is None:
+        return
+    updated = _current_session(order_id, session).update(status=Order.STATUS_FAILED)
+    if updated:
+        release_reservations([order_id])
+
+
+EVENT_HANDLERS = {
+    "checkout.session.completed": mark_paid,
+    "checkout.session.async_payment_succeeded": mark_paid,
+    "checkout.session.async_payment_failed": mark_failed,
+    "checkout.session.expired": mark_failed,
+}
+
+
+def process_event(event):
+    handler = EVENT_HANDLERS.get(event.type)
+    if handler is not None:
+        handler(event.payload["data"]["object"])
+
+
+def process_pending_events(batch_size=None):
+    """Processa eventos recebidos na ordem de criacao no Stripe.
+
+    Falhas voltam a fila com backoff exponencial (como o outbox), entao um
+    evento quebrado nao e reprocessado a cada volta do worker.
+    """
+    batch_size = batch_size or getattr(settings, "STRIPE_EVENTS_BATCH_SIZE", 50)
+    max_attempts = getattr(settings, "STRIPE_EVENTS_MAX_ATTEMPTS", 5)
+    retry_base = getattr(settings, "STRIPE_EVENTS_RETRY_BASE", 30)
+
+    event_ids = list(
+        StripeEvent.objects.filter(status=StripeEvent.STATUS_RECEIVED, next_attempt_at__lte=timezone.now())
+        .order_by("stripe_created", "id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    for event_id in event_ids:
+        with transaction.atomic():
+            event = (
+                StripeEvent.objects.select_for_update(skip_locked=True)
+                .filter(pk=event_id, status=StripeEvent.STATUS_RECEIVED)
+                .first()
+            )
+            if event is None:
+                continue
+
+            event.attempts += 1
+            try:
+                with transaction.atomic():
+                    process_event(event)
+            except Exception as exc:
+                logger.exception("[STRIPE][WEBHOOK] falha ao processar %s", event.event_id)
+                event.last_error = str(exc)[:2000]
+                if event.attempts >= max_attempts:
+                    event.status = StripeEvent.STATUS_FAILED
+                else:
+                    delay = retry_base * 2 ** (event.attempts - 1)
+                    event.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            else:
+                event.status = StripeEvent.STATUS_PROCESSED
+                event.processed_at = timezone.now()
+                event.last_error = ""
+            event.save(update_fields=["status", "attempts", "last_error", "next_attempt_at", "processed_at"])
+    return len(event_ids)
+
+
+event_worker = BackgroundWorker(
+    "stripe-events",
+    process_pending_events,
+    interval=getattr(settings, "STRIPE_EVENTS_POLL_INTERVAL", 5.0),
+    batch_size=getattr(settings, "STRIPE_EVENTS_BATCH_SIZE", 50),
+)
+
+
+def wake_event_worker():
+    if getattr(settings, "STRIPE_EVENTS_WORKER_THREAD", True):
+        event_worker.wake()